@@ -1,28 +1,78 @@
-import queue
+import heapq
+import threading
 import time
 
 class AlertManager:
-    """Manages a queue of alerts to be displayed."""
+    """
+    Keeps the alerts currently on screen. Alerts are indexed by (icon, message)
+    and expire display_duration seconds after they were last raised; raising an
+    alert that is already showing just extends it. Expiry times are kept in a
+    heap, so polling only touches the alerts that have actually expired, and
+    get_alerts() returns the same cached snapshot until something changes.
+    Consumers that want every new alert as it happens can subscribe().
+    """
     def __init__(self, display_duration=3):
-        self.alerts = queue.Queue()
         self.display_duration = display_duration
+        self._lock = threading.Lock()
+        self._active = {}      # (icon, message) -> alert dict, in the order alerts were first raised
+        self._expiries = []    # Heap of (expires, seq, key); entries go stale when an alert is extended
+        self._seq = 0
+        self._snapshot = None  # Cached get_alerts() result, None when it must be rebuilt
+        self._subscribers = []
 
     def add_alert(self, message, icon=""):
-        """Adds an alert to the queue with a timestamp."""
+        """Raises an alert (or extends the identical one already showing) and notifies subscribers."""
         alert_time = time.time()
-        self.alerts.put({"message": message, "icon": icon, "time": alert_time})
+        key = (icon, message)
+        expires = alert_time + self.display_duration
+        with self._lock:
+            alert = self._active.get(key)
+            is_new = alert is None
+            if is_new:
+                alert = self._active[key] = {"message": message, "icon": icon, "time": alert_time}
+                self._snapshot = None
+            alert["expires"] = expires
+            self._seq += 1
+            heapq.heappush(self._expiries, (expires, self._seq, key))
+            subscribers = self._subscribers
+        if is_new:
+            for callback in subscribers:
+                try:
+                    callback(dict(alert))
+                except Exception as e:
+                    print(f"❌ Error: alert subscriber {callback!r} failed: {e}")
 
-    def get_alerts(self):
-        """Gets current alerts that should be displayed."""
-        current_alerts = []
-        while not self.alerts.empty():
-            alert = self.alerts.get()
-            # Keep alert if it's not expired
-            if time.time() - alert["time"] < self.display_duration:
-                current_alerts.append(alert)
-        
-        # Add unexpired alerts back to a new queue to maintain them
-        for alert in current_alerts:
-            self.alerts.put(alert)
-            
-        return [f'{a["icon"]} {a["message"]}' for a in current_alerts]
\ No newline at end of file
+    def get_alerts(self, now=None):
+        """
+        Gets current alerts that should be displayed, as "icon message" strings.
+        The returned tuple is shared between calls: do not modify it.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expiries = self._expiries
+            while expiries and expiries[0][0] <= now:
+                expires, _, key = heapq.heappop(expiries)
+                alert = self._active.get(key)
+                # Skip entries left behind when the alert was extended
+                if alert is not None and alert["expires"] == expires:
+                    del self._active[key]
+                    self._snapshot = None
+            if self._snapshot is None:
+                self._snapshot = tuple(f'{a["icon"]} {a["message"]}' for a in self._active.values())
+            return self._snapshot
+
+    def subscribe(self, callback):
+        """
+        Calls callback(alert) for every new alert, on the thread that raised it,
+        with a dict holding "message", "icon", "time" and "expires". Callbacks
+        should be quick (hand the alert to a queue); exceptions are reported
+        and swallowed. Returns the callback, for unsubscribe().
+        """
+        with self._lock:
+            # Copy on write, so add_alert can iterate without holding the lock
+            self._subscribers = self._subscribers + [callback]
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [c for c in self._subscribers if c is not callback]
@@ -2,8 +2,12 @@ from flask import Flask, request, jsonify, send_from_directory
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
 import jwt
+import atexit
 import datetime
 import os
+import threading
+
+import ingest
 
 # --- App Initialization ---
 app = Flask(__name__, static_folder=None)
@@ -14,6 +18,14 @@ CORS(app)
 # IMPORTANT: In a production environment, use a strong, secret key and load it securely.
 # Load the secret key from an environment variable for better security.
 app.config['SECRET_KEY'] = os.environ.get('PROCTORING_SECRET_KEY', 'your-super-secret-and-long-key-fallback')
+# Uploads outlive the 5-minute login token, so starting a session issues a token for that session only.
+# Session tokens carry this scope and are accepted nowhere else (not for new sessions, admin pages or run.py).
+SESSION_TOKEN_HOURS = 6
+SESSION_TOKEN_SCOPE = 'ingest'
+# Request bodies are refused (413) before they are read past this size. One byte
+# over the frame limit, so a longer chunked upload, which is cut off here rather
+# than refused, still reads as too large.
+app.config['MAX_CONTENT_LENGTH'] = ingest.MAX_FRAME_BYTES + 1
 
 # --- In-Memory Mock User Database ---
 # In a real application, this would be a database (e.g., PostgreSQL, MySQL).
@@ -52,6 +64,10 @@ def serve_static(filename):
 
 # --- API Routes ---
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({"ok": False, "error": "Request is too large."}), 413
+
 @app.route('/api/login', methods=['POST'])
 def login():
     """
@@ -92,6 +108,153 @@ def login():
         "user": user_data # Also return user data for immediate use in frontend if needed
     }), 200
 
+
+# --- Frame Ingest API ---
+# Candidates whose machines are too slow to run the detection themselves
+# upload frames here; a pool of worker processes analyses them (ingest.py).
+
+ingest_pool = None
+_ingest_pool_lock = threading.Lock()
+
+def get_ingest_pool():
+    """The worker pool, started on first use (not at import, so Flask's reloader does not start two)."""
+    global ingest_pool
+    with _ingest_pool_lock:
+        if ingest_pool is None:
+            ingest_pool = ingest.WorkerPool().start()
+            atexit.register(ingest_pool.stop)
+        return ingest_pool
+
+def decode_token():
+    """The claims of the request's "Authorization: Bearer <token>" JWT, or None if missing or invalid."""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        return jwt.decode(header[len('Bearer '):], app.config['SECRET_KEY'], algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+
+def login_claims():
+    """Claims of the request's login token, or None (session tokens are not login tokens)."""
+    claims = decode_token()
+    if claims is None or 'scope' in claims:
+        return None
+    return claims
+
+def session_claims(session_id):
+    """Claims of a session token for session_id, or None."""
+    claims = decode_token()
+    if claims is None or claims.get('scope') != SESSION_TOKEN_SCOPE or claims.get('session') != session_id:
+        return None
+    return claims
+
+def audio_features(values):
+    """The known audio features in a dict of strings or numbers, as floats."""
+    features = {}
+    for name in ingest.AUDIO_FEATURES:
+        if values.get(name) is not None:
+            features[name] = float(values[name])
+    return features
+
+def refused(error):
+    """429 / 503 response for an upload the pool turned away, with Retry-After."""
+    status = 429 if isinstance(error, ingest.RateLimited) else 503
+    response = jsonify({"ok": False, "error": str(error), "retry_after": round(error.retry_after, 3)})
+    response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response, status
+
+@app.route('/api/sessions', methods=['POST'])
+def start_session():
+    """Starts a proctoring session for the logged-in user. Returns its id and upload token."""
+    claims = login_claims()
+    if claims is None or 'user' not in claims:
+        return jsonify({"ok": False, "error": "Missing or invalid token."}), 401
+    try:
+        session = get_ingest_pool().open_session(claims['user'])
+    except ingest.Busy as e:
+        return refused(e)
+    token = jwt.encode({
+        'user': claims['user'],
+        'session': session.id,
+        'scope': SESSION_TOKEN_SCOPE,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=SESSION_TOKEN_HOURS)
+    }, app.config['SECRET_KEY'], algorithm="HS256")
+    return jsonify({"ok": True, "session": session.id, "token": token}), 201
+
+@app.route('/api/sessions/<session_id>/frames', methods=['POST'])
+def upload_frame(session_id):
+    """
+    Queues one JPEG frame (the request body) for analysis. Optional query
+    parameters: t (capture time, epoch seconds) and the audio features
+    (audio, audio_level, speech). Returns the frame's sequence number and
+    the newest result so far; 429 or 503 with Retry-After if refused.
+    """
+    if session_claims(session_id) is None:
+        return jsonify({"ok": False, "error": "Missing or invalid session token."}), 401
+    # At most MAX_CONTENT_LENGTH bytes are read
+    jpeg = request.get_data(cache=False)
+    if not jpeg:
+        return jsonify({"ok": False, "error": "Empty frame."}), 400
+    if len(jpeg) > ingest.MAX_FRAME_BYTES:
+        return jsonify({"ok": False, "error": "Frame is too large."}), 413
+    try:
+        features = audio_features(request.args)
+        captured = float(request.args['t']) if 't' in request.args else None
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid audio feature or time."}), 400
+    pool = get_ingest_pool()
+    try:
+        seq, latest = pool.submit_frame(session_id, jpeg, captured, features)
+    except ingest.SessionNotFound:
+        return jsonify({"ok": False, "error": "Session not found."}), 404
+    except (ingest.RateLimited, ingest.Busy) as e:
+        return refused(e)
+    return jsonify({"ok": True, "seq": seq, "latest": latest}), 202
+
+@app.route('/api/sessions/<session_id>/audio', methods=['POST'])
+def upload_audio(session_id):
+    """Updates the candidate's audio features between frames (JSON body)."""
+    if session_claims(session_id) is None:
+        return jsonify({"ok": False, "error": "Missing or invalid session token."}), 401
+    try:
+        features = audio_features(request.get_json(silent=True) or {})
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "Invalid audio feature."}), 400
+    try:
+        get_ingest_pool().submit_audio(session_id, features)
+    except ingest.SessionNotFound:
+        return jsonify({"ok": False, "error": "Session not found."}), 404
+    except ingest.Busy as e:
+        return refused(e)
+    return jsonify({"ok": True}), 202
+
+@app.route('/api/sessions/<session_id>', methods=['GET', 'DELETE'])
+def session_status(session_id):
+    """The session's counters and newest result (GET), or ends the session (DELETE)."""
+    claims = session_claims(session_id)
+    if claims is None:
+        claims = login_claims()
+        # Admins may look at any session with their login token
+        if request.method == 'DELETE' or not claims or claims.get('user', {}).get('role') != 'Admin':
+            return jsonify({"ok": False, "error": "Missing or invalid token."}), 401
+    try:
+        if request.method == 'DELETE':
+            session = get_ingest_pool().close_session(session_id)
+        else:
+            session = get_ingest_pool().session(session_id)
+    except ingest.SessionNotFound:
+        return jsonify({"ok": False, "error": "Session not found."}), 404
+    return jsonify(dict(session.status(), ok=True)), 200
+
+@app.route('/api/ingest/stats', methods=['GET'])
+def ingest_stats():
+    """Worker and session counters, for admins."""
+    claims = login_claims()
+    if not claims or claims.get('user', {}).get('role') != 'Admin':
+        return jsonify({"ok": False, "error": "Admin token required."}), 401
+    return jsonify(dict(get_ingest_pool().stats(), ok=True)), 200
+
 if __name__ == '__main__':
     # Run the app in debug mode for development
     app.run(debug=True, port=5001)
\ No newline at end of file
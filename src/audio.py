@@ -1,52 +1,355 @@
-import sounddevice as sd
+import math
+import threading
+import time
+import wave
+
 import numpy as np
 
+import instrument
+
 # Sound variables
-CALLBACKS_PER_SECOND = 38               # Callbacks per second (system dependent)
+BLOCKSIZE = 1024                        # Samples per callback; fixed so the block rate is known
+LATENCY = "low"                         # PortAudio input latency: "low", "high" or seconds
+SYNTHETIC_SAMPLERATE = 16000            # Sample rate of generated audio when none is given
 SUS_FINDING_FREQUENCY = 2               # Calculates SUS *n* times every second
 SOUND_AMPLITUDE_THRESHOLD = 20          # Amplitude considered for SUS calc
 SUS_COUNT_THRESHOLD = 2                 # Number of consecutive high-amplitude checks to trigger cheat flag
 
-# Packing *n* frames to calculate SUS
-FRAMES_COUNT = int(CALLBACKS_PER_SECOND / SUS_FINDING_FREQUENCY)
-AMPLITUDE_LIST = [0] * FRAMES_COUNT
-SUS_COUNT = 0
-count = 0
-
-def _calculate_rms(indata):
-    """Calculate the Root Mean Square (RMS) value of the audio data."""
-    return np.sqrt(np.mean(indata**2)) * 1000
-
-def _audio_callback(indata, outdata, frames, time, status, alert_manager, audio_state):
-    """This function is called for each audio block from the sound device."""
-    global SUS_COUNT, count # These can remain as module-level state for the callback
-    rms_amplitude = _calculate_rms(indata)
-    AMPLITUDE_LIST.append(rms_amplitude)
-    count += 1
-    AMPLITUDE_LIST.pop(0)
-    
-    if count == FRAMES_COUNT:
-        avg_amp = sum(AMPLITUDE_LIST) / FRAMES_COUNT
-        
-        if avg_amp > SOUND_AMPLITUDE_THRESHOLD:
-            SUS_COUNT += 1
+
+def _sounddevice():
+    """Imports sounddevice on first use, so WAV and synthetic sources work without PortAudio."""
+    import sounddevice
+    return sounddevice
+
+
+def blocks_per_window(samplerate, blocksize, frequency=SUS_FINDING_FREQUENCY):
+    """Callbacks in one SUS window: (samplerate / blocksize) callbacks per second, *frequency* windows per second."""
+    return max(1, round(samplerate / blocksize / frequency))
+
+
+class LoudnessMonitor:
+    """
+    Sustained-loudness check fed one audio block at a time. Block amplitudes
+    go into a preallocated ring buffer with a running sum, so add_block()
+    makes no Python lists or temporary arrays and is safe to call from the
+    PortAudio callback thread. If `state` is given, its "is_cheating" entry
+    follows the flag.
+    """
+    def __init__(self, samplerate, blocksize=BLOCKSIZE, frequency=SUS_FINDING_FREQUENCY,
+                 threshold=SOUND_AMPLITUDE_THRESHOLD, sus_count_threshold=SUS_COUNT_THRESHOLD, state=None):
+        self.frequency = frequency
+        self.threshold = threshold
+        self.sus_count_threshold = sus_count_threshold
+        self.state = state
+        self.configure(samplerate, blocksize)
+
+    def configure(self, samplerate, blocksize):
+        """Sizes the window for a (new) block rate and clears it."""
+        self.window_blocks = blocks_per_window(samplerate, blocksize, self.frequency)
+        self._amplitudes = np.zeros(self.window_blocks)
+        self._index = 0
+        self._sum = 0.0
+        self.sus_count = 0
+        self.is_cheating = 0
+        if self.state is not None:
+            self.state["is_cheating"] = 0
+
+    def add_block(self, indata):
+        """Adds one block of samples; re-evaluates the cheat flag once per full window."""
+        samples = indata.reshape(-1)  # A view: PortAudio buffers are contiguous
+        if samples.size == 0:
+            return
+        rms = math.sqrt(float(np.dot(samples, samples)) / samples.size) * 1000
+        i = self._index
+        self._sum += rms - self._amplitudes[i]
+        self._amplitudes[i] = rms
+        i += 1
+        if i == self.window_blocks:
+            i = 0
+            # Re-sum once per window so rounding errors in the running sum cannot build up
+            self._sum = float(self._amplitudes.sum())
+            self._evaluate()
+        self._index = i
+
+    def level(self):
+        """Average amplitude over the last window of blocks."""
+        return self._sum / self.window_blocks
+
+    def _evaluate(self):
+        if self.level() > self.threshold:
+            self.sus_count += 1
         else:
             # Reset the counter if the sound is no longer sustained
-            SUS_COUNT = 0
-
+            self.sus_count = 0
         # If the sound has been sustained long enough, set the cheat flag
-        if SUS_COUNT >= SUS_COUNT_THRESHOLD:
-            audio_state["is_cheating"] = 1
-        else:
-            audio_state["is_cheating"] = 0 # Reset the flag if sound is no longer sustained
+        self.is_cheating = 1 if self.sus_count >= self.sus_count_threshold else 0
+        if self.state is not None:
+            self.state["is_cheating"] = self.is_cheating
+            self.state["audio_level"] = self.level()
+
+
+# --- Sources ---
+
+def _pcm_to_float(raw, sample_width, channels):
+    """Interleaved PCM bytes -> float32 array of shape (frames, channels) in [-1, 1]."""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 2 ** 15
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2 ** 31
+    else:
+        raise ValueError(f"unsupported WAV sample width: {sample_width} bytes")
+    return samples.reshape(-1, channels)
+
+
+def read_wav(path):
+    """Reads a whole PCM WAV file. Returns (float32 samples of shape (frames, channels), samplerate)."""
+    with wave.open(path, "rb") as f:
+        raw = f.readframes(f.getnframes())
+        return _pcm_to_float(raw, f.getsampwidth(), f.getnchannels()), f.getframerate()
+
+
+class WavSource:
+    """Audio blocks read from a PCM WAV file, a block at a time."""
+    def __init__(self, path):
+        self.path = path
+        with wave.open(path, "rb") as f:
+            self.samplerate = f.getframerate()
+            self.channels = f.getnchannels()
+
+    def blocks(self, samplerate, blocksize):
+        with wave.open(self.path, "rb") as f:
+            width = f.getsampwidth()
+            while True:
+                raw = f.readframes(blocksize)
+                if not raw:
+                    return
+                block = _pcm_to_float(raw, width, self.channels)
+                if len(block) < blocksize:
+                    # Pad the last block so every callback sees the configured block size
+                    block = np.concatenate([block, np.zeros((blocksize - len(block), self.channels), np.float32)])
+                yield block
+
+    def __str__(self):
+        return f"wav:{self.path}"
+
+
+class SyntheticSource:
+    """
+    Generated audio: a sine tone plus white noise, optionally only during
+    alternate on/off periods (e.g. someone talking in bursts). Runs forever
+    unless `seconds` is given. samplerate=None follows the engine.
+    """
+    def __init__(self, samplerate=None, seconds=None, tone_hz=220.0, tone_level=0.1, noise_level=0.01,
+                 on_seconds=None, off_seconds=None, seed=0):
+        self.samplerate = samplerate
+        self.channels = 1
+        self.seconds = seconds
+        self.tone_hz = tone_hz
+        self.tone_level = tone_level
+        self.noise_level = noise_level
+        self.on_seconds = on_seconds
+        self.off_seconds = off_seconds
+        self.seed = seed
+
+    def blocks(self, samplerate, blocksize):
+        rng = np.random.default_rng(self.seed)
+        total = None if self.seconds is None else int(self.seconds * samplerate)
+        offsets = np.arange(blocksize)
+        phase_step = 2 * np.pi * self.tone_hz / samplerate
+        period = None
+        if self.on_seconds and self.off_seconds:
+            period = (int(self.on_seconds * samplerate), int((self.on_seconds + self.off_seconds) * samplerate))
+        position = 0
+        while total is None or position < total:
+            sample_index = position + offsets
+            tone = self.tone_level * np.sin(phase_step * sample_index)
+            if period is not None:
+                tone *= sample_index % period[1] < period[0]
+            block = tone + self.noise_level * rng.standard_normal(blocksize)
+            yield block.astype(np.float32).reshape(-1, 1)
+            position += blocksize
+
+    def __str__(self):
+        return "synthetic"
+
+
+# --- Engine ---
+
+class AudioEngine:
+    """
+    Runs audio blocks through `processors` (objects with add_block(indata) and
+    configure(samplerate, blocksize), like LoudnessMonitor). The source is
+    the microphone (an input-only PortAudio stream) by default, or a WAV
+    path / WavSource / SyntheticSource fed from a thread, in real time or,
+    with realtime=False, as fast as the processors go.
+
+    start(), stop() and reconfigure() may be called at any time.
+    `overflows` counts input overflows (xruns): blocks PortAudio dropped
+    because the callback fell behind, or, for simulated sources, times
+    processing fell more than a block behind real time.
+    """
+    def __init__(self, processors, source=None, samplerate=None, blocksize=BLOCKSIZE, latency=LATENCY,
+                 device=None, channels=1, realtime=True):
+        self.processors = list(processors)
+        self.source = WavSource(source) if isinstance(source, str) else source
+        self.requested_samplerate = samplerate
+        self.samplerate = None
+        self.blocksize = blocksize
+        self.latency = latency
+        self.device = device
+        self.channels = channels
+        self.realtime = realtime
+        self.blocks = 0
+        self.overflows = 0
+        self._lock = threading.Lock()
+        self._stream = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Opens the source and starts delivering blocks. No-op if already running."""
+        with self._lock:
+            if self.is_running():
+                return
+            self.samplerate = self._resolve_samplerate()
+            for processor in self.processors:
+                processor.configure(self.samplerate, self.blocksize)
+            if self.source is None:
+                sd = _sounddevice()
+                self._stream = sd.InputStream(samplerate=self.samplerate, blocksize=self.blocksize,
+                                              latency=self.latency, device=self.device, channels=self.channels,
+                                              dtype="float32", callback=self._on_audio)
+                self._stream.start()
+            else:
+                self._stop.clear()
+                blocks = self.source.blocks(self.samplerate, self.blocksize)
+                self._thread = threading.Thread(target=self._feed, args=(blocks,), name="AudioEngine", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stops delivering blocks and releases the device. Safe to call repeatedly."""
+        with self._lock:
+            if self._stream is not None:
+                stream, self._stream = self._stream, None
+                stream.stop()
+                stream.close()
+            if self._thread is not None:
+                self._stop.set()
+                if self._thread is not threading.current_thread():
+                    self._thread.join(timeout)
+                self._thread = None
+
+    def reconfigure(self, **settings):
+        """
+        Changes samplerate, blocksize, latency, device, channels, realtime or
+        source (restarting if running). Processors are re-configured for the
+        new block rate.
+        """
+        running = self.is_running()
+        self.stop()
+        for name, value in settings.items():
+            if name == "samplerate":
+                self.requested_samplerate = value
+            elif name == "source":
+                self.source = WavSource(value) if isinstance(value, str) else value
+            elif name in ("blocksize", "latency", "device", "channels", "realtime"):
+                setattr(self, name, value)
+            else:
+                raise TypeError(f"unknown audio setting: {name}")
+        if running:
+            self.start()
+
+    def is_running(self):
+        if self._stream is not None:
+            return self._stream.active
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Blocks until a finite source (e.g. a WAV file) has been played out."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        latency = self._stream.latency if self._stream is not None else self.latency
+        return {
+            "source": "microphone" if self.source is None else str(self.source),
+            "running": self.is_running(),
+            "samplerate": self.samplerate,
+            "blocksize": self.blocksize,
+            "latency": latency,
+            "blocks": self.blocks,
+            "overflows": self.overflows,
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _resolve_samplerate(self):
+        fixed = getattr(self.source, "samplerate", None)
+        if fixed:
+            return fixed  # A file plays at its own rate
+        if self.requested_samplerate:
+            return self.requested_samplerate
+        if self.source is None:
+            return _sounddevice().query_devices(self.device, "input")["default_samplerate"]
+        return SYNTHETIC_SAMPLERATE
+
+    def _dispatch(self, indata):
+        self.blocks += 1
+        with instrument.span("audio_block"):
+            for processor in self.processors:
+                processor.add_block(indata)
+
+    def _on_audio(self, indata, frames, time_info, status):
+        """PortAudio callback thread: keep this allocation-free."""
+        if status.input_overflow:
+            self.overflows += 1
+        self._dispatch(indata)
+
+    def _feed(self, blocks):
+        block_seconds = self.blocksize / self.samplerate
+        deadline = time.perf_counter()
+        for block in blocks:
+            if self.realtime:
+                # A real device hands a block over once it has been recorded
+                deadline += block_seconds
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    if self._stop.wait(delay):
+                        return
+                elif delay < -block_seconds:
+                    # The device buffer would have overflowed; drop the backlog like PortAudio does
+                    self.overflows += 1
+                    deadline = time.perf_counter()
+            if self._stop.is_set():
+                return
+            self._dispatch(block)
 
-        count = 0
 
-def sound(alert_manager, audio_state):
-    """Starts listening to the microphone and updates shared state."""
-    # Use a lambda to pass the shared state objects to the callback.
-    with sd.Stream(callback=lambda indata, outdata, frames, time, status: _audio_callback(indata, outdata, frames, time, status, alert_manager, audio_state)):
-        sd.sleep(-1)
+def start_listening(audio_state, source=None, **settings):
+    """
+    Starts the loudness check and the speech detector on `source` (the
+    microphone by default) in the background, updating audio_state
+    ("is_cheating", "audio_level", "speech_probability", "is_speaking"). Returns the
+    running AudioEngine, or None if no audio input is available.
+    """
+    import vad  # vad builds on this module
+    processors = [LoudnessMonitor(SYNTHETIC_SAMPLERATE, state=audio_state),
+                  vad.SpeechDetector(SYNTHETIC_SAMPLERATE, state=audio_state)]
+    engine = AudioEngine(processors, source=source, **settings)
+    try:
+        engine.start()
+    except Exception as e:
+        print(f"❌ Error: Could not start audio input, continuing without audio: {e}")
+        return None
+    return engine
 
 if __name__ == "__main__":
     pass # This module is not meant to be run directly
@@ -0,0 +1,62 @@
+"""
+Runs the audio processing chain without a microphone: a synthetic (or WAV)
+source feeds AudioEngine as fast as the processors go, then in real time
+with a busy thread competing for the CPU, counting overflows.
+
+Usage (from src/):
+    python -m benchmarks.audio_engine
+    python -m benchmarks.audio_engine --wav exam.wav --blocksize 512
+"""
+import argparse
+import threading
+import time
+
+import audio
+
+DEFAULT_SECONDS = 600
+REALTIME_SECONDS = 5
+
+
+def _burn(stop):
+    """Keeps one core busy in Python, like video inference holding the GIL between NumPy calls."""
+    while not stop.is_set():
+        sum(range(10_000))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio engine on generated or recorded audio.")
+    parser.add_argument("--wav", help="use this WAV file instead of generated audio")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS, help="seconds of generated audio")
+    parser.add_argument("--samplerate", type=int, default=audio.SYNTHETIC_SAMPLERATE)
+    parser.add_argument("--blocksize", type=int, default=audio.BLOCKSIZE)
+    args = parser.parse_args(argv)
+
+    def source(seconds):
+        return audio.WavSource(args.wav) if args.wav else audio.SyntheticSource(seconds=seconds, on_seconds=2, off_seconds=3)
+
+    monitor = audio.LoudnessMonitor(args.samplerate)
+    engine = audio.AudioEngine([monitor], source=source(args.seconds), samplerate=args.samplerate,
+                               blocksize=args.blocksize, realtime=False)
+    start = time.perf_counter()
+    engine.start()
+    engine.wait()
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    audio_seconds = stats["blocks"] * stats["blocksize"] / stats["samplerate"]
+    print(f"{stats['source']}: {stats['blocks']} blocks of {stats['blocksize']} at {stats['samplerate']} Hz")
+    print(f"Offline: {elapsed * 1e6 / stats['blocks']:.1f} us/block, {audio_seconds / elapsed:.0f}x real time")
+
+    stop = threading.Event()
+    burner = threading.Thread(target=_burn, args=(stop,), daemon=True)
+    burner.start()
+    engine.reconfigure(source=source(REALTIME_SECONDS), realtime=True)
+    engine.blocks = engine.overflows = 0
+    engine.start()
+    engine.wait(REALTIME_SECONDS * 2)
+    engine.stop()
+    stop.set()
+    print(f"Real time under CPU load: {engine.blocks} blocks, {engine.overflows} overflows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares object-detector backends on the same clip: model load time,
+memory, per-frame latency and how many frames had a prohibited object.
+Backends whose model files are missing are reported and skipped.
+
+Usage (from src/):
+    python -m benchmarks.detector_backends --source exam.mp4
+    python -m benchmarks.detector_backends --backends yolov3 yolov3-tiny --size 256
+"""
+import argparse
+import gc
+import resource
+import time
+
+import numpy as np
+
+import frame_source
+import object_detection
+
+DEFAULT_FRAMES = 50
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_frames(spec, max_frames):
+    """Decodes the clip once so every backend sees identical frames."""
+    with frame_source.open_source(spec, count=max_frames) as source:
+        frames = []
+        for frame in source:
+            frames.append(frame)
+            if len(frames) >= max_frames:
+                break
+    return frames
+
+
+def bench_backend(name, frames, input_size=None):
+    gc.collect()
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    detector = object_detection.load_detector(name, input_size)
+    load_seconds = time.perf_counter() - start
+    if detector is None:
+        return None
+
+    detector.find_objects(frames[0])  # warm up
+    latencies = []
+    hits = 0
+    for frame in frames:
+        start = time.perf_counter()
+        detections = detector.find_objects(frame)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(detections)
+
+    latencies = np.array(latencies) * 1000
+    stats = {
+        "backend": name,
+        "input_size": detector.input_size,
+        "load_s": load_seconds,
+        "memory_mb": rss_mb() - rss_before,
+        "mean_ms": latencies.mean(),
+        "p95_ms": np.percentile(latencies, 95),
+        "frames_with_objects": hits,
+    }
+    del detector
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare object-detector backends.")
+    parser.add_argument("--source", default="synthetic:1280x720", help="clip to run on (see frame_source.open_source)")
+    parser.add_argument("--backends", nargs="+", default=list(object_detection.DETECTOR_BACKENDS))
+    parser.add_argument("--size", type=int, help="override every backend's input size")
+    parser.add_argument("--max-frames", type=int, default=DEFAULT_FRAMES)
+    args = parser.parse_args(argv)
+
+    frames = read_frames(args.source, args.max_frames)
+    print(f"{len(frames)} frames from {args.source}\n")
+    print(f"{'backend':<14} {'size':>5} {'load s':>7} {'mem MB':>7} {'mean ms':>8} {'p95 ms':>8} {'hits':>5}")
+    for name in args.backends:
+        stats = bench_backend(name, frames, args.size)
+        if stats is None:
+            print(f"{name:<14} (skipped)")
+            continue
+        print(f"{stats['backend']:<14} {stats['input_size']:>5} {stats['load_s']:>7.2f} {stats['memory_mb']:>7.0f} "
+              f"{stats['mean_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['frames_with_objects']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares the per-frame colour-conversion and display path of the GUI before
+and after the frame buffer was made reusable: latency and NumPy/OpenCV
+memory allocated per frame (tracemalloc; PIL's own copy for Tk is the same
+in both paths and not counted), on synthetic frames. FaceMesh and YOLO are left out so only the
+conversions, a typical overlay and the hand-off to PIL are measured.
+
+Usage (from src/):
+    python -m benchmarks.display_path
+    python -m benchmarks.display_path --sizes 1280x720 1920x1080 --frames 200
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import pipeline
+
+DEFAULT_SIZES = ["1280x720", "1920x1080"]
+DEFAULT_FRAMES = 100
+
+
+def draw_overlay(image, color):
+    """Stand-in for the GUI overlays, identical for both paths."""
+    h, w, _ = image.shape
+    cv2.rectangle(image, (w // 10, h - 40), (w * 9 // 10, h - 20), color, -1)
+    cv2.putText(image, "Suspicion Level: 42%", (w // 10, h - 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+
+def legacy_path(frame, state):
+    """flip, BGR->RGB for FaceMesh, RGB->BGR to draw on, BGR->RGB again for Tk."""
+    rgb_image = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+    image = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
+    draw_overlay(image, (0, 0, 255))
+    return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+def buffered_path(frame, state):
+    """One flip + convert into a reused RGB buffer, drawn on and displayed as is."""
+    state["buffer"] = image = pipeline.mirror_to_rgb(frame, state.get("buffer"))
+    draw_overlay(image, (255, 0, 0))
+    return Image.fromarray(image)
+
+
+def bench_path(path, frames):
+    """Returns (mean ms per frame, mean MB allocated per frame)."""
+    state = {}
+    path(frames[0], state)  # warm up (and allocate the reused buffer)
+    allocated = 0
+    tracemalloc.start()
+    for frame in frames:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        path(frame, state)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    # tracemalloc slows allocation down, so time the paths again without it
+    start = time.perf_counter()
+    for frame in frames:
+        path(frame, state)
+    seconds = time.perf_counter() - start
+    return seconds / len(frames) * 1000, allocated / len(frames) / 2 ** 20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the frame conversion/display path.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="frame sizes as WxH")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':<10} {'path':<9} {'ms/frame':>9} {'MB alloc/frame':>15}")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        # A few distinct frames, cycled, so the source is not always in cache
+        distinct = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        frames = [distinct[i % len(distinct)] for i in range(args.frames)]
+
+        reference = np.asarray(legacy_path(frames[0], {}))
+        if not np.array_equal(np.asarray(buffered_path(frames[0], {})), reference):
+            print(f"{size:<10} ❌ Error: buffered path output differs from the legacy path")
+        for name, path in (("legacy", legacy_path), ("buffered", buffered_path)):
+            ms, mb = bench_path(path, frames)
+            print(f"{size:<10} {name:<9} {ms:>9.2f} {mb:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
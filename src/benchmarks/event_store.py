@@ -0,0 +1,93 @@
+"""
+Fills a scratch event store with synthetic sessions and times the reviewer
+queries: one event type for one session in a time window, a session
+summary and the session list.
+
+Usage (from src/):
+    python -m benchmarks.event_store
+    python -m benchmarks.event_store --events 5000000 --db /tmp/events.db
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import event_store
+
+DEFAULT_EVENTS = 2_000_000
+EVENT_TYPES = ["looking_away", "speaking", "object_detected", "gaze_off_center", "long_blink", "multiple_faces"]
+EVENTS_PER_SESSION = 2_000
+BATCH = 50_000
+
+
+def fill(conn, total, seed=0):
+    """Inserts `total` events across total / EVENTS_PER_SESSION sessions. Returns events/second."""
+    rng = np.random.default_rng(seed)
+    start_time = time.time() - 365 * 86400
+    start = time.perf_counter()
+    for offset in range(0, total, BATCH):
+        n = min(BATCH, total - offset)
+        ids = np.arange(offset, offset + n)
+        sessions = ids // EVENTS_PER_SESSION
+        times = start_time + sessions * 3 * 3600 + (ids % EVENTS_PER_SESSION) * 5.0
+        events = rng.integers(0, len(EVENT_TYPES), n)
+        scores = rng.random(n)
+        event_store.insert_events(conn, [
+            {"time": t, "session": f"s{s}", "user": f"u{s % 500}", "event": EVENT_TYPES[e],
+             "message": EVENT_TYPES[e], "score": sc}
+            for t, s, e, sc in zip(times.tolist(), sessions.tolist(), events.tolist(), scores.tolist())
+        ])
+    return total / (time.perf_counter() - start)
+
+
+def time_query(fn, repeats=20):
+    fn()  # warm the page cache
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - start) / repeats * 1000, len(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite event store.")
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENTS)
+    parser.add_argument("--db", help="database file (default: a temporary file, deleted afterwards)")
+    args = parser.parse_args(argv)
+
+    tmp_dir = None
+    path = args.db
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "events.db")
+    conn = event_store.connect(path)
+    existing = conn.execute("SELECT count(*) FROM events").fetchone()[0]
+    if existing < args.events:
+        rate = fill(conn, args.events - existing, seed=existing)
+        print(f"Inserted {args.events - existing} events ({rate:,.0f} events/s)")
+    total = conn.execute("SELECT count(*) FROM events").fetchone()[0]
+    print(f"{total:,} events, {os.path.getsize(path) / 2 ** 20:.0f} MB\n")
+
+    session = "s%d" % (total // EVENTS_PER_SESSION // 2)
+    first = conn.execute("SELECT min(time) FROM events WHERE session = ?", (session,)).fetchone()[0]
+    queries = [
+        ("multiple_faces in a session window", lambda: event_store.query_events(
+            conn, session=session, event="multiple_faces", since=first + 1800, until=first + 5400)),
+        ("all events of a session", lambda: event_store.query_events(conn, session=session)),
+        ("session summary", lambda: event_store.session_summary(conn, session)),
+        ("sessions of one user", lambda: event_store.list_sessions(conn, user="u7")),
+        ("all sessions", lambda: event_store.list_sessions(conn)),
+    ]
+    print(f"{'query':<36} {'ms':>8} {'rows':>7}")
+    for name, fn in queries:
+        ms, rows = time_query(fn)
+        print(f"{name:<36} {ms:>8.2f} {rows:>7}")
+
+    conn.close()
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Load generator for the frame-ingest API (app.py + ingest.py): logs in,
+opens many candidate sessions and uploads JPEG frames from each at a
+target rate, as many proctored candidates would. Reports accepted,
+rate-limited (429) and refused (503) uploads and the analysis latency of
+the frames, from upload to result.
+
+Start the server first (from src/):
+    PROCTORING_WORKERS=4 python app.py
+Then:
+    python -m benchmarks.ingest_load --sessions 24 --fps 5 --seconds 60 --source exam.mp4
+    python -m benchmarks.ingest_load --url http://proctor.local:5001 --sessions 50
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import cv2
+import numpy as np
+
+import frame_source
+
+DEFAULT_URL = "http://127.0.0.1:5001"
+DEFAULT_SESSIONS = 8
+DEFAULT_FPS = 5.0
+DEFAULT_SECONDS = 30.0
+DEFAULT_FRAMES = 100          # Frames read from the source and cycled
+JPEG_QUALITY = 80
+# A mock account from app.py
+DEFAULT_USERNAME = "john.doe@example.com"
+DEFAULT_PASSWORD = "studentpass123"
+DEFAULT_ROLE = "Student"
+
+
+def call(method, url, token=None, body=None, content_type="application/json", timeout=10.0):
+    """One HTTP request. Returns (status, JSON body)."""
+    headers = {"Content-Type": content_type}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if isinstance(body, dict):
+        body = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        try:
+            return e.code, json.loads(e.read() or b"{}")
+        except ValueError:
+            return e.code, {}
+
+
+def load_frames(spec, count, width):
+    """JPEG-encoded frames from a frame_source spec, resized to `width`."""
+    frames = []
+    with frame_source.open_source(spec, count) as source:
+        for frame in source:
+            h, w = frame.shape[:2]
+            if w != width:
+                frame = cv2.resize(frame, (width, round(h * width / w)), interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if ok:
+                frames.append(jpeg.tobytes())
+            if len(frames) >= count:
+                break
+    return frames
+
+
+class Candidate(threading.Thread):
+    """One simulated candidate: a session uploading frames at `fps` until `deadline`."""
+    def __init__(self, url, login_token, frames, fps, deadline, offset):
+        super().__init__(daemon=True)
+        self.url = url
+        self.login_token = login_token
+        self.frames = frames
+        self.fps = fps
+        self.deadline = deadline
+        self.offset = offset
+        self.counts = {"sent": 0, "accepted": 0, "rate_limited": 0, "busy": 0, "failed": 0}
+        self.request_ms = []
+        self.latencies_ms = []
+        self.final = None
+        self.error = None
+
+    def run(self):
+        status, body = call("POST", f"{self.url}/api/sessions", self.login_token)
+        if status != 201:
+            self.error = f"could not start a session: {status} {body.get('error')}"
+            return
+        session, token = body["session"], body["token"]
+        frames_url = f"{self.url}/api/sessions/{session}/frames"
+        seen = set()
+        # Spread the candidates' upload times over one frame interval
+        next_time = time.monotonic() + self.offset / self.fps
+        i = int(self.offset * len(self.frames))  # Candidates start at different frames
+        while next_time < self.deadline:
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            next_time += 1 / self.fps
+            speech = 0.8 if (i // 50) % 4 == 0 else 0.05  # Talks now and then
+            query = f"?t={time.time():.3f}&speech={speech}&audio_level={30 * speech:.1f}"
+            start = time.perf_counter()
+            status, body = call("POST", frames_url + query, token, self.frames[i % len(self.frames)], "image/jpeg")
+            self.request_ms.append((time.perf_counter() - start) * 1000)
+            self.counts["sent"] += 1
+            i += 1
+            if status == 202:
+                self.counts["accepted"] += 1
+                latest = body.get("latest")
+                if latest and latest["seq"] not in seen:
+                    seen.add(latest["seq"])
+                    self.latencies_ms.append(latest["latency_ms"])
+            elif status == 429:
+                self.counts["rate_limited"] += 1
+            elif status == 503:
+                self.counts["busy"] += 1
+            else:
+                self.counts["failed"] += 1
+        time.sleep(1.0)  # Let the last frames finish
+        _, self.final = call("DELETE", f"{self.url}/api/sessions/{session}", token)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the frame-ingest API with simulated candidates.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="upload rate per session")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS)
+    parser.add_argument("--source", default="synthetic:640x480", help="frame_source spec (e.g. a video file)")
+    parser.add_argument("--width", type=int, default=640, help="width frames are uploaded at")
+    parser.add_argument("--username", default=DEFAULT_USERNAME)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--role", default=DEFAULT_ROLE)
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.source, DEFAULT_FRAMES, args.width)
+    if not frames:
+        print(f"❌ Error: no frames could be read from {args.source}")
+        return 1
+    try:
+        status, body = call("POST", f"{args.url}/api/login",
+                            body={"username": args.username, "password": args.password, "role": args.role})
+    except urllib.error.URLError as e:
+        print(f"❌ Error: cannot reach {args.url}: {e.reason}")
+        return 1
+    if status != 200:
+        print(f"❌ Error: login failed: {body.get('error')}")
+        return 1
+
+    print(f"{args.sessions} sessions x {args.fps:g} fps for {args.seconds:g}s, "
+          f"{np.mean([len(f) for f in frames]) / 1024:.0f} KB frames")
+    deadline = time.monotonic() + args.seconds
+    candidates = [Candidate(args.url, body["token"], frames, args.fps, deadline, k / args.sessions)
+                  for k in range(args.sessions)]
+    start = time.monotonic()
+    for candidate in candidates:
+        candidate.start()
+    for candidate in candidates:
+        candidate.join()
+    elapsed = time.monotonic() - start
+
+    for candidate in candidates:
+        if candidate.error:
+            print(f"❌ Error: {candidate.error}")
+    counts = {key: sum(c.counts[key] for c in candidates) for key in candidates[0].counts}
+    processed = sum(c.final["frames"]["processed"] for c in candidates if c.final and "frames" in c.final)
+    request_ms = [ms for c in candidates for ms in c.request_ms]
+    latencies = [ms for c in candidates for ms in c.latencies_ms]
+    print(f"Uploads: {counts['sent']} sent, {counts['accepted']} accepted, {counts['rate_limited']} rate-limited, "
+          f"{counts['busy']} refused (busy), {counts['failed']} failed")
+    print(f"Analysed: {processed} frames, {processed / elapsed:.1f} frames/s "
+          f"({processed / elapsed / max(1, args.sessions):.2f} per session)")
+    print(f"Upload request: p50 {percentile(request_ms, 50):.1f} ms, p95 {percentile(request_ms, 95):.1f} ms")
+    print(f"Upload to result: p50 {percentile(latencies, 50):.0f} ms, p95 {percentile(latencies, 95):.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
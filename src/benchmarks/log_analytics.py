@@ -0,0 +1,95 @@
+"""
+Generates a large proctoring_log.txt-format archive and runs log_analytics
+on it, reporting throughput and peak memory. Memory should stay flat however
+large --size-mb is, since files are parsed chunk by chunk.
+
+Usage (from src/):
+    python -m benchmarks.log_analytics                    # one 2 GB file
+    python -m benchmarks.log_analytics --size-mb 4096 --files 4 --workers 4
+    python -m benchmarks.log_analytics --dir /data/bench --keep
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import detection
+import log_analytics
+
+DEFAULT_SIZE_MB = 2048
+BLOCK_LINES = 200_000
+MESSAGES = np.array(list(detection.EVENT_MESSAGES.values()))
+# Seconds between alerts: mostly bursts within an exam, occasionally a gap to the next exam
+GAPS = np.array([1, 2, 3, 5, 10, 30, 90, 4 * 3600])
+GAP_WEIGHTS = np.array([0.25, 0.2, 0.15, 0.15, 0.1, 0.1, 0.0499, 0.0001])
+
+
+def generate(path, size_mb, seed=0):
+    """Writes alert lines with increasing timestamps until the file reaches size_mb."""
+    rng = np.random.default_rng(seed)
+    now = np.datetime64("2024-01-01T08:00:00", "s")
+    target = size_mb * 2 ** 20
+    written = 0
+    with open(path, "w") as f:
+        while written < target:
+            gaps = rng.choice(GAPS, BLOCK_LINES, p=GAP_WEIGHTS).cumsum()
+            times = np.datetime_as_string(now + gaps.astype("timedelta64[s]"))
+            now += np.timedelta64(int(gaps[-1]), "s")
+            stamps = np.char.replace(times, "T", " ")
+            messages = MESSAGES[rng.integers(0, len(MESSAGES), BLOCK_LINES)]
+            block = "\n".join(np.char.add(np.char.add(stamps, " - ALERT: "), messages).tolist()) + "\n"
+            f.write(block)
+            written += len(block)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of finished worker processes, in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark log_analytics on a generated archive.")
+    parser.add_argument("--size-mb", type=int, default=DEFAULT_SIZE_MB, help="total archive size")
+    parser.add_argument("--files", type=int, default=1, help="split the archive over this many files")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--dir", help="where to write the archive (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="keep (and reuse) the generated files")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="log_bench_")
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"proctoring_log_{i}.txt") for i in range(args.files)]
+    per_file_mb = args.size_mb / args.files
+    start = time.perf_counter()
+    for i, path in enumerate(paths):
+        if not (args.keep and os.path.exists(path)):
+            generate(path, per_file_mb, seed=i)
+    total_mb = sum(os.path.getsize(path) for path in paths) / 2 ** 20
+    print(f"Archive: {len(paths)} file(s), {total_mb:.0f} MB (ready in {time.perf_counter() - start:.1f}s)")
+
+    rss_before, _ = peak_rss_mb()
+    start = time.perf_counter()
+    results = log_analytics.analyse(paths, args.workers)
+    elapsed = time.perf_counter() - start
+    rss_after, rss_children = peak_rss_mb()
+
+    lines = sum(result["lines"] for result in results)
+    sessions = sum(len(result["sessions"]) for result in results)
+    bursts = sum(len(s["bursts"]) for result in results for s in result["sessions"])
+    print(f"{lines:,} lines, {sessions:,} sessions, {bursts:,} bursts")
+    print(f"{elapsed:.2f}s, {total_mb / elapsed:.0f} MB/s, {lines / elapsed / 1e6:.1f} M lines/s")
+    print(f"Peak RSS: {rss_after:.0f} MB in this process (was {rss_before:.0f} MB before analysis)"
+          + (f", {rss_children:.0f} MB per worker" if args.workers > 1 else ""))
+
+    if not args.keep:
+        shutil.rmtree(directory) if not args.dir else [os.remove(path) for path in paths]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Rescoring speed: generates synthetic sessions of per-frame detection
+signals and times scoring.tune() over several thresholds, against the
+per-frame ScoringEngine on a sample of them.
+
+Usage (from src/):
+    python -m benchmarks.scoring
+    python -m benchmarks.scoring --sessions 5000 --minutes 90
+"""
+import argparse
+import time
+
+import numpy as np
+
+import scoring
+
+DEFAULT_SESSIONS = 1000
+DEFAULT_MINUTES = 60
+FPS = 15
+MEAN_RUN_FRAMES = 45   # Frames a detection typically stays on or off
+THRESHOLDS = [0.3, 0.4, 0.5, 0.6, 0.7]
+
+
+def make_session(rng, frames):
+    """Signals that switch on and off at random, like real detections flicker."""
+    signals = {}
+    for name in scoring.signal_names():
+        flips = rng.random(frames) < 1 / (MEAN_RUN_FRAMES * rng.uniform(0.5, 4))
+        signals[name] = (np.cumsum(flips) % 2).astype(np.float64)
+    return signals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batch rescoring of recorded sessions.")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--minutes", type=float, default=DEFAULT_MINUTES, help="length of each session")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    frames = int(args.minutes * 60 * FPS)
+    sessions = [make_session(rng, frames) for _ in range(args.sessions)]
+    total = frames * args.sessions
+    print(f"{args.sessions} sessions x {frames} frames = {total:,} frames")
+
+    start = time.perf_counter()
+    report = scoring.tune(sessions, THRESHOLDS)
+    batch = time.perf_counter() - start
+    print(f"Batch: {batch:.2f}s for {len(THRESHOLDS)} thresholds ({total / batch / 1e6:.1f} M frames/s)")
+    for row in report:
+        print(f"  thresh {row['thresh']:.2f}: {row['sessions_flagged']} flagged, {row['episodes']} episodes")
+
+    sample = sessions[:max(1, args.sessions // 100)]
+    start = time.perf_counter()
+    for signals in sample:
+        engine = scoring.ScoringEngine()
+        names = list(signals)
+        for row in zip(*(signals[name].tolist() for name in names)):
+            engine.update(dict(zip(names, row)))
+    per_frame = (time.perf_counter() - start) / (frames * len(sample))
+    print(f"Per frame: {per_frame * 1e6:.2f} us/frame, ~{per_frame * total:.0f}s for all sessions "
+          f"({per_frame * total / batch:.0f}x slower, one threshold)")
+
+
+if __name__ == "__main__":
+    main()
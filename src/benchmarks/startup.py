@@ -0,0 +1,110 @@
+"""
+Measures application start-up: how long the imports take, how long each
+model takes to load, and how long the first frames take to process. Every
+run happens in a fresh interpreter so import and load times are cold.
+
+Usage (from src/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --source exam.mp4 --runs 5 --no-objects
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_RUNS = 3
+STEADY_FRAMES = 20
+
+# Stages in the order they are reported
+STAGES = [
+    ("import_libs_s", "import cv2 / numpy / mediapipe"),
+    ("import_app_s", "import pipeline modules"),
+    ("pipeline_init_s", "FramePipeline()"),
+    ("first_frame_s", "first frame (no detector)"),
+    ("detector_load_s", "object detector load"),
+    ("first_detect_frame_s", "first frame with detector"),
+    ("steady_frame_s", "steady-state frame"),
+]
+
+
+def measure(source_spec, detect_objects):
+    """One cold start, in this interpreter. Returns {stage: seconds}."""
+    timings = {}
+    start = time.perf_counter()
+    import cv2  # noqa: F401
+    import mediapipe  # noqa: F401
+    timings["import_libs_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import frame_source
+    import object_detection
+    import pipeline
+    timings["import_app_s"] = time.perf_counter() - start
+
+    with frame_source.open_source(source_spec, count=STEADY_FRAMES + 2) as source:
+        frames = [frame for _, frame in zip(range(STEADY_FRAMES + 2), source)]
+
+    # The detector is measured on its own, so the first frame shows what the
+    # user sees while the weights are still loading in the background.
+    start = time.perf_counter()
+    frame_pipeline = pipeline.FramePipeline(detect_objects=False)
+    timings["pipeline_init_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame_pipeline.process(frames[0])
+    timings["first_frame_s"] = time.perf_counter() - start
+
+    if detect_objects:
+        start = time.perf_counter()
+        object_detection.detector_model.get()
+        timings["detector_load_s"] = time.perf_counter() - start
+        frame_pipeline.detect_objects = True
+
+        start = time.perf_counter()
+        frame_pipeline.process(frames[1])
+        timings["first_detect_frame_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in frames[2:]:
+        frame_pipeline.process(frame)
+    timings["steady_frame_s"] = (time.perf_counter() - start) / max(1, len(frames) - 2)
+    frame_pipeline.close()
+    return timings
+
+
+def run_child(source_spec, detect_objects):
+    """Runs measure() in a fresh interpreter and returns its timings."""
+    cmd = [sys.executable, "-m", "benchmarks.startup", "--child", "--source", source_spec]
+    if not detect_objects:
+        cmd.append("--no-objects")
+    output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    # The result is the last line; the libraries may log before it.
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start-up and first-frame times.")
+    parser.add_argument("--source", default="synthetic:640x480", help="frames to process (see frame_source.open_source)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="cold starts to take the median of")
+    parser.add_argument("--no-objects", action="store_true", help="skip the object detector")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.source, not args.no_objects)))
+        return
+
+    runs = [run_child(args.source, not args.no_objects) for _ in range(args.runs)]
+    print(f"Median of {len(runs)} cold starts on {args.source}\n")
+    print(f"{'stage':<32} {'ms':>9}")
+    for key, label in STAGES:
+        values = [run[key] for run in runs if key in run]
+        if values:
+            print(f"{label:<32} {np.median(values) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
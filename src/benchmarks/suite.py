@@ -0,0 +1,381 @@
+"""
+Benchmark suite for every detection module, on synthetic inputs only (no
+camera, microphone, display or model files): landmark sets for eye gaze
+and head pose, canned YOLO outputs and random frames for object
+detection, generated audio blocks for the loudness monitor and the speech
+detector, detection-result streams for detection.process and alert
+bursts for AlertManager.
+
+Each case reports its latency per call (best of several rounds) and the
+memory it allocates per call (tracemalloc peak above the level before the
+call, and what is still held after all calls), and is checked against the
+regression budgets in budgets.json. The exit status is 1 if any budget is
+exceeded, so the suite can gate a CI job.
+
+Usage (from src/):
+    python -m benchmarks.suite
+    python -m benchmarks.suite --only eye_gaze head_pose --seconds 2
+    python -m benchmarks.suite --update-budgets   # after an intended change
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+import alerts
+import audio
+import detection
+import eye_gaze
+import head_pose
+import landmarks
+import object_detection
+import scoring
+import vad
+from benchmarks.yolo_postprocess import make_canned_outputs
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budgets.json")
+DEFAULT_SECONDS = 1.0   # Timing per case, split over ROUNDS
+ROUNDS = 5
+ALLOC_CALLS = 200       # Calls traced for the allocation figures
+# --update-budgets writes the measured figures times these, so noise between runs does not fail them
+TIME_HEADROOM = 3.0
+ALLOC_HEADROOM = 1.5
+ALLOC_SLACK_KB = 1.0
+
+FRAME_W, FRAME_H = 640, 480
+NUM_LANDMARKS = 478     # FaceMesh with refined (iris) landmarks
+VARIANTS = 64           # Distinct inputs each case cycles through
+
+
+# --- Synthetic Inputs ---
+
+def make_poses(rng, count):
+    """(pitch, yaw, roll) in degrees drifting smoothly, as a head moves between frames."""
+    steps = rng.normal(0, 1.5, (count, 3))
+    return np.clip(np.cumsum(steps, axis=0), -30, 30)
+
+
+def make_landmarks(rng, angles):
+    """
+    An (N, 3) landmark array of a face at the given head pose: the pose
+    points are FACE_MODEL_3D projected through the frame's camera, eyes,
+    irises and mouth are built around them, everything else is scattered
+    over the face. Lid openings and iris positions vary, so blinks and
+    off-centre gazes occur.
+    """
+    points = np.empty((NUM_LANDMARKS, 3))
+    points[:, :2] = rng.uniform(0.35, 0.65, (NUM_LANDMARKS, 2))
+    points[:, 2] = rng.normal(0, 0.02, NUM_LANDMARKS)
+
+    rot_vec = cv2.Rodrigues(_rotation(*np.radians(angles)))[0]
+    cam_matrix, dist_matrix = head_pose.default_estimator.camera(FRAME_W, FRAME_H)
+    projected, _ = cv2.projectPoints(head_pose.FACE_MODEL_3D, rot_vec, np.array([0.0, 0.0, 600.0]),
+                                     cam_matrix, dist_matrix)
+    points[head_pose.POSE_LANDMARKS, :2] = projected.reshape(-1, 2) / (FRAME_W, FRAME_H)
+    nose = points[head_pose.POSE_LANDMARKS[0], :2]
+
+    for eye in eye_gaze._EYE_GATHER:
+        p2, p6, p3, p5, p1, p4 = eye[:6]
+        outer = p1 if p1 in head_pose.POSE_LANDMARKS else p4
+        inner = p4 if outer == p1 else p1
+        toward_nose = math.copysign(0.05, nose[0] - points[outer, 0])
+        points[inner, :2] = points[outer, :2] + (toward_nose, 0.0)
+        center = (points[p1, :2] + points[p4, :2]) / 2
+        opening = rng.choice([0.002, 0.012, 0.014])  # Closed now and then
+        for top, bottom, dx in ((p2, p6, -0.01), (p3, p5, 0.01)):
+            points[top, :2] = center + (dx, -opening)
+            points[bottom, :2] = center + (dx, opening)
+        iris = center + rng.normal(0, 0.008, 2)
+        points[eye[6:], :2] = iris + np.array([(0.004, 0), (0, -0.004), (-0.004, 0), (0, 0.004)])
+
+    mouth = nose + (0.0, 0.08)
+    opening = rng.uniform(0.0, 0.03)
+    p2, p10, p4, p8, p1, p7 = head_pose._MAR_POINTS
+    points[[p1, p7], :2] = mouth + np.array([(-0.04, 0.0), (0.04, 0.0)])
+    points[[p2, p4], :2] = mouth + np.array([(-0.01, -opening), (0.01, -opening)])
+    points[[p10, p8], :2] = mouth + np.array([(-0.01, opening), (0.01, opening)])
+    return points
+
+
+def _rotation(pitch, yaw, roll):
+    """R = Rz(roll) @ Ry(yaw) @ Rx(pitch), the convention head_pose reads angles back in."""
+    cx, sx, cy, sy, cz, sz = math.cos(pitch), math.sin(pitch), math.cos(yaw), math.sin(yaw), math.cos(roll), math.sin(roll)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def to_landmark_list(points):
+    """The NormalizedLandmarkList FaceMesh would return for these points."""
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in points.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z)
+    return landmark_list
+
+
+class _FaceMeshResults:
+    """Stand-in for FaceMesh.process() output: only multi_face_landmarks is read."""
+    def __init__(self, faces):
+        self.multi_face_landmarks = faces
+
+
+def make_face_stream(rng, count=VARIANTS):
+    """(points, NormalizedLandmarkList) of consecutive frames of one moving face."""
+    stream = []
+    for angles in make_poses(rng, count):
+        points = make_landmarks(rng, angles)
+        # Round-trip through float32 like FaceMesh output, so to_array returns these exact points
+        landmark_list = to_landmark_list(points)
+        stream.append((landmarks.to_array(landmark_list), landmark_list))
+    return stream
+
+
+def make_frames(rng, count=4, width=FRAME_W, height=FRAME_H):
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def make_detection_stream(rng, count=4096):
+    """Detection results that flicker on and off like real ones, with the continuous values alongside."""
+    names = scoring.signal_names()
+    flips = rng.random((count, len(names))) < 1 / 45
+    flags = (np.cumsum(flips, axis=0) % 2).tolist()
+    stream = []
+    for row in flags:
+        results = dict(zip(names, row))
+        results.update(pitch=float(rng.normal(0, 10)), yaw=float(rng.normal(0, 10)), roll=float(rng.normal(0, 3)),
+                       ear=0.3, mar=0.1, gaze_h=0.5, gaze_v=0.5, faces=1, object_conf=0.0,
+                       speech=float(rng.random()))
+        stream.append(results)
+    return stream
+
+
+def make_audio_blocks(samplerate, blocksize, count=VARIANTS):
+    source = audio.SyntheticSource(samplerate, seconds=count * blocksize / samplerate,
+                                   on_seconds=0.5, off_seconds=0.5)
+    return list(source.blocks(samplerate, blocksize))
+
+
+# --- Cases ---
+# Each setup builds its inputs and returns a no-argument function doing one call.
+
+def setup_to_array(rng):
+    lists = itertools.cycle([landmark_list for _, landmark_list in make_face_stream(rng)])
+    return lambda: landmarks.to_array(next(lists))
+
+
+def setup_eye_gaze(rng):
+    image = np.zeros((FRAME_H, FRAME_W, 3), dtype=np.uint8)
+    faces = itertools.cycle([points for points, _ in make_face_stream(rng)])
+    return lambda: eye_gaze.process_face_landmarks(image, next(faces))
+
+
+def setup_head_pose_estimate(rng):
+    estimator = head_pose.HeadPoseEstimator()
+    faces = itertools.cycle([points for points, _ in make_face_stream(rng)])
+    return lambda: estimator.estimate(next(faces), FRAME_W, FRAME_H)
+
+
+def setup_head_pose(rng):
+    """Full per-frame head_pose.pose(): contour drawing, MAR and pose, as the pipeline calls it."""
+    estimator = head_pose.HeadPoseEstimator()
+    image = make_frames(rng, 1)[0]
+    faces = itertools.cycle([(_FaceMeshResults([landmark_list]), points)
+                             for points, landmark_list in make_face_stream(rng)])
+
+    def call():
+        results, points = next(faces)
+        return head_pose.pose(image, results, None, points, estimator)
+    return call
+
+
+def setup_blob(rng):
+    """Detector.forward's preprocessing of an RGB frame at the default input size."""
+    size = object_detection.DETECTOR_BACKENDS["yolov3"]["input_size"]
+    frames = itertools.cycle(make_frames(rng))
+    return lambda: cv2.dnn.blobFromImage(next(frames), 1 / 255.0, (size, size), swapRB=False, crop=False)
+
+
+def setup_postprocess(rng):
+    outputs = itertools.cycle([make_canned_outputs(seed) for seed in range(8)])
+    return lambda: object_detection.postprocess_outputs(next(outputs), FRAME_W, FRAME_H)
+
+
+def setup_draw_detections(rng):
+    frames = itertools.cycle(make_frames(rng))
+    detections = [("cell phone", 0.91, (250, 180, 80, 140))]
+    return lambda: object_detection.draw_detections(next(frames), detections, rgb=True)
+
+
+def setup_loudness(rng):
+    monitor = audio.LoudnessMonitor(audio.SYNTHETIC_SAMPLERATE, audio.BLOCKSIZE, state={})
+    blocks = itertools.cycle(make_audio_blocks(audio.SYNTHETIC_SAMPLERATE, audio.BLOCKSIZE))
+    return lambda: monitor.add_block(next(blocks))
+
+
+def setup_speech(rng):
+    detector = vad.SpeechDetector(audio.SYNTHETIC_SAMPLERATE, audio.BLOCKSIZE, state={})
+    blocks = itertools.cycle(make_audio_blocks(audio.SYNTHETIC_SAMPLERATE, audio.BLOCKSIZE))
+    return lambda: detector.add_block(next(blocks))
+
+
+def setup_detection(rng):
+    """Scoring plus event logging and alerts for the rules that fire (to no log file)."""
+    detection.EVENT_LOG = None
+    alert_manager = alerts.AlertManager()
+    scorer = scoring.ScoringEngine()
+    stream = itertools.cycle(make_detection_stream(rng))
+    return lambda: detection.process(alert_manager, next(stream), scorer)
+
+
+def setup_alert_burst(rng):
+    """A burst of 32 alerts across the event types, then one poll, with alerts expiring between bursts."""
+    manager = alerts.AlertManager(display_duration=0.001)
+    burst = [(message, "❗") for message in detection.EVENT_MESSAGES.values()] * 6
+    burst = burst[:32]
+
+    def call():
+        for message, icon in burst:
+            manager.add_alert(message, icon)
+        return manager.get_alerts(time.time() + 1)
+    return call
+
+
+CASES = (
+    # name,                           setup
+    ("landmarks.to_array",            setup_to_array),
+    ("eye_gaze.process",              setup_eye_gaze),
+    ("head_pose.estimate",            setup_head_pose_estimate),
+    ("head_pose.pose",                setup_head_pose),
+    ("object_detection.blob",         setup_blob),
+    ("object_detection.postprocess",  setup_postprocess),
+    ("object_detection.draw",         setup_draw_detections),
+    ("audio.loudness_block",          setup_loudness),
+    ("vad.speech_block",              setup_speech),
+    ("detection.process",             setup_detection),
+    ("alerts.burst",                  setup_alert_burst),
+)
+
+
+# --- Measurement ---
+
+def measure(call, seconds=DEFAULT_SECONDS, rounds=ROUNDS, alloc_calls=ALLOC_CALLS):
+    """
+    Returns {"us": best-round microseconds per call, "alloc_kb": mean
+    tracemalloc peak per call in KB, "retained_kb": KB per call still held
+    after all traced calls (growth that looks like a leak)}.
+    """
+    # Warm up, and size the rounds from a rough per-call time
+    start = time.perf_counter()
+    warmup = 0
+    while warmup < 10 or time.perf_counter() - start < 0.05:
+        call()
+        warmup += 1
+    estimate = (time.perf_counter() - start) / warmup
+    calls = max(1, int(seconds / rounds / estimate))
+
+    best = math.inf
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        best = min(best, (time.perf_counter() - start) / calls)
+
+    # tracemalloc slows allocation down, so it is measured separately from the timing
+    peak_total = 0
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(alloc_calls):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return {
+        "us": best * 1e6,
+        "alloc_kb": peak_total / alloc_calls / 1024,
+        "retained_kb": max(0, retained) / alloc_calls / 1024,
+    }
+
+
+def load_budgets(path=BUDGETS_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def over_budget(figures, budget):
+    """The budget entries (names) that the figures exceed."""
+    return [key for key in ("us", "alloc_kb") if key in budget and figures[key] > budget[key]]
+
+
+def new_budget(figures):
+    return {
+        "us": float(f"{figures['us'] * TIME_HEADROOM:.3g}"),
+        "alloc_kb": float(f"{figures['alloc_kb'] * ALLOC_HEADROOM + ALLOC_SLACK_KB:.3g}"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every detection module on synthetic inputs.")
+    parser.add_argument("--only", nargs="+", metavar="PREFIX", help="run the cases whose names start with these")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS, help="timing per case")
+    parser.add_argument("--budgets", default=BUDGETS_PATH, help="regression budgets (JSON)")
+    parser.add_argument("--update-budgets", action="store_true",
+                        help=f"rewrite the budgets of the cases run from this run's figures "
+                             f"(x{TIME_HEADROOM:g} time, x{ALLOC_HEADROOM:g} memory)")
+    parser.add_argument("--json", help="also write the figures to this file")
+    args = parser.parse_args(argv)
+
+    cases = [(name, setup) for name, setup in CASES
+             if not args.only or any(name.startswith(prefix) for prefix in args.only)]
+    if not cases:
+        print(f"❌ Error: no cases match {', '.join(args.only)}. Cases: {', '.join(name for name, _ in CASES)}")
+        return 1
+    budgets = load_budgets(args.budgets)
+
+    print(f"{'case':<30} {'us/call':>10} {'budget':>9} {'KB alloc':>9} {'budget':>8} {'KB kept':>8}")
+    results = {}
+    failures = []
+    for name, setup in cases:
+        figures = results[name] = measure(setup(np.random.default_rng(0)), args.seconds)
+        budget = budgets.get(name, {})
+        exceeded = [] if args.update_budgets else over_budget(figures, budget)
+        if exceeded:
+            failures.append((name, exceeded))
+        status = "❌ over budget" if exceeded else ("" if budget or args.update_budgets else "(no budget)")
+        print(f"{name:<30} {figures['us']:>10.2f} {budget.get('us', '-'):>9} "
+              f"{figures['alloc_kb']:>9.2f} {budget.get('alloc_kb', '-'):>8} "
+              f"{figures['retained_kb']:>8.2f}  {status}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.update_budgets:
+        budgets.update({name: new_budget(figures) for name, figures in results.items()})
+        with open(args.budgets, "w", encoding="utf-8") as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n✅ Budgets of {len(results)} cases written to {args.budgets}")
+        return 0
+    if failures:
+        for name, exceeded in failures:
+            print(f"❌ Error: {name} exceeded its {' and '.join(exceeded)} budget")
+        return 1
+    print(f"\n✅ {len(results)} cases within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Batched YOLO inference: frames per second and time per batch of
+find_objects_batch at several batch sizes, against one find_objects call
+per frame, on random frames (as from several sessions). Checks that the
+batched detections equal the per-frame ones. Needs the detector's model
+files (see DETECTOR_BACKENDS); pick one with PROCTORING_DETECTOR.
+
+Usage (from src/):
+    python -m benchmarks.yolo_batch
+    PROCTORING_DETECTOR=yolov3-tiny python -m benchmarks.yolo_batch --batches 1 4 16 --frames 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+import object_detection
+
+DEFAULT_BATCHES = [1, 2, 4, 8]
+DEFAULT_FRAMES = 32
+FRAME_SIZE = (480, 640)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batched YOLO inference.")
+    parser.add_argument("--batches", type=int, nargs="+", default=DEFAULT_BATCHES, help="batch sizes")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="frames per measurement")
+    args = parser.parse_args(argv)
+
+    detector = object_detection.detector_model.get()
+    if detector is None:
+        return 1
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, FRAME_SIZE + (3,), dtype=np.uint8) for _ in range(args.frames)]
+    object_detection.find_objects(frames[0])  # warm up
+
+    start = time.perf_counter()
+    single = [object_detection.find_objects(frame) for frame in frames]
+    baseline = time.perf_counter() - start
+    print(f"{detector.name} at {detector.input_size}px, {args.frames} frames")
+    print(f"{'batch':>6} {'frames/s':>9} {'ms/batch':>9} {'speed-up':>9}")
+    print(f"{'single':>6} {args.frames / baseline:>9.1f} {baseline / args.frames * 1000:>9.1f} {1:>8.2f}x")
+    for batch in args.batches:
+        object_detection.find_objects_batch(frames[:batch], max_batch=batch)  # warm up this input shape
+        start = time.perf_counter()
+        batched = object_detection.find_objects_batch(frames, max_batch=batch)
+        elapsed = time.perf_counter() - start
+        batches = -(-args.frames // batch)
+        status = "" if batched == single else "  ❌ Error: detections differ from find_objects"
+        print(f"{batch:>6} {args.frames / elapsed:>9.1f} {elapsed / batches * 1000:>9.1f} "
+              f"{baseline / elapsed:>8.2f}x{status}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Microbenchmark for YOLO post-processing on canned network outputs.
+Compares the original per-row Python loop with the vectorised
+object_detection.postprocess_outputs.
+
+Usage (from src/):
+    python -m benchmarks.yolo_postprocess
+"""
+import time
+
+import cv2
+import numpy as np
+
+import object_detection
+
+# Output rows per YOLOv3 layer for a 320x320 input (3 anchors x 10^2, 20^2, 40^2)
+LAYER_ROWS = (300, 1200, 4800)
+FRAME_SIZE = (1280, 720)
+REPEATS = 200
+
+
+def make_canned_outputs(seed=0, num_classes=80, hits=12):
+    """
+    Builds layer outputs shaped like YOLOv3's: mostly background rows plus a
+    few confident rows, including a cell phone overlapping a person.
+    """
+    rng = np.random.default_rng(seed)
+    outputs = []
+    for rows in LAYER_ROWS:
+        out = np.zeros((rows, 5 + num_classes), dtype=np.float32)
+        out[:, :4] = rng.uniform(0.05, 0.95, size=(rows, 4))
+        out[:, 4] = rng.uniform(0, 0.05, size=rows)
+        # OpenCV zeroes class scores below its internal threshold
+        outputs.append(out)
+
+    big = outputs[-1]
+    phone_id = object_detection.CLASSES.index("cell phone") if "cell phone" in object_detection.CLASSES else 67
+    for k in range(hits):
+        row = rng.integers(0, len(big))
+        class_id = phone_id if k % 3 == 0 else int(rng.integers(0, num_classes))
+        objectness = rng.uniform(0.6, 0.99)
+        big[row, :4] = (0.5 + rng.uniform(-0.02, 0.02), 0.5, 0.2, 0.3)
+        big[row, 4] = objectness
+        big[row, 5 + class_id] = objectness * rng.uniform(0.8, 1.0)
+    return outputs
+
+
+def legacy_postprocess(layer_outputs, width, height):
+    """The original row-by-row loop from detect_objects, kept for comparison."""
+    classes = object_detection.CLASSES
+    boxes, confidences, class_ids = [], [], []
+
+    for output in layer_outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            if confidence > object_detection.CONF_THRESHOLD:
+                center_x, center_y, w, h = (detection[0:4] * np.array([width, height, width, height])).astype('int')
+                x, y = int(center_x - w / 2), int(center_y - h / 2)
+                boxes.append([x, y, int(w), int(h)])
+                confidences.append(float(confidence))
+                class_ids.append(class_id)
+
+    indices = cv2.dnn.NMSBoxes(boxes, confidences, object_detection.CONF_THRESHOLD, object_detection.NMS_THRESHOLD)
+    if len(indices) > 0:
+        for i in indices.flatten():
+            if classes[class_ids[i]] in object_detection.PROHIBITED_OBJECTS:
+                return [(classes[class_ids[i]], confidences[i], tuple(boxes[i]))]
+    return []
+
+
+def time_per_call(func, args, repeats=REPEATS):
+    """Returns the mean seconds per call over `repeats` calls."""
+    func(*args)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(*args)
+    return (time.perf_counter() - start) / repeats
+
+
+def run(repeats=REPEATS):
+    outputs = make_canned_outputs()
+    args = (outputs, *FRAME_SIZE)
+    legacy = time_per_call(legacy_postprocess, args, max(1, repeats // 10))
+    vectorised = time_per_call(object_detection.postprocess_outputs, args, repeats)
+    return {
+        "legacy_ms": legacy * 1000,
+        "vectorised_ms": vectorised * 1000,
+        "speedup": legacy / vectorised,
+        "legacy_result": legacy_postprocess(*args),
+        "vectorised_result": object_detection.postprocess_outputs(*args),
+    }
+
+
+if __name__ == "__main__":
+    stats = run()
+    print(f"Rows per frame:   {sum(LAYER_ROWS)}")
+    print(f"Legacy loop:      {stats['legacy_ms']:.3f} ms/frame -> {stats['legacy_result']}")
+    print(f"Vectorised:       {stats['vectorised_ms']:.3f} ms/frame -> {stats['vectorised_result']}")
+    print(f"Speedup:          {stats['speedup']:.1f}x")
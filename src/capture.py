@@ -0,0 +1,110 @@
+import threading
+import time
+
+
+class LatestFrameSlot:
+    """
+    Single-slot frame buffer. The producer always overwrites the slot, so the
+    consumer only ever sees the freshest frame; frames that were replaced
+    before being read are counted as dropped.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0          # Sequence number of the frame in the slot
+        self._read_seq = 0     # Sequence number of the last frame handed out
+        self.dropped = 0
+
+    def put(self, frame, timestamp=None):
+        """Stores a frame, replacing (and dropping) any unread one."""
+        with self._cond:
+            if self._seq != self._read_seq:
+                self.dropped += 1
+            self._frame = frame
+            self._timestamp = time.monotonic() if timestamp is None else timestamp
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=0):
+        """
+        Returns (frame, timestamp, seq) for a frame not yet returned, or None.
+        With timeout > 0 waits up to that many seconds for a new frame;
+        timeout=None waits indefinitely.
+        """
+        with self._cond:
+            if self._seq == self._read_seq and timeout != 0:
+                self._cond.wait_for(lambda: self._seq != self._read_seq, timeout)
+            if self._seq == self._read_seq:
+                return None
+            self._read_seq = self._seq
+            return self._frame, self._timestamp, self._seq
+
+    @property
+    def produced(self):
+        return self._seq
+
+
+class CaptureThread:
+    """
+    Continuously reads frames from a frame source (see frame_source.py) on a
+    background thread into a LatestFrameSlot, so a slow camera never blocks
+    the caller and analysis always works on the newest frame.
+    """
+    RETRY_DELAY = 0.01  # seconds to wait after a failed camera read
+
+    def __init__(self, source, stop_on_failure=False):
+        self.source = source
+        self.stop_on_failure = stop_on_failure  # True for files, where a failed read means EOF
+        self.slot = LatestFrameSlot()
+        self.read_failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                success, frame = self.source.read()
+                if not success:
+                    self.read_failures += 1
+                    if self.stop_on_failure:
+                        break
+                    time.sleep(self.RETRY_DELAY)
+                    continue
+                self.slot.put(frame)
+        finally:
+            self._stop.set()
+            # Released by the reading thread, so never under a read in progress
+            self.source.release()
+
+    def latest(self, timeout=0):
+        """Returns (frame, timestamp, seq) for the newest unread frame, or None."""
+        return self.slot.get(timeout)
+
+    def is_running(self):
+        return not self._stop.is_set()
+
+    def stats(self):
+        """Capture counters for diagnostics."""
+        return {
+            "captured": self.slot.produced,
+            "dropped": self.slot.dropped,
+            "read_failures": self.read_failures,
+        }
+
+    def stop(self, timeout=1.0):
+        """
+        Stops the thread, which releases the underlying source once its
+        current read returns: a hung camera is released only if the read
+        ever comes back, never underneath it.
+        """
+        self._stop.set()
+        if self._thread.ident is None:
+            # Never started
+            self.source.release()
+        elif self._thread.is_alive():
+            self._thread.join(timeout)
@@ -0,0 +1,188 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# --- Defaults ---
+# Logs live next to the code, not in whatever directory the app was started from.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(SCRIPT_DIR, "logs")
+DEFAULT_LOG_PATH = os.path.join(LOG_DIR, "events.jsonl")
+FLUSH_INTERVAL = 1.0       # Seconds a record may wait in memory before it is written
+MAX_BATCH = 256            # Records that trigger a write straight away
+MAX_PENDING = 100_000      # Records held in memory at most; the oldest are dropped beyond this
+MAX_BYTES = 10 * 2 ** 20   # Rotate the JSONL log once it would grow past this size
+BACKUP_COUNT = 5           # Rotated files kept: events.jsonl.1 (newest) ... events.jsonl.5
+
+
+class BatchingWriter:
+    """
+    Collects records in memory and writes them in batches on a background
+    thread, so write() never waits for the disk. A batch is written when
+    MAX_BATCH records are pending, otherwise every FLUSH_INTERVAL seconds,
+    and on flush() and close(). Subclasses implement
+    write_batch(records) and, optionally, close_sink(). log() builds the
+    event records, stamped with session_id and user_id.
+    """
+    session_id = None
+    user_id = None
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.written = 0
+        self.dropped = 0           # Records discarded because the writer fell too far behind
+        self._pending = collections.deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._flush_requested = 0  # Incremented by flush(); _flushed catches up once written
+        self._flushed = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """Queues one record (a dict). Cheap and non-blocking."""
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(record)
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def log(self, event_type, message, **fields):
+        """Queues one event. Extra fields (detection values, score...) are stored as given."""
+        record = {
+            "time": time.time(),
+            "session": self.session_id,
+            "user": self.user_id,
+            "event": event_type,
+            "message": message,
+        }
+        record.update(fields)
+        self.write(record)
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything written so far has reached the sink."""
+        with self._cond:
+            self._flush_requested += 1
+            target = self._flush_requested
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self._flushed >= target or not self._thread.is_alive(), timeout)
+
+    def close(self, timeout=5.0):
+        """Writes whatever is pending, stops the thread and closes the sink."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._flush_requested > self._flushed
+                    or len(self._pending) >= self.max_batch,
+                    self.flush_interval)
+                batch = list(self._pending)
+                self._pending.clear()
+                flush_target = self._flush_requested
+                closing = self._closed
+            if batch:
+                try:
+                    self.write_batch(batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    print(f"❌ Error: {type(self).__name__} could not write {len(batch)} records: {e}")
+            with self._cond:
+                self._flushed = flush_target
+                self._cond.notify_all()
+            if closing:
+                break
+        try:
+            self.close_sink()
+        except Exception as e:
+            print(f"❌ Error: {type(self).__name__} could not close cleanly: {e}")
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def close_sink(self):
+        pass
+
+
+class JsonlEventLog(BatchingWriter):
+    """
+    Structured event log: one JSON object per line, stamped with the session
+    and user ids, written in batches on a background thread and rotated by
+    size like logging.handlers.RotatingFileHandler (events.jsonl.1 is the
+    most recent backup).
+    """
+    def __init__(self, path=DEFAULT_LOG_PATH, session_id=None, user_id=None,
+                 max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, **kwargs):
+        self.path = os.path.abspath(path)
+        self.session_id = session_id
+        self.user_id = user_id
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        super().__init__(**kwargs)
+
+    def write_batch(self, records):
+        lines = []
+        size = self._file.tell()
+        for record in records:
+            line = json.dumps(record, default=float, ensure_ascii=False) + "\n"
+            line_size = len(line.encode("utf-8"))
+            # Rotate between lines, never leaving an empty file behind
+            if self.max_bytes and size and size + line_size > self.max_bytes:
+                self._file.write("".join(lines))
+                lines = []
+                self._rotate()
+                size = 0
+            lines.append(line)
+            size += line_size
+        self._file.write("".join(lines))
+        self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close_sink(self):
+        self._file.close()
+
+
+class TeeLog:
+    """Sends every event to several logs (e.g. the JSONL file and the SQLite store)."""
+    def __init__(self, *logs):
+        self.logs = logs
+
+    def log(self, event_type, message, **fields):
+        for event_log in self.logs:
+            event_log.log(event_type, message, **fields)
+
+    def flush(self, timeout=5.0):
+        return all([event_log.flush(timeout) for event_log in self.logs])
+
+    def close(self, timeout=5.0):
+        for event_log in self.logs:
+            event_log.close(timeout)
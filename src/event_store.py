@@ -0,0 +1,271 @@
+"""
+Indexed event store for reviewers: every logged event goes into SQLite, in
+one transaction per batch, with indexes for the questions reviewers ask
+("all multiple_faces events for session X between t1 and t2") and a
+per-session summary table kept up to date as events arrive.
+
+Usage (from src/):
+    python event_store.py sessions
+    python event_store.py summary SESSION
+    python event_store.py events --session SESSION --event multiple_faces --since "2024-05-01 09:00" --until "2024-05-01 10:30"
+    python event_store.py import logs/events.jsonl
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import event_log
+
+DEFAULT_DB_PATH = os.path.join(event_log.LOG_DIR, "events.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    session TEXT,
+    user TEXT,
+    event TEXT NOT NULL,
+    message TEXT,
+    score REAL,
+    detections TEXT
+);
+-- Session queries, optionally narrowed to one event type, by time. Also
+-- covers per-session counts without touching the table.
+CREATE INDEX IF NOT EXISTS events_session_event_time ON events (session, event, time);
+CREATE INDEX IF NOT EXISTS events_session_time ON events (session, time);
+CREATE INDEX IF NOT EXISTS events_user_time ON events (user, time);
+CREATE INDEX IF NOT EXISTS events_event_time ON events (event, time);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+
+-- Per-session, per-event counts, maintained on insert so summaries never scan events
+CREATE TABLE IF NOT EXISTS session_summary (
+    session TEXT,
+    user TEXT,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_time REAL NOT NULL,
+    last_time REAL NOT NULL,
+    max_score REAL,
+    PRIMARY KEY (session, event)
+);
+"""
+
+_INSERT_EVENT = "INSERT INTO events (time, session, user, event, message, score, detections) VALUES (?, ?, ?, ?, ?, ?, ?)"
+_UPSERT_SUMMARY = """
+INSERT INTO session_summary (session, user, event, count, first_time, last_time, max_score)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (session, event) DO UPDATE SET
+    count = count + excluded.count,
+    first_time = min(first_time, excluded.first_time),
+    last_time = max(last_time, excluded.last_time),
+    max_score = max(coalesce(max_score, excluded.max_score), coalesce(excluded.max_score, max_score)),
+    user = coalesce(user, excluded.user)
+"""
+
+
+def connect(path=DEFAULT_DB_PATH):
+    """Opens (creating if needed) the event database."""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    # WAL lets reviewers query while a session is still writing
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def insert_events(conn, records):
+    """Inserts event records (dicts as written by event_log) and updates the summaries, in one transaction."""
+    rows = []
+    summary = {}
+    for r in records:
+        detections = r.get("detections")
+        user = None if r.get("user") is None else str(r["user"])
+        rows.append((r["time"], r.get("session"), user, r["event"], r.get("message"), r.get("score"),
+                     json.dumps(detections, default=float) if detections is not None else None))
+        key = (r.get("session"), r["event"])
+        s = summary.get(key)
+        if s is None:
+            summary[key] = [user, 1, r["time"], r["time"], r.get("score")]
+        else:
+            s[1] += 1
+            s[2] = min(s[2], r["time"])
+            s[3] = max(s[3], r["time"])
+            if r.get("score") is not None:
+                s[4] = r["score"] if s[4] is None else max(s[4], r["score"])
+    with conn:
+        conn.executemany(_INSERT_EVENT, rows)
+        conn.executemany(_UPSERT_SUMMARY, [(session, *s[:1], event, *s[1:]) for (session, event), s in summary.items()])
+
+
+class SqliteEventLog(event_log.BatchingWriter):
+    """
+    Event sink for detection.EVENT_LOG that stores events in SQLite. Same
+    log() interface and batching as event_log.JsonlEventLog; each batch is
+    a single transaction. The connection lives on the writer thread.
+    """
+    def __init__(self, path=DEFAULT_DB_PATH, session_id=None, user_id=None, **kwargs):
+        self.path = path
+        self.session_id = session_id
+        self.user_id = user_id
+        self._conn = None
+        super().__init__(**kwargs)
+
+    def write_batch(self, records):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        insert_events(self._conn, records)
+
+    def close_sink(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+# --- Queries ---
+
+def query_events(conn, session=None, user=None, event=None, since=None, until=None, limit=None):
+    """
+    Events matching every given filter, oldest first, as sqlite3.Row objects.
+    `since`/`until` are epoch seconds (inclusive).
+    """
+    clauses, params = [], []
+    for column, value in (("session", session), ("user", user), ("event", event)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("time >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("time <= ?")
+        params.append(until)
+    sql = "SELECT * FROM events"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY time"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def session_summary(conn, session):
+    """Per-event counts, first/last times and peak score for one session."""
+    return conn.execute(
+        "SELECT event, user, count, first_time, last_time, max_score FROM session_summary "
+        "WHERE session = ? ORDER BY count DESC", (session,)).fetchall()
+
+
+def list_sessions(conn, user=None):
+    """Every session with its user, event count and time span, most recent first."""
+    sql = ("SELECT session, max(user) AS user, sum(count) AS events, min(first_time) AS first_time, "
+           "max(last_time) AS last_time FROM session_summary")
+    params = []
+    if user is not None:
+        sql += " WHERE user = ?"
+        params.append(user)
+    sql += " GROUP BY session ORDER BY last_time DESC"
+    return conn.execute(sql, params).fetchall()
+
+
+def import_jsonl(conn, path, batch_size=10_000):
+    """Loads an event_log JSON-lines file into the store. Returns the number of events."""
+    count = 0
+    batch = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                insert_events(conn, batch)
+                count += len(batch)
+                batch = []
+    if batch:
+        insert_events(conn, batch)
+        count += len(batch)
+    return count
+
+
+# --- CLI ---
+
+def parse_time(value):
+    """Epoch seconds or a local 'YYYY-mm-dd[ HH:MM[:SS]]' timestamp."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def format_time(seconds):
+    return datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the proctoring event store.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("events", help="list events matching filters")
+    p.add_argument("--session")
+    p.add_argument("--user")
+    p.add_argument("--event", help="event type, e.g. multiple_faces")
+    p.add_argument("--since", type=parse_time, help="epoch seconds or 'YYYY-mm-dd HH:MM:SS'")
+    p.add_argument("--until", type=parse_time, help="epoch seconds or 'YYYY-mm-dd HH:MM:SS'")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+
+    p = commands.add_parser("summary", help="per-event counts for one session")
+    p.add_argument("session")
+
+    p = commands.add_parser("sessions", help="list sessions")
+    p.add_argument("--user")
+
+    p = commands.add_parser("import", help="load event_log JSON-lines files")
+    p.add_argument("files", nargs="+")
+
+    args = parser.parse_args(argv)
+    if args.command != "import" and not os.path.exists(args.db):
+        print(f"❌ Error: {args.db} not found.")
+        return 1
+    conn = connect(args.db)
+    start = time.perf_counter()
+
+    if args.command == "events":
+        rows = query_events(conn, args.session, args.user, args.event, args.since, args.until, args.limit)
+        for row in rows:
+            if args.json:
+                print(json.dumps(dict(row)))
+            else:
+                print(f"{format_time(row['time'])}  {row['session']}  {row['event']:<16} {row['message']}")
+        summary = f"{len(rows)} events"
+    elif args.command == "summary":
+        rows = session_summary(conn, args.session)
+        print(f"{'event':<18} {'count':>7}  {'first':<19}  {'last':<19}  {'max score':>9}")
+        for row in rows:
+            score = f"{row['max_score']:.2f}" if row["max_score"] is not None else "-"
+            print(f"{row['event']:<18} {row['count']:>7}  {format_time(row['first_time'])}  "
+                  f"{format_time(row['last_time'])}  {score:>9}")
+        summary = f"{len(rows)} event types"
+    elif args.command == "sessions":
+        rows = list_sessions(conn, args.user)
+        for row in rows:
+            print(f"{row['session']}  {row['user']}  {row['events']:>7} events  "
+                  f"{format_time(row['first_time'])} - {format_time(row['last_time'])}")
+        summary = f"{len(rows)} sessions"
+    else:
+        total = sum(import_jsonl(conn, path) for path in args.files)
+        summary = f"✅ Imported {total} events"
+
+    print(f"{summary} ({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
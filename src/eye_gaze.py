@@ -1,6 +1,7 @@
-import cv2
-import numpy as np
 import math
+import numpy as np
+
+import landmarks as landmarks_module
 
 # Constants for eye tracking
 EAR_THRESHOLD = 0.2  # Eye Aspect Ratio threshold for blink detection
@@ -14,85 +15,83 @@ RIGHT_EYE_LANDMARKS = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158,
 LEFT_IRIS_LANDMARKS = [474, 475, 476, 477]
 RIGHT_IRIS_LANDMARKS = [469, 470, 471, 472]
 
+# Gather indices for both eyes (row 0: left eye, row 1: right eye). Each row
+# holds the EAR points p2, p6, p3, p5, p1, p4 followed by the four iris points;
+# (p2, p6) doubles as the top/bottom lid pair and (p1, p4) as the eye corners.
+_EYE_GATHER = np.concatenate([
+    np.array([LEFT_EYE_LANDMARKS, RIGHT_EYE_LANDMARKS])[:, [11, 3, 12, 4, 0, 8]],
+    np.array([LEFT_IRIS_LANDMARKS, RIGHT_IRIS_LANDMARKS]),
+], axis=1)
+
 def euclidean_distance(p1, p2):
     """Calculate Euclidean distance between two points."""
-    return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
 
-def get_ear(landmarks, eye_indices):
-    """Calculate the Eye Aspect Ratio (EAR) for a single eye."""
-    try:
-        # Vertical landmarks (use landmark objects directly)
-        p2 = landmarks[eye_indices[11]]
-        p6 = landmarks[eye_indices[3]]
-        p3 = landmarks[eye_indices[12]]
-        p5 = landmarks[eye_indices[4]]
+def _as_points(landmarks):
+    """Accepts the (N, 3) array from landmarks.to_array or MediaPipe landmarks."""
+    return landmarks if isinstance(landmarks, np.ndarray) else landmarks_module.to_array(landmarks)
+
+def eye_metrics(points, img_w, img_h, gather=_EYE_GATHER):
+    """
+    Returns (ear, gaze_ratio, vertical_gaze_ratio) for every eye in `gather`
+    (left and right by default). All the points both eyes need are pulled out
+    of the (N, 3) landmark array with a single index gather; the handful of
+    distances left are cheaper as plain floats than as tiny NumPy arrays.
+    """
+    return [_single_eye_metrics(eye, img_w, img_h) for eye in points[gather, :2].tolist()]
+
+def _single_eye_metrics(eye, img_w, img_h):
+    p2, p6, p3, p5, p1, p4 = eye[:6]
+    iris = eye[6:]
+
+    # Eye Aspect Ratio, in normalised coordinates (0.0 if undefined)
+    hor_dist = euclidean_distance(p1, p4)
+    ear = (euclidean_distance(p2, p6) + euclidean_distance(p3, p5)) / (2.0 * hor_dist) if hor_dist else 0.0
 
-        # Horizontal landmarks (use landmark objects directly)
-        p1 = landmarks[eye_indices[0]]
-        p4 = landmarks[eye_indices[8]]
+    # Iris position between the corners / lids, in pixels (0.5 = centred if undefined)
+    iris_x = sum(p[0] for p in iris) / len(iris)
+    iris_y = sum(p[1] for p in iris) / len(iris)
+    eye_width = math.hypot((p4[0] - p1[0]) * img_w, (p4[1] - p1[1]) * img_h)
+    eye_height = math.hypot((p6[0] - p2[0]) * img_w, (p6[1] - p2[1]) * img_h)
+    gaze_ratio = (iris_x - p1[0]) * img_w / eye_width if eye_width else 0.5
+    vertical_gaze_ratio = (iris_y - p2[1]) * img_h / eye_height if eye_height else 0.5
+    return ear, gaze_ratio, vertical_gaze_ratio
 
-        ver_dist1 = euclidean_distance((p2.x, p2.y), (p6.x, p6.y))
-        ver_dist2 = euclidean_distance((p3.x, p3.y), (p5.x, p5.y))
-        hor_dist = euclidean_distance((p1.x, p1.y), (p4.x, p4.y))
+def _gather_for(eye_indices, iris_indices):
+    return np.concatenate([np.asarray(eye_indices)[[11, 3, 12, 4, 0, 8]], iris_indices])[np.newaxis]
 
-        return (ver_dist1 + ver_dist2) / (2.0 * hor_dist)
-    except:
-        return 0.0
+def get_ear(landmarks, eye_indices):
+    """Calculate the Eye Aspect Ratio (EAR) for a single eye."""
+    return eye_metrics(_as_points(landmarks), 1, 1, _gather_for(eye_indices, eye_indices[:1]))[0][0]
 
 def get_gaze_ratio(landmarks, eye_indices, iris_indices, img_w, img_h):
     """Calculate the gaze ratio to determine horizontal eye movement."""
-    try:
-        eye_region = np.array([(landmarks[i].x * img_w, landmarks[i].y * img_h) for i in eye_indices])
-        
-        # Get corners of the eye
-        eye_left_corner = (landmarks[eye_indices[0]].x * img_w, landmarks[eye_indices[0]].y * img_h)
-        eye_right_corner = (landmarks[eye_indices[8]].x * img_w, landmarks[eye_indices[8]].y * img_h)
-        eye_width = euclidean_distance(eye_left_corner, eye_right_corner)
-
-        # Get center of the iris
-        iris_center_x = sum([landmarks[i].x for i in iris_indices]) / len(iris_indices) * img_w
-        
-        # Calculate gaze ratio
-        gaze_ratio = (iris_center_x - eye_left_corner[0]) / eye_width
-        return gaze_ratio
-    except:
-        return 0.5 # Return center if something fails
+    return eye_metrics(_as_points(landmarks), img_w, img_h, _gather_for(eye_indices, iris_indices))[0][1]
 
 def get_vertical_gaze_ratio(landmarks, eye_indices, iris_indices, img_w, img_h):
     """Calculate the vertical gaze ratio to determine up/down eye movement."""
-    try:
-        # Get top and bottom of the eye
-        eye_top = (landmarks[eye_indices[11]].x * img_w, landmarks[eye_indices[11]].y * img_h)
-        eye_bottom = (landmarks[eye_indices[3]].x * img_w, landmarks[eye_indices[3]].y * img_h)
-        eye_height = euclidean_distance(eye_top, eye_bottom)
-
-        if eye_height == 0: return 0.5
+    return eye_metrics(_as_points(landmarks), img_w, img_h, _gather_for(eye_indices, iris_indices))[0][2]
 
-        # Get center of the iris
-        iris_center_y = sum([landmarks[i].y for i in iris_indices]) / len(iris_indices) * img_h
-
-        # Calculate gaze ratio
-        vertical_gaze_ratio = (iris_center_y - eye_top[1]) / eye_height
-        return vertical_gaze_ratio
-    except:
-        return 0.5 # Return center if something fails
-
-def process_face_landmarks(image, landmarks):
+def process_face_landmarks(image, landmarks, state=None):
     """
     Processes face landmarks to detect blinks and gaze direction for a single frame.
-    Updates global cheat flags.
+    Pass the (N, 3) array from landmarks.to_array so both eyes are measured from a
+    single index gather. Returns the flags plus the averaged EAR and gaze ratios.
+    The blink counter is kept in `state` (a dict) if given, else on this function.
     """
-    persistent_blink_counter = getattr(process_face_landmarks, "persistent_blink_counter", 0)
+    state = process_face_landmarks.__dict__ if state is None else state
+    persistent_blink_counter = state.get("persistent_blink_counter", 0)
     detection_results = {
         "eye_gaze": 0,
         "long_blink": 0
     }
 
     img_h, img_w, _ = image.shape
+    points = _as_points(landmarks)
+
+    (left_ear, left_gaze, left_vertical), (right_ear, right_gaze, right_vertical) = eye_metrics(points, img_w, img_h)
 
     # --- Blink Detection ---
-    left_ear = get_ear(landmarks, LEFT_EYE_LANDMARKS)
-    right_ear = get_ear(landmarks, RIGHT_EYE_LANDMARKS)
     avg_ear = (left_ear + right_ear) / 2.0
 
     if avg_ear < EAR_THRESHOLD:
@@ -102,17 +101,12 @@ def process_face_landmarks(image, landmarks):
             detection_results["long_blink"] = 1 # Set cheat flag for long blink
         # No need for an else, the flag is 0 by default
         persistent_blink_counter = 0
-    
-    process_face_landmarks.persistent_blink_counter = persistent_blink_counter
 
-    # --- Gaze Detection ---
-    left_gaze_ratio = get_gaze_ratio(landmarks, LEFT_EYE_LANDMARKS, LEFT_IRIS_LANDMARKS, img_w, img_h)
-    right_gaze_ratio = get_gaze_ratio(landmarks, RIGHT_EYE_LANDMARKS, RIGHT_IRIS_LANDMARKS, img_w, img_h)
-    avg_gaze_ratio = (left_gaze_ratio + right_gaze_ratio) / 2.0
+    state["persistent_blink_counter"] = persistent_blink_counter
 
-    left_vertical_gaze = get_vertical_gaze_ratio(landmarks, LEFT_EYE_LANDMARKS, LEFT_IRIS_LANDMARKS, img_w, img_h)
-    right_vertical_gaze = get_vertical_gaze_ratio(landmarks, RIGHT_EYE_LANDMARKS, RIGHT_IRIS_LANDMARKS, img_w, img_h)
-    avg_vertical_gaze = (left_vertical_gaze + right_vertical_gaze) / 2.0
+    # --- Gaze Detection ---
+    avg_gaze_ratio = (left_gaze + right_gaze) / 2.0
+    avg_vertical_gaze = (left_vertical + right_vertical) / 2.0
 
     # Check for horizontal and vertical gaze deviation independently
     horizontal_gaze_off_center = avg_gaze_ratio > 1 - GAZE_THRESHOLD or avg_gaze_ratio < GAZE_THRESHOLD
@@ -121,7 +115,28 @@ def process_face_landmarks(image, landmarks):
     if horizontal_gaze_off_center or vertical_gaze_off_center:
         detection_results["eye_gaze"] = 1 # Looking away from center
 
+    detection_results["ear"] = avg_ear
+    detection_results["gaze_h"] = avg_gaze_ratio
+    detection_results["gaze_v"] = avg_vertical_gaze
     return detection_results
 
+def long_blink_flags(closed, initial=0):
+    """
+    process_face_landmarks' long_blink flag over consecutive face frames at
+    once. `closed` holds avg EAR < EAR_THRESHOLD for each frame and `initial`
+    is the blink counter before the first one. A frame is flagged when the
+    eyes open after at least CONSECUTIVE_FRAMES_THRESHOLD closed frames.
+    Returns the flags and the blink counter after the last frame.
+    """
+    closed = np.asarray(closed, dtype=bool)
+    n = len(closed)
+    index = np.arange(n)
+    last_open = np.maximum.accumulate(np.where(closed, -1, index)) if n else index
+    # The counter after each frame: closed frames since the last open one
+    counter = index - last_open + np.where(last_open < 0, initial, 0)
+    before = np.concatenate([[initial], counter[:-1]])
+    flags = ~closed & (before >= CONSECUTIVE_FRAMES_THRESHOLD)
+    return flags, int(counter[-1]) if n else initial
+
 if __name__ == '__main__':
-    pass # This module is not meant to be run directly
\ No newline at end of file
+    pass # This module is not meant to be run directly
@@ -0,0 +1,157 @@
+import os
+import cv2
+import numpy as np
+
+# --- Constants ---
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_SYNTHETIC_SIZE = (1280, 720)
+DEFAULT_SYNTHETIC_FPS = 30.0
+
+
+class FrameSource:
+    """
+    Base class for anything that produces BGR frames.
+    Mirrors the small part of the cv2.VideoCapture API the app uses
+    (read/release) and can also be iterated over.
+    """
+    fps = 0.0
+    frame_count = None  # Frames in the source, if known
+
+    def read(self):
+        """Returns (success, frame) like cv2.VideoCapture.read()."""
+        raise NotImplementedError
+
+    def seek(self, index):
+        """Positions the source so the next read() returns frame `index`."""
+        raise NotImplementedError(f"{type(self).__name__} cannot seek")
+
+    def release(self):
+        """Frees any underlying device or file handle."""
+        pass
+
+    def __iter__(self):
+        while True:
+            success, frame = self.read()
+            if not success:
+                break
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CaptureSource(FrameSource):
+    """Wraps a cv2.VideoCapture opened on a webcam index or a video file."""
+    def __init__(self, target):
+        self.target = target
+        self.cap = cv2.VideoCapture(target)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class WebcamSource(CaptureSource):
+    """Live frames from a local camera."""
+    def __init__(self, index=0):
+        super().__init__(index)
+
+
+class VideoFileSource(CaptureSource):
+    """Frames decoded from a recorded video file."""
+    def __init__(self, path):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Video file not found: {path}")
+        super().__init__(path)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def seek(self, index):
+        if self.cap.set(cv2.CAP_PROP_POS_FRAMES, index) and int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == index:
+            return
+        # Backends that cannot seek exactly: decode from the start up to the frame
+        self.cap.release()
+        self.cap = cv2.VideoCapture(self.target)
+        for _ in range(index):
+            if not self.cap.grab():
+                break
+
+
+class ImageDirSource(FrameSource):
+    """Frames read from a directory of still images, in sorted filename order."""
+    def __init__(self, path, fps=DEFAULT_SYNTHETIC_FPS):
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Image directory not found: {path}")
+        self.fps = fps
+        self.paths = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.frame_count = len(self.paths)
+        self.position = 0
+
+    def seek(self, index):
+        self.position = index
+
+    def read(self):
+        while self.position < len(self.paths):
+            frame = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generates noise frames without any camera or file, for throughput runs on
+    machines with no camera. A single noise image is generated once and
+    shifted per frame so generation cost stays negligible.
+    """
+    def __init__(self, width=DEFAULT_SYNTHETIC_SIZE[0], height=DEFAULT_SYNTHETIC_SIZE[1],
+                 count=300, fps=DEFAULT_SYNTHETIC_FPS, seed=0):
+        self.fps = fps
+        self.count = count
+        self.frame_count = count
+        self.position = 0
+        rng = np.random.default_rng(seed)
+        self.base = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+    def seek(self, index):
+        self.position = index
+
+    def read(self):
+        if self.count is not None and self.position >= self.count:
+            return False, None
+        frame = np.roll(self.base, self.position * 4, axis=1)
+        self.position += 1
+        return True, frame
+
+
+def open_source(spec, count=None):
+    """
+    Opens a frame source from a command-line style spec:
+      - "webcam" or "webcam:1"    -> WebcamSource
+      - "synthetic[:WxH]"         -> SyntheticSource (count frames, default 300)
+      - a directory path          -> ImageDirSource
+      - any other path            -> VideoFileSource
+    """
+    if spec == "webcam" or spec.startswith("webcam:"):
+        index = int(spec.split(":", 1)[1]) if ":" in spec else 0
+        return WebcamSource(index)
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        width, height = DEFAULT_SYNTHETIC_SIZE
+        if ":" in spec:
+            width, height = (int(v) for v in spec.split(":", 1)[1].lower().split("x"))
+        return SyntheticSource(width, height, count=count if count is not None else 300)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec)
+    return VideoFileSource(spec)
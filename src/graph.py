@@ -1,24 +1,127 @@
-import matplotlib.pyplot as plt
-import time
-import random
- 
-xdata = []
-ydata = []
- 
-plt.show()
- 
-axes = plt.gca()
-axes.set_xlim(0, 100)
-axes.set_ylim(0,1)
-line, = axes.plot(xdata, ydata, 'r-')
- 
-for i in range(100):
-    xdata.append(i)
-    ydata.append(i/2)
-    line.set_xdata(xdata)
-    line.set_ydata(ydata)
-    plt.draw()
-    plt.pause(1e-17)
- 
-# add this if you don't want the window to disappear at the end
-plt.show()
\ No newline at end of file
+import collections
+import tkinter as tk
+
+import numpy as np
+
+import instrument
+
+# --- Graph Appearance ---
+GRAPH_REFRESH_MS = 100  # Redraw at most this often, however fast values arrive
+MARGIN_LEFT = 45        # Room for the y tick labels and axis label
+MARGIN_RIGHT = 10
+MARGIN_TOP = 30         # Room for the title
+MARGIN_BOTTOM = 30      # Room for the x axis label
+Y_TICKS = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+BACKGROUND = "white"
+LINE_COLOR = "red"
+FONT = ("TkDefaultFont", 9)
+
+
+def polyline_coords(values, x_positions, top, plot_height):
+    """
+    Flat [x0, y0, x1, y1, ...] canvas coordinates for `values` in 0..1
+    (clipped), plotted against the precomputed `x_positions`.
+    """
+    values = np.clip(np.asarray(values, dtype=np.float64), 0.0, 1.0)
+    coords = np.empty(2 * len(values))
+    coords[0::2] = x_positions[:len(values)]
+    coords[1::2] = top + (1.0 - values) * plot_height
+    return coords.tolist()
+
+
+class SuspicionGraph:
+    """
+    "Suspicion Over Time" plot drawn on a plain Tk canvas. The axes, labels
+    and title are drawn once (and again only when the canvas is resized);
+    each refresh just moves the points of a single polyline, so the cost per
+    update is small and fixed. push() can be called at the analysis rate;
+    the canvas is redrawn on its own GRAPH_REFRESH_MS timer, and only when
+    something changed.
+    """
+    def __init__(self, master, length, refresh_ms=GRAPH_REFRESH_MS, title="Suspicion Over Time",
+                 width=500, height=400):
+        self.length = length
+        self.refresh_ms = refresh_ms
+        self.title = title
+        self.values = collections.deque([0.0] * length, maxlen=length)
+        self.canvas = tk.Canvas(master, width=width, height=height, background=BACKGROUND, highlightthickness=0)
+        self.line = None
+        self._x_positions = None
+        self._top = 0
+        self._plot_height = 0
+        self._dirty = True
+        self._after_id = None
+        self.canvas.bind("<Configure>", self._on_resize)
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+        return self
+
+    def push(self, value):
+        """Appends the newest value, dropping the oldest. Cheap: no drawing happens here."""
+        self.values.append(value)
+        self._dirty = True
+
+    def start(self):
+        """Starts the refresh timer."""
+        if self._after_id is None:
+            self._after_id = self.canvas.after(self.refresh_ms, self._tick)
+        return self
+
+    def stop(self):
+        if self._after_id is not None:
+            self.canvas.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        self.refresh()
+        self._after_id = self.canvas.after(self.refresh_ms, self._tick)
+
+    def refresh(self):
+        """Moves the polyline to the current values if they changed."""
+        if not self._dirty or self.line is None:
+            return
+        with instrument.span("graph_draw"):
+            self.canvas.coords(self.line, polyline_coords(self.values, self._x_positions, self._top, self._plot_height))
+        self._dirty = False
+
+    def _on_resize(self, event):
+        self._draw_axes(event.width, event.height)
+        self._dirty = True
+        self.refresh()
+
+    def _draw_axes(self, width, height):
+        """Draws the static parts of the plot for a canvas of this size."""
+        c = self.canvas
+        c.delete("all")
+        left, top = MARGIN_LEFT, MARGIN_TOP
+        right, bottom = max(left + 1, width - MARGIN_RIGHT), max(top + 1, height - MARGIN_BOTTOM)
+        self._top, self._plot_height = top, bottom - top
+        self._x_positions = np.linspace(left, right, self.length)
+
+        c.create_text((left + right) / 2, top / 2, text=self.title, font=FONT)
+        c.create_text((left + right) / 2, height - MARGIN_BOTTOM / 3, text="Time", font=FONT)
+        c.create_text(10, (top + bottom) / 2, text="Probability", font=FONT, angle=90)
+        for tick in Y_TICKS:
+            y = top + (1.0 - tick) * self._plot_height
+            c.create_line(left, y, right, y, fill="#e8e8e8")
+            c.create_text(left - 4, y, text=f"{tick:.1f}", anchor=tk.E, font=FONT)
+        c.create_rectangle(left, top, right, bottom, outline="black")
+        self.line = c.create_line(0, 0, 0, 0, fill=LINE_COLOR, width=1.5)
+
+
+if __name__ == "__main__":
+    # Demo: a sine wave streamed in faster than the graph redraws.
+    import math
+
+    root = tk.Tk()
+    graph = SuspicionGraph(root, length=200).pack(fill=tk.BOTH, expand=True).start()
+    step = [0]
+
+    def feed():
+        step[0] += 1
+        graph.push(0.5 + 0.5 * math.sin(step[0] / 20))
+        root.after(20, feed)
+
+    feed()
+    root.mainloop()
@@ -1,24 +1,28 @@
 import tkinter as tk
 from tkinter import ttk
-import cv2
+import time
 from PIL import Image, ImageTk
-import mediapipe as mp
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-import head_pose
-import object_detection
-import eye_gaze
+import capture
 import detection
-import audio
+import frame_source
+import graph
+import instrument
+import model_loader
+import overlay
+import pipeline
+
+UPDATE_INTERVAL_MS = 10 # Poll for a new camera frame this often
+STATS_REFRESH = 0.5 # Seconds between updates of the timing overlay (when instrument is enabled)
 
 class ProctoringApp:
-    def __init__(self, root, detection_module, alert_manager, user_info, audio_state):
+    def __init__(self, root, detection_module, alert_manager, user_info, audio_state, recorder=None):
         self.root = root
         self.detection_module = detection_module
         self.alert_manager = alert_manager
         self.user_info = user_info
         self.audio_state = audio_state # Store the shared audio state
+        self.recorder = recorder # recording.SignalRecorder for the per-frame signals, if any
 
         # --- Set Window Title with User Name ---
         window_title = "Proctoring Application"
@@ -46,28 +50,21 @@ class ProctoringApp:
         self.video_label.pack(expand=True, fill=tk.BOTH)
 
         # --- Suspicion Graph ---
-        self.fig = plt.Figure(figsize=(5, 4), dpi=100)
-        self.ax = self.fig.add_subplot(111)
-        self.ax.set_xlim(0, detection.PLOT_LENGTH)
-        self.ax.set_ylim(0, 1)
-        self.ax.set_title("Suspicion Over Time")
-        self.ax.set_xlabel("Time")
-        self.ax.set_ylabel("Probability")
-        self.line, = self.ax.plot(detection.XDATA, detection.YDATA, 'r-')
-        
-        self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-
-        # --- MediaPipe and Camera Setup ---
-        self.cap = cv2.VideoCapture(0)
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=2,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Redrawn on its own timer; update() only pushes the newest score.
+        self.graph = graph.SuspicionGraph(graph_frame, detection.PLOT_LENGTH)
+        self.graph.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.graph.start()
+
+        # --- Detection Pipeline and Camera Setup ---
+        # Frames are grabbed on a background thread; update() only ever sees the newest one.
+        self.capture = capture.CaptureThread(frame_source.WebcamSource(0)).start()
+        # Frames come back in RGB, in the pipeline's reused buffer, so the overlays
+        # below are drawn straight onto what is displayed. Colours are therefore RGB.
+        self.pipeline = pipeline.FramePipeline(self.alert_manager, async_objects=True, rgb_output=True)
+        self.photo = None # Reused Tk image; only recreated when the frame size changes
+        self.detection_results = {}
+        self.stats_lines = [] # Timing overlay text, refreshed every STATS_REFRESH seconds
+        self._stats_time = 0.0
 
         # --- Start the update loop ---
         self.update()
@@ -75,86 +72,79 @@ class ProctoringApp:
     def update(self):
         """Main loop to update the GUI."""
         # --- Video and Proctoring Logic ---
-        success, frame = self.cap.read()
-        if success:
-            # Process the frame using the logic from eye_gaze.py
-            processed_frame = self.process_frame(frame)
-
-            # Convert image for Tkinter
-            img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(img)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
+        latest = self.capture.latest()
+        if latest is None:
+            # No new frame yet; poll again shortly without blocking Tk.
+            self.root.after(UPDATE_INTERVAL_MS, self.update)
+            return
+
+        frame, captured_at, _ = latest
+        frame_start = time.perf_counter()
+        processed_frame = self.process_frame(frame, captured_at)
+
+        # Hand the RGB frame to Tk, pasting into the existing photo image when possible
+        with instrument.span("tk_photo"):
+            img = Image.fromarray(processed_frame)
+            if self.photo is None or (self.photo.width(), self.photo.height()) != img.size:
+                self.photo = ImageTk.PhotoImage(image=img)
+                self.video_label.configure(image=self.photo)
+            else:
+                self.photo.paste(img)
 
         # --- Aggregate all detection results ---
-        # This is where we now collect the return values from our refactored modules
-        all_detection_results = {}
-        if hasattr(self, 'head_pose_results'):
-            all_detection_results.update(self.head_pose_results)
-        if hasattr(self, 'eye_gaze_results'):
-            all_detection_results.update(self.eye_gaze_results)
-        if hasattr(self, 'object_detection_results'):
-            all_detection_results.update(self.object_detection_results)
-        # Read the audio cheat status from the shared state object.
+        # The pipeline already merges head pose, eye gaze and object results.
+        all_detection_results = dict(self.detection_results)
+        # Read the audio cheat status and speech probability from the shared state object.
         all_detection_results['audio'] = self.audio_state.get("is_cheating", 0)
+        if "speech_probability" in self.audio_state:
+            all_detection_results['speech'] = self.audio_state["speech_probability"]
+        if "audio_level" in self.audio_state:
+            all_detection_results['audio_level'] = self.audio_state["audio_level"]
 
         # --- Update Suspicion Score and Graph ---
-        detection.process(self.alert_manager, all_detection_results)
-        detection.YDATA.pop(0)
-        detection.YDATA.append(detection.PERCENTAGE_CHEAT)
-        self.line.set_ydata(detection.YDATA)
-        self.canvas.draw()
+        with instrument.span("scoring"):
+            detection.process(self.alert_manager, all_detection_results)
+            self.graph.push(detection.SCORER.score)
+        if self.recorder is not None:
+            with instrument.span("record"):
+                self.recorder.record(all_detection_results, detection.SCORER)
+
+        # Capture-to-processed latency of this frame, shown in the timing overlay
+        instrument.add("capture_latency", time.monotonic() - captured_at)
+        instrument.add("frame", time.perf_counter() - frame_start)
 
         # --- Schedule next update ---
-        self.root.after(20, self.update) # ~50 FPS
+        self.root.after(UPDATE_INTERVAL_MS, self.update)
 
-    def process_frame(self, image):
+    def process_frame(self, image, timestamp=None):
         """
         Processes a single video frame for all detections.
-        This consolidates logic from the original eye_gaze.track_eyes loop.
+        The detections themselves run in pipeline.FramePipeline; this adds the on-screen overlays.
         """
-        image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
-        image.flags.writeable = False
-        results = self.face_mesh.process(image)
-        image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-        # Eye gaze and blink detection
-        if results.multi_face_landmarks:
-            # Pass the results to head_pose instead of having it re-process
-            image, self.head_pose_results = head_pose.pose(image, results, self.alert_manager)
-            self.eye_gaze_results = eye_gaze.process_face_landmarks(image, results.multi_face_landmarks[0].landmark)
-
-        # Object detection (can be run periodically if needed)
-        image, self.object_detection_results = object_detection.detect_objects(image, self.alert_manager)
-
-        # --- Display Cheat Probability Bar ---
-        img_h, img_w, _ = image.shape
-        bar_width = int(img_w * 0.8)
-        bar_start_x = int((img_w - bar_width) / 2)
-        cheat_percent = max(0, min(1, self.detection_module.PERCENTAGE_CHEAT))
-        fill_width = int(bar_width * cheat_percent)
-        cv2.rectangle(image, (bar_start_x, img_h - 40), (bar_start_x + bar_width, img_h - 20), (255, 255, 255), -1)
-        cv2.rectangle(image, (bar_start_x, img_h - 40), (bar_start_x + fill_width, img_h - 20), (0, 0, 255), -1)
-        text = f"Suspicion Level: {cheat_percent:.0%}"
-        cv2.putText(image, text, (bar_start_x, img_h - 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-        # --- Display Real-Time Alerts ---
-        active_alerts = self.alert_manager.get_alerts()
-        y_pos = 30
-        for alert_text in active_alerts:
-            (text_width, text_height), _ = cv2.getTextSize(alert_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-            overlay = image.copy()
-            cv2.rectangle(overlay, (10, y_pos - text_height - 5), (20 + text_width, y_pos + 5), (0, 0, 0), -1)
-            alpha = 0.6
-            image = cv2.addWeighted(overlay, alpha, image, 1 - alpha, 0)
-            cv2.putText(image, alert_text, (20, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            y_pos += 30
+        # FaceMesh, head pose, eye gaze and object detection
+        image, self.detection_results = self.pipeline.process(image, timestamp)
+
+        # --- Overlays: suspicion bar, real-time alerts and model loading status ---
+        # Models load in the background; say so instead of silently missing detections.
+        status_lines = [
+            f"{name}: {'unavailable' if state == model_loader.FAILED else 'loading...'}"
+            for name, state in self.pipeline.model_status().items() if state != model_loader.READY
+        ]
+        if instrument.ENABLED and time.monotonic() - self._stats_time > STATS_REFRESH:
+            capture_stats = self.capture.stats()
+            self.stats_lines = instrument.summary_lines() + [
+                f"camera: {capture_stats['captured']} frames, {capture_stats['dropped']} dropped, "
+                f"{capture_stats['read_failures']} read failures"]
+            self._stats_time = time.monotonic()
+        with instrument.span("overlay"):
+            overlay.draw(image, self.alert_manager.get_alerts(), self.detection_module.SCORER.score, status_lines,
+                         self.stats_lines if instrument.ENABLED else ())
 
         return image
 
     def on_closing(self):
         """Handle window closing."""
-        self.cap.release()
+        self.graph.stop()
+        self.capture.stop()
+        self.pipeline.close()
         self.root.destroy()
\ No newline at end of file
@@ -3,6 +3,8 @@ import cv2
 import mediapipe as mp
 import numpy as np
 
+import landmarks as landmarks_module
+
 # --- Constants for Mouth Movement Detection ---
 MOUTH_AR_THRESH = 0.3  # Threshold for detecting an open mouth
 MOUTH_AR_CONSECUTIVE_FRAMES = 5
@@ -12,116 +14,195 @@ mouth_ar_counter = 0
 MOUTH_INNER_LANDMARKS = [78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415, 310, 311, 312, 13, 82, 81, 80, 191]
 
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
 mp_drawing = mp.solutions.drawing_utils
 
+# Landmarks used for head pose (in landmark index order, as before) and the
+# landmark indices of the six inner-lip points the MAR is computed from.
+POSE_LANDMARKS = np.array([1, 33, 61, 199, 263, 291])
+_MAR_POINTS = np.array(MOUTH_INNER_LANDMARKS)[[12, 4, 14, 2, 0, 6]]
+
+# --- Constants for Head Pose ---
+HEAD_YAW_THRESHOLD = 20    # Degrees left/right before the user counts as looking away
+HEAD_PITCH_THRESHOLD = 20  # Degrees up/down before the user counts as looking away
+ANGLE_SMOOTHING = 0.5      # Weight of the newest angles in their running average (1 = no smoothing)
+
+# 3D face model for POSE_LANDMARKS in millimetres, in camera axes (x to the
+# image right, y down, z away from the camera). Proportions follow FaceMesh's
+# own landmarks on a frontal face (symmetrised, scaled to a 90 mm eye span), so
+# they match what points 61/291/199 actually are rather than a generic skull.
+FACE_MODEL_3D = np.array([
+    [0.0, 0.0, 0.0],        # 1   nose tip
+    [-45.0, -40.0, 40.0],   # 33  right eye outer corner
+    [-32.0, 15.0, 43.0],    # 61  right mouth corner
+    [0.0, 58.0, 32.0],      # 199 chin
+    [45.0, -40.0, 40.0],    # 263 left eye outer corner
+    [32.0, 15.0, 43.0],     # 291 left mouth corner
+])
+# Each frame is solved from scratch with SQPnP (OpenCV >= 4.5.3), a global
+# solver: no mirrored or local-minimum poses. Warm-starting the iterative
+# solver from the previous pose was dropped on purpose: it is over three
+# times slower (~90 us against ~26 us per frame) and can stay in a wrong
+# minimum. Older OpenCV builds solve with the iterative solver instead.
+SOLVE_FLAGS = getattr(cv2, "SOLVEPNP_SQPNP", cv2.SOLVEPNP_ITERATIVE)
+
+
+class HeadPoseEstimator:
+    """
+    Estimates head pitch, yaw and roll (degrees) from face landmarks against
+    the fixed FACE_MODEL_3D. Camera intrinsics are cached per frame size and
+    the angles are smoothed over frames. Call reset() when the face is lost.
+    """
+    def __init__(self, smoothing=ANGLE_SMOOTHING):
+        self.smoothing = smoothing
+        self._intrinsics = {}
+        self.reset()
+
+    def reset(self):
+        self.angles = None
+
+    def camera(self, img_w, img_h):
+        """Camera and distortion matrices for a frame size (focal length = width)."""
+        key = (img_w, img_h)
+        if key not in self._intrinsics:
+            cam_matrix = np.array([[img_w, 0, img_w / 2],
+                                   [0, img_w, img_h / 2],
+                                   [0, 0, 1]], dtype=np.float64)
+            self._intrinsics[key] = (cam_matrix, np.zeros((4, 1), dtype=np.float64))
+        return self._intrinsics[key]
+
+    def estimate(self, points, img_w, img_h):
+        """Returns (pitch, yaw, roll) for the (N, 3) landmark array, or None if the solve fails."""
+        face_2d = np.ascontiguousarray(points[POSE_LANDMARKS, :2] * (img_w, img_h))
+        cam_matrix, dist_matrix = self.camera(img_w, img_h)
+
+        rot_vec = _solve(face_2d, cam_matrix, dist_matrix)
+        if rot_vec is None:
+            self.reset()
+            return None
+
+        angles = _rotation_to_angles(cv2.Rodrigues(rot_vec)[0])
+        if self.angles is not None:
+            a = self.smoothing
+            angles = tuple(a * new + (1 - a) * old for new, old in zip(angles, self.angles))
+        self.angles = angles
+        return angles
+
+
+def _solve(face_2d, cam_matrix, dist_matrix):
+    """Solves PnP for FACE_MODEL_3D. Returns the rotation vector, or None."""
+    success, rot_vec, trans_vec = cv2.solvePnP(FACE_MODEL_3D, face_2d, cam_matrix, dist_matrix, flags=SOLVE_FLAGS)
+    # A face behind the camera means the solver latched onto the mirror solution
+    if not success or trans_vec[2, 0] <= 0:
+        return None
+    return rot_vec
+
+
+def _rotation_to_angles(rmat):
+    """(pitch, yaw, roll) in degrees for R = Rz(roll) @ Ry(yaw) @ Rx(pitch)."""
+    pitch = math.atan2(rmat[2, 1], rmat[2, 2])
+    yaw = math.atan2(-rmat[2, 0], math.hypot(rmat[2, 1], rmat[2, 2]))
+    roll = math.atan2(rmat[1, 0], rmat[0, 0])
+    return math.degrees(pitch), math.degrees(yaw), math.degrees(roll)
+
+# Used when pose() is called without an estimator of its own
+default_estimator = HeadPoseEstimator()
+
 def euclidean_distance(p1, p2):
-    """Helper function to calculate Euclidean distance."""
-    return math.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2)
+    """Helper function to calculate Euclidean distance between two (x, y) points."""
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
 
 def get_mouth_aspect_ratio(landmarks):
-    """Calculates the Mouth Aspect Ratio (MAR)."""
-    # Vertical distances
-    p2, p10 = landmarks[12], landmarks[4] # Example vertical points
-    p4, p8 = landmarks[14], landmarks[2]
-    # Horizontal distance
-    p1, p7 = landmarks[0], landmarks[6]
-    return (euclidean_distance(p2, p10) + euclidean_distance(p4, p8)) / (2.0 * euclidean_distance(p1, p7))
-
-def pose(image, results, alert_manager=None):
+    """
+    Calculates the Mouth Aspect Ratio (MAR) from the MOUTH_INNER_LANDMARKS
+    points, given as an array (or list of landmark objects) in that order.
+    """
+    if not isinstance(landmarks, np.ndarray):
+        landmarks = np.array([(lm.x, lm.y) for lm in landmarks])
+    return _mar(landmarks[[12, 4, 14, 2, 0, 6], :2].tolist())
+
+def _mar(p):
+    """MAR from the six points p2, p10, p4, p8, p1, p7 (0.0 if the mouth has no width)."""
+    width = euclidean_distance(p[4], p[5])
+    return (euclidean_distance(p[0], p[1]) + euclidean_distance(p[2], p[3])) / (2.0 * width) if width else 0.0
+
+def mouth_flags(mouth_open, initial=0):
+    """
+    pose()'s mouth flag over consecutive face frames at once. `mouth_open`
+    holds MAR > MOUTH_AR_THRESH for each frame and `initial` is the counter
+    before the first one. Returns the flags and the counter after the last frame.
+    """
+    mouth_open = np.asarray(mouth_open, dtype=bool)
+    n = len(mouth_open)
+    index = np.arange(n)
+    last_closed = np.maximum.accumulate(np.where(mouth_open, -1, index)) if n else index
+    counter = index - last_closed + np.where(last_closed < 0, initial, 0)
+    return counter >= MOUTH_AR_CONSECUTIVE_FRAMES, int(counter[-1]) if n else initial
+
+def pose(image, results, alert_manager=None, points=None, estimator=None, state=None):
+    """
+    Draws the face contours and estimates head pose and mouth movement for the
+    first face. `points` is that face's (N, 3) array from landmarks.to_array;
+    it is computed here if the caller does not already have it. `estimator`
+    is the HeadPoseEstimator carrying state between frames (module default),
+    and `state` a dict for the frame counters (attributes of this function
+    by default), so several sessions can be analysed side by side.
+    """
+    estimator = estimator or default_estimator
     # Use function-level state for counters instead of global
-    mouth_ar_counter = getattr(pose, "mouth_ar_counter", 0)
+    state = pose.__dict__ if state is None else state
+    mouth_ar_counter = state.get("mouth_ar_counter", 0)
 
     detection_results = {
-        "head_x": 0, "head_y": 0, "mouth": 0, "multiple_faces": 0
+        "head_x": 0, "head_y": 0, "mouth": 0, "multiple_faces": 0, "faces": 0
     }
 
     if results.multi_face_landmarks:
         # --- Multiple Face Detection ---
+        detection_results["faces"] = len(results.multi_face_landmarks)
         if len(results.multi_face_landmarks) > 1:
             detection_results["multiple_faces"] = 1
 
         img_h, img_w, img_c = image.shape
-        face_ids = [33, 263, 1, 61, 291, 199]
-
-        for face_landmarks in results.multi_face_landmarks: # This loop will process all faces
-            face_2d = []
-            face_3d = []
-
-            mp_drawing.draw_landmarks(
-                image=image,
-                landmark_list=face_landmarks,
-                connections=mp_face_mesh.FACEMESH_CONTOURS,
-                landmark_drawing_spec=None
-            )
-
-            # --- Mouth Movement Detection ---
-            inner_lip_landmarks = [face_landmarks.landmark[i] for i in MOUTH_INNER_LANDMARKS]
-            mar = get_mouth_aspect_ratio(inner_lip_landmarks)
-
-            if mar > MOUTH_AR_THRESH:
-                mouth_ar_counter += 1
-            else:
-                mouth_ar_counter = 0
-            
-            if mouth_ar_counter >= MOUTH_AR_CONSECUTIVE_FRAMES:
-                detection_results["mouth"] = 1
-
-            # Head pose is typically only calculated for the primary face
-            for idx, lm in enumerate(face_landmarks.landmark):
-                # print(lm)
-                if idx in face_ids:
-                    if idx == 1:
-                        nose_2d = (lm.x * img_w, lm.y * img_h)
-                        nose_3d = (lm.x * img_w, lm.y * img_h, lm.z * 8000)
-
-                    x, y = int(lm.x * img_w), int(lm.y * img_h)
-
-                    # Get the 2D Coordinates
-                    face_2d.append([x, y])
-
-                    # Get the 3D Coordinates
-                    face_3d.append([x, y, lm.z])       
-            
-            # Convert it to the NumPy array
-            face_2d = np.array(face_2d, dtype=np.float64)
-
-            # Convert it to the NumPy array
-            face_3d = np.array(face_3d, dtype=np.float64)
-
-            # The camera matrix
-            focal_length = 1 * img_w
-
-            cam_matrix = np.array([ [focal_length, 0, img_h / 2],
-                                    [0, focal_length, img_w / 2],
-                                    [0, 0, 1]])
-
-            # The Distance Matrix
-            dist_matrix = np.zeros((4, 1), dtype=np.float64)
-
-            # Solve PnP
-            success, rot_vec, trans_vec = cv2.solvePnP(face_3d, face_2d, cam_matrix, dist_matrix)
-
-            # Get rotational matrix
-            rmat, jac = cv2.Rodrigues(rot_vec)
-
-            # Get angles
-            angles, mtxR, mtxQ, Qx, Qy, Qz = cv2.RQDecomp3x3(rmat)
-
-            # Get the y rotation degree
-            x = angles[0] * 360
-            y = angles[1] * 360
-
-            # Y is left / right
-            # X is up / down
-            if y < -20 or y > 20:
+        face_landmarks = results.multi_face_landmarks[0] # Only the primary face is analysed
+        if points is None:
+            points = landmarks_module.to_array(face_landmarks)
+
+        mp_drawing.draw_landmarks(
+            image=image,
+            landmark_list=face_landmarks,
+            connections=mp_face_mesh.FACEMESH_CONTOURS,
+            landmark_drawing_spec=None
+        )
+
+        # --- Mouth Movement Detection ---
+        mar = _mar(points[_MAR_POINTS, :2].tolist())
+
+        if mar > MOUTH_AR_THRESH:
+            mouth_ar_counter += 1
+        else:
+            mouth_ar_counter = 0
+
+        if mouth_ar_counter >= MOUTH_AR_CONSECUTIVE_FRAMES:
+            detection_results["mouth"] = 1
+
+        # --- Head Pose ---
+        angles = estimator.estimate(points, img_w, img_h)
+        if angles is not None:
+            pitch, yaw, roll = angles
+
+            # Yaw is left / right
+            # Pitch is up / down
+            if abs(yaw) > HEAD_YAW_THRESHOLD:
                 detection_results["head_x"] = 1
 
-            if x < -20 or x > 20: # Detect both up and down movement, increased threshold
+            if abs(pitch) > HEAD_PITCH_THRESHOLD: # Detect both up and down movement
                 detection_results["head_y"] = 1
-            
-            # Break after processing the first face for head pose to avoid conflicting data
-            break 
 
-    pose.mouth_ar_counter = mouth_ar_counter
-    return image, detection_results
\ No newline at end of file
+            detection_results["pitch"] = pitch
+            detection_results["yaw"] = yaw
+            detection_results["roll"] = roll
+
+        detection_results["mar"] = mar
+
+    state["mouth_ar_counter"] = mouth_ar_counter
+    return image, detection_results
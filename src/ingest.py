@@ -0,0 +1,495 @@
+"""
+Server-side analysis for the ingest API in app.py: candidates upload JPEG
+frames (and audio features computed on their machine) and a pool of
+worker processes runs the detection pipeline on them.
+
+Every session is pinned to one worker, which keeps that session's state
+(FaceMesh tracking, head pose, blink/mouth counters, suspicion score,
+event cooldowns, signal recording) between frames. Uploads are refused
+rather than queued without bound:
+
+- RateLimited: the session sends faster than MAX_FPS (token bucket).
+- Busy: the session already has MAX_IN_FLIGHT frames waiting, or its
+  worker's queue is full. The client should drop the frame, not resend it.
+
+This module does not import the detection modules: only the workers do,
+so the web process stays small and starts quickly.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+
+# --- Defaults ---
+WORKERS = int(os.environ.get("PROCTORING_WORKERS", "0")) or os.cpu_count() or 1
+QUEUE_SIZE = 16           # Messages waiting per worker before uploads are refused
+MAX_IN_FLIGHT = 2         # Frames of one session queued or being analysed at once
+MAX_FPS = 5.0             # Frames per second accepted from one session
+BURST = 5                 # Frames a session may send back to back after a pause
+DETECT_OBJECTS = os.environ.get("PROCTORING_INGEST_OBJECTS", "1") != "0"
+OBJECT_INTERVAL = 2.0     # Seconds between YOLO passes per session (it dominates a worker's time)
+SESSION_TIMEOUT = 120.0   # Seconds without uploads before a session is closed
+MAX_FRAME_BYTES = 2 * 2 ** 20
+MAX_BATCH = 8             # YOLO passes of different sessions run in one forward pass
+MAX_BATCH_WAIT = 0.05     # Seconds a worker holds a frame due for YOLO, waiting for other sessions' frames
+CONTROL_TIMEOUT = 5.0     # Seconds to wait for room in a full worker queue to open or close a session
+AUDIO_FEATURES = ("audio", "audio_level", "speech")  # Per-candidate audio values merged into every frame
+# Detection values sent back with every result, next to the score
+RESULT_FIELDS = ("faces", "pitch", "yaw", "roll", "gaze_h", "gaze_v", "ear", "mar", "object_conf",
+                 "audio_level", "speech")
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class RateLimited(Exception):
+    """The session is over its frame rate; retry after `retry_after` seconds."""
+    def __init__(self, retry_after):
+        super().__init__(f"frame rate limit exceeded, retry in {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class Busy(Exception):
+    """The session's worker cannot take another frame right now."""
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket: `rate` frames per second on average, up to `burst` at once."""
+    def __init__(self, rate=MAX_FPS, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """Takes a token. Returns 0 if one was available, else the seconds until there is one."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Session:
+    """The web process's view of one candidate session."""
+    def __init__(self, session_id, user, worker, rate=MAX_FPS, burst=BURST):
+        self.id = session_id
+        self.user = user
+        self.worker = worker
+        self.limiter = RateLimiter(rate, burst)
+        self.started = time.time()
+        self.last_seen = time.monotonic()
+        self.next_seq = 0         # Sequence number of the next accepted frame
+        self.in_flight = 0
+        self.accepted = 0
+        self.rate_limited = 0
+        self.busy = 0
+        self.processed = 0
+        self.errors = 0
+        self.latest = None        # Result of the newest analysed frame
+        self.last_error = None
+
+    def status(self):
+        return {
+            "session": self.id,
+            "started": self.started,
+            "frames": {"accepted": self.accepted, "processed": self.processed, "in_flight": self.in_flight,
+                       "rate_limited": self.rate_limited, "busy": self.busy, "errors": self.errors},
+            "latest": self.latest,
+            "last_error": self.last_error,
+        }
+
+
+class WorkerPool:
+    """
+    Worker processes plus the bookkeeping of the open sessions. Results
+    come back on a shared queue, read by a thread that also restarts dead
+    workers (their sessions start over with fresh state) and closes idle
+    sessions. All methods are thread-safe; Flask calls them from its
+    request threads.
+    """
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE, max_in_flight=MAX_IN_FLIGHT, max_fps=MAX_FPS,
+                 burst=BURST, detect_objects=DETECT_OBJECTS, object_interval=OBJECT_INTERVAL,
+                 max_batch=MAX_BATCH, max_batch_wait=MAX_BATCH_WAIT, session_timeout=SESSION_TIMEOUT, record=True):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight
+        self.max_fps = max_fps
+        self.burst = burst
+        self.session_timeout = session_timeout
+        self.settings = {"detect_objects": detect_objects, "object_interval": object_interval, "record": record,
+                         "max_batch": max_batch, "max_batch_wait": max_batch_wait}
+        # Spawned, not forked: the web process runs threads, and MediaPipe is only loaded in the workers
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._inboxes = []
+        self._processes = []
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._collector = threading.Thread(target=self._collect, name="ingest-results", daemon=True)
+        self.restarts = 0
+
+    def start(self):
+        for index in range(self.workers):
+            self._inboxes.append(self._context.Queue(self.queue_size))
+            self._processes.append(None)
+            self._spawn(index)
+        self._collector.start()
+        return self
+
+    def _spawn(self, index):
+        process = self._context.Process(target=_worker_main, name=f"ingest-worker-{index}", daemon=True,
+                                        args=(index, self._inboxes[index], self._results, self.settings))
+        process.start()
+        self._processes[index] = process
+
+    def stop(self, timeout=5.0):
+        """Closes every session (finalising their logs and recordings) and stops the workers."""
+        self._stop.set()
+        for inbox in self._inboxes:
+            try:
+                inbox.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout)
+
+    # --- Sessions ---
+
+    def open_session(self, user):
+        """Starts a session for `user` (the token's user dict) on the least loaded worker."""
+        with self._lock:
+            load = [0] * self.workers
+            for session in self._sessions.values():
+                load[session.worker] += 1
+            worker = load.index(min(load))
+            session = Session(uuid.uuid4().hex, user, worker, self.max_fps, self.burst)
+            self._sessions[session.id] = session
+        try:
+            # Waits for room: the session cannot start without its state on the worker
+            self._inboxes[worker].put(("open", session.id, _user_id(user)), timeout=CONTROL_TIMEOUT)
+        except queue.Full:
+            with self._lock:
+                del self._sessions[session.id]
+            raise Busy("server is at capacity", 1.0)
+        return session
+
+    def session(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session
+
+    def close_session(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise SessionNotFound(session_id)
+        try:
+            self._inboxes[session.worker].put(("close", session.id), timeout=CONTROL_TIMEOUT)
+        except queue.Full:
+            print(f"❌ Error: ingest worker {session.worker} did not take the close of session {session.id}")
+        return session
+
+    def submit_frame(self, session_id, jpeg, captured=None, audio_features=None):
+        """
+        Queues one JPEG frame for analysis. `captured` is the client's capture
+        time (epoch seconds) and `audio_features` the candidate's latest audio
+        values (see AUDIO_FEATURES). Returns the frame's sequence number and
+        the session's newest result; raises SessionNotFound, RateLimited or Busy.
+        """
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise SessionNotFound(session_id)
+            session.last_seen = now
+            wait = session.limiter.take(now)
+            if wait:
+                session.rate_limited += 1
+                raise RateLimited(wait)
+            if session.in_flight >= self.max_in_flight:
+                session.busy += 1
+                raise Busy("session has too many frames in flight", 1 / self.max_fps)
+            seq = session.next_seq
+            message = ("frame", session.id, seq, jpeg, now, captured or time.time(), audio_features or {})
+            try:
+                self._inboxes[session.worker].put_nowait(message)
+            except queue.Full:
+                session.busy += 1
+                raise Busy("server is at capacity", 1.0)
+            session.next_seq += 1
+            session.in_flight += 1
+            session.accepted += 1
+            latest = session.latest
+        return seq, latest
+
+    def submit_audio(self, session_id, audio_features):
+        """Updates the candidate's audio values between frames (dropped if the worker is full)."""
+        session = self.session(session_id)
+        session.last_seen = time.monotonic()
+        try:
+            self._inboxes[session.worker].put_nowait(("audio", session.id, audio_features))
+        except queue.Full:
+            raise Busy("server is at capacity", 1.0)
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "workers": [{"pid": p.pid, "alive": p.is_alive(), "queued": _qsize(inbox),
+                         "sessions": sum(1 for s in sessions if s.worker == i)}
+                        for i, (p, inbox) in enumerate(zip(self._processes, self._inboxes))],
+            "sessions": len(sessions),
+            "in_flight": sum(s.in_flight for s in sessions),
+            "processed": sum(s.processed for s in sessions),
+            "rate_limited": sum(s.rate_limited for s in sessions),
+            "busy": sum(s.busy for s in sessions),
+            "restarts": self.restarts,
+        }
+
+    # --- Results ---
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                self._handle(message)
+            if time.monotonic() - last_check >= 1.0:
+                last_check = time.monotonic()
+                self._check_workers()
+                self._close_idle()
+
+    def _handle(self, message):
+        kind, session_id, seq, payload = message
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.in_flight = max(0, session.in_flight - 1)
+            if kind == "result":
+                session.processed += 1
+                payload["seq"] = seq
+                payload["latency_ms"] = (time.monotonic() - payload.pop("received")) * 1000
+                session.latest = payload
+            else:
+                session.errors += 1
+                session.last_error = {"seq": seq, "error": payload}
+
+    def _check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._stop.is_set():
+                continue
+            print(f"❌ Error: ingest worker {index} exited ({process.exitcode}), restarting it")
+            self.restarts += 1
+            # A fresh queue: frames left in the old one belong to the lost state
+            self._inboxes[index] = self._context.Queue(self.queue_size)
+            self._spawn(index)
+            with self._lock:
+                sessions = [s for s in self._sessions.values() if s.worker == index]
+                for session in sessions:
+                    session.in_flight = 0
+            try:
+                for session in sessions:
+                    self._inboxes[index].put(("open", session.id, _user_id(session.user)), timeout=CONTROL_TIMEOUT)
+            except queue.Full:
+                print(f"❌ Error: ingest worker {index} did not take its sessions back")
+
+    def _close_idle(self):
+        cutoff = time.monotonic() - self.session_timeout
+        with self._lock:
+            idle = [s.id for s in self._sessions.values() if s.last_seen < cutoff]
+        for session_id in idle:
+            try:
+                self.close_session(session_id)
+            except SessionNotFound:
+                pass
+
+
+def _user_id(user):
+    return user.get("id", user.get("usn", user.get("fullName")))
+
+
+def _qsize(q):
+    try:
+        return q.qsize()
+    except NotImplementedError:  # macOS
+        return None
+
+
+# --- Worker Process ---
+
+class _SessionState:
+    """Everything a worker keeps for one session between its frames."""
+    def __init__(self, session_id, user_id, settings):
+        import detection
+        import event_store
+        import pipeline
+        import recording
+        import scoring
+
+        self.pipeline = pipeline.FramePipeline(detect_objects=settings["detect_objects"],
+                                               object_interval=settings["object_interval"])
+        self.scorer = scoring.ScoringEngine()
+        self.event_log = event_store.SqliteEventLog(session_id=session_id, user_id=user_id)
+        self.last_logged = {}
+        self.recorder = recording.SignalRecorder(recording.default_path(session_id)) if settings["record"] else None
+        self.audio = {}
+        self._process = detection.process
+
+    def analyse(self, frame, received, captured, detections=None, audio=None, rgb_frame=None):
+        _, results = self.pipeline.process(frame, received, detections, rgb_frame)
+        results.update(self.audio if audio is None else audio)
+        fired = self._process(None, results, self.scorer, self.event_log, self.last_logged)
+        if self.recorder is not None:
+            self.recorder.record(results, self.scorer, captured)
+        return {
+            "score": self.scorer.score,
+            "cheating": self.scorer.cheating,
+            "events": [rule[2] for rule in fired],
+            "detections": {name: results[name] for name in RESULT_FIELDS if results.get(name) is not None},
+        }
+
+    def close(self):
+        self.pipeline.close()
+        self.event_log.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+class _PendingFrame:
+    """A decoded frame waiting in the worker's current batch."""
+    __slots__ = ("state", "session_id", "seq", "frame", "received", "captured", "audio", "due", "detections",
+                 "rgb_frame")
+
+    def __init__(self, state, session_id, seq, frame, received, captured, audio, due):
+        self.state = state
+        self.session_id = session_id
+        self.seq = seq
+        self.frame = frame
+        self.received = received
+        self.captured = captured
+        self.audio = audio      # The session's audio values as of this frame
+        self.due = due          # Whether this frame gets a YOLO pass
+        self.detections = None
+        self.rgb_frame = None   # mirror_to_rgb(frame), if made for the batched YOLO pass
+
+
+def _worker_main(index, inbox, results, settings):
+    """
+    Worker process loop, until None. Frames are analysed in batches: the
+    worker takes whatever is queued, and while a YOLO pass is due for one
+    of the frames it waits up to max_batch_wait seconds for frames of other
+    sessions (up to max_batch due passes), then runs those passes as one
+    batched forward pass before analysing the frames in arrival order.
+    """
+    import cv2
+    import numpy as np
+
+    import object_detection
+    import pipeline
+
+    max_batch, max_wait = settings["max_batch"], settings["max_batch_wait"]
+    if settings["detect_objects"]:
+        # Shared by all sessions of this worker
+        object_detection.detector_model.start()
+    sessions = {}
+    pending = []
+
+    def flush():
+        due = [item for item in pending if item.due]
+        if due:
+            try:
+                for item in due:
+                    item.rgb_frame = pipeline.mirror_to_rgb(item.frame)
+                images = [item.rgb_frame for item in due]
+                for item, detections in zip(due, object_detection.find_objects_batch(images, True, max_batch)):
+                    item.detections = detections
+            except Exception as e:
+                # Each pipeline then runs its own pass
+                print(f"❌ Error: ingest worker {index}, batched detection: {e!r}")
+        for item in pending:
+            try:
+                result = item.state.analyse(item.frame, item.received, item.captured, item.detections, item.audio,
+                                            item.rgb_frame)
+                result["received"] = item.received
+                results.put(("result", item.session_id, item.seq, result))
+            except Exception as e:
+                print(f"❌ Error: ingest worker {index}, session {item.session_id}: {e!r}")
+                results.put(("error", item.session_id, item.seq, repr(e)))
+        pending.clear()
+
+    running = True
+    while running:
+        message = inbox.get()
+        deadline = None  # Set once a YOLO pass is due in this batch
+        while True:
+            kind, session_id = (None, None) if message is None else message[:2]
+            try:
+                if message is None:
+                    running = False
+                elif kind == "open":
+                    sessions[session_id] = _SessionState(session_id, message[2], settings)
+                elif kind == "close":
+                    flush()
+                    state = sessions.pop(session_id, None)
+                    if state is not None:
+                        state.close()
+                elif kind == "audio":
+                    if session_id in sessions:
+                        sessions[session_id].audio.update(message[2])
+                elif kind == "frame":
+                    _, _, seq, jpeg, received, captured, audio_features = message
+                    state = sessions.get(session_id)
+                    frame = None if state is None else cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8),
+                                                                   cv2.IMREAD_COLOR)
+                    if state is None:
+                        results.put(("error", session_id, seq, "session is not open on its worker"))
+                    elif frame is None:
+                        results.put(("error", session_id, seq, "frame is not a decodable image"))
+                    else:
+                        state.audio.update(audio_features)
+                        # One pass per session per batch: a second frame reuses the first one's objects
+                        due = (state.pipeline.objects_due(received)
+                               and not any(item.state is state and item.due for item in pending))
+                        pending.append(_PendingFrame(state, session_id, seq, frame, received, captured,
+                                                     dict(state.audio), due))
+                        if due and deadline is None:
+                            deadline = time.monotonic() + max_wait
+            except Exception as e:
+                # One bad message or session must not take the worker (and its other sessions) down
+                print(f"❌ Error: ingest worker {index}, session {session_id}: {e!r}")
+                if kind == "frame":
+                    results.put(("error", session_id, message[2], repr(e)))
+            if not running:
+                break
+            # Take what is already queued; wait for more only while a due YOLO batch is not full
+            if sum(1 for item in pending if item.due) >= max_batch:
+                break
+            try:
+                if deadline is None:
+                    message = inbox.get_nowait()
+                else:
+                    message = inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        flush()
+    for state in sessions.values():
+        state.close()
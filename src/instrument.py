@@ -0,0 +1,185 @@
+"""
+Hot-path instrumentation: named timing spans with rolling latency
+percentiles per stage, for finding where a frame's time goes.
+
+    with instrument.span("face_mesh"):
+        results = face_mesh.process(image)
+
+Spans cost nothing worth measuring until enable() is called: span() then
+returns a shared do-nothing context manager. Enabled, each span records
+its duration into a ring of the stage's last WINDOW samples, from which
+snapshot() computes p50/p95/p99 and the call rate (for the "frame" stage,
+the FPS). Dumper appends snapshots to a JSON-lines file periodically.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+ENABLED = False
+WINDOW = 1024               # Samples per stage kept for the rolling percentiles
+PERCENTILES = (50, 95, 99)
+DUMP_INTERVAL = 10.0        # Seconds between two Dumper snapshots
+
+
+class Stage:
+    """Rolling timings of one named stage."""
+    def __init__(self, name, window=WINDOW):
+        self.name = name
+        self.durations = np.zeros(window)
+        self.ends = np.zeros(window)   # perf_counter() at the end of each sample, for the call rate
+        self.index = 0
+        self.count = 0                 # Samples ever recorded
+        self.total = 0.0               # Seconds ever recorded
+
+    def add(self, seconds, end=None):
+        i = self.index
+        self.durations[i] = seconds
+        self.ends[i] = time.perf_counter() if end is None else end
+        self.index = (i + 1) % len(self.durations)
+        self.count += 1
+        self.total += seconds
+
+    def stats(self):
+        """Percentiles, mean and max of the rolling window in ms, and calls per second."""
+        n = min(self.count, len(self.durations))
+        if n == 0:
+            return None
+        durations = self.durations[:n] * 1000
+        p = np.percentile(durations, PERCENTILES)
+        stats = {f"p{q}_ms": float(v) for q, v in zip(PERCENTILES, p)}
+        stats.update(count=self.count, mean_ms=float(durations.mean()), max_ms=float(durations.max()))
+        ends = self.ends[:n]
+        span = ends.max() - ends.min()
+        stats["rate"] = (n - 1) / span if span > 0 else 0.0
+        return stats
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.stage.add(end - self.start, end)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_stages = {}
+_stages_lock = threading.Lock()
+
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+
+def stage(name):
+    """The Stage for `name`, created on first use."""
+    found = _stages.get(name)
+    if found is None:
+        with _stages_lock:
+            found = _stages.setdefault(name, Stage(name))
+    return found
+
+
+def span(name):
+    """Context manager timing its block as stage `name` (a no-op while disabled)."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(stage(name))
+
+
+def add(name, seconds):
+    """Records a duration measured elsewhere."""
+    if ENABLED:
+        stage(name).add(seconds)
+
+
+def reset():
+    with _stages_lock:
+        _stages.clear()
+
+
+def snapshot():
+    """{stage name: stats} for every stage with samples."""
+    stats = {}
+    for name, found in list(_stages.items()):
+        stage_stats = found.stats()
+        if stage_stats is not None:
+            stats[name] = stage_stats
+    return stats
+
+
+def summary_lines(stats=None):
+    """Short text lines for the debug overlay: FPS, then each stage's p50/p95 in ms."""
+    stats = snapshot() if stats is None else stats
+    lines = []
+    if "frame" in stats:
+        frame = stats["frame"]
+        lines.append(f"FPS {frame['rate']:.1f}  frame p50 {frame['p50_ms']:.1f} p95 {frame['p95_ms']:.1f} ms")
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]["p50_ms"]):
+        if name != "frame":
+            lines.append(f"{name:<16} {s['p50_ms']:6.2f} {s['p95_ms']:6.2f} ms")
+    return lines
+
+
+def format_table(stats=None):
+    """Multi-line table of every stage, slowest first."""
+    stats = snapshot() if stats is None else stats
+    rows = [f"{'stage':<18} {'count':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)"]
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]["mean_ms"]):
+        rows.append(f"{name:<18} {s['count']:>8} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+                    f"{s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+    return "\n".join(rows)
+
+
+class Dumper:
+    """Appends a timestamped snapshot() to a JSON-lines file every `interval` seconds, and on stop()."""
+    def __init__(self, path, interval=DUMP_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="instrument-dump", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def dump(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), "stages": snapshot()}) + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._dump_safely()
+        self._dump_safely()
+
+    def _dump_safely(self):
+        try:
+            self.dump()
+        except OSError as e:
+            print(f"❌ Error: Could not write timings to {self.path}: {e}")
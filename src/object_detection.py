@@ -1,18 +1,55 @@
 import cv2
 import numpy as np
 import os
+import threading
+import time
+
+import capture
+import instrument
+import model_loader
 
 # --- Constants and Model Loading ---
 PROHIBITED_OBJECTS = ["cell phone", "book", "laptop", "remote", "keyboard"] # Add headphones if your model supports it
 CONF_THRESHOLD = 0.5
 NMS_THRESHOLD = 0.4
+DETECTION_INTERVAL = 0.5 # Seconds between YOLO passes when run on the background worker
+MAX_RESULT_AGE = 2.0     # Worker results older than this are treated as "no object"
 
 # Construct absolute paths to model files
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(SCRIPT_DIR, "models")
 COCO_NAMES_PATH = os.path.join(MODELS_DIR, "coco.names")
-YOLO_WEIGHTS_PATH = os.path.join(MODELS_DIR, "yolov3.weights")
-YOLO_CFG_PATH = os.path.join(MODELS_DIR, "yolov3.cfg")
+
+# --- Detector Backends ---
+# Every deployable model is described here. "layout" says how to read the
+# network output: "yolo" rows are (cx, cy, w, h) relative to the image with
+# class scores already multiplied by objectness (Darknet YOLO in OpenCV);
+# "yolov5" rows are in input-size pixels with raw class probabilities
+# (Ultralytics ONNX exports). Choose one with PROCTORING_DETECTOR and
+# override its blob size with PROCTORING_DETECTOR_SIZE.
+DETECTOR_BACKENDS = {
+    "yolov3": {
+        "format": "darknet", "model": "yolov3.weights", "config": "yolov3.cfg",
+        "input_size": 320, "layout": "yolo", "target": cv2.dnn.DNN_TARGET_CPU,
+    },
+    # Same network with reduced-precision inference where OpenCV supports it
+    "yolov3-fp16": {
+        "format": "darknet", "model": "yolov3.weights", "config": "yolov3.cfg",
+        "input_size": 320, "layout": "yolo",
+        "target": getattr(cv2.dnn, "DNN_TARGET_CPU_FP16", cv2.dnn.DNN_TARGET_CPU),
+    },
+    "yolov3-tiny": {
+        "format": "darknet", "model": "yolov3-tiny.weights", "config": "yolov3-tiny.cfg",
+        "input_size": 416, "layout": "yolo", "target": cv2.dnn.DNN_TARGET_CPU,
+    },
+    # ONNX exports usually have a fixed input size; only change it for dynamic models
+    "yolov5s-onnx": {
+        "format": "onnx", "model": "yolov5s.onnx", "config": None,
+        "input_size": 640, "layout": "yolov5", "target": cv2.dnn.DNN_TARGET_CPU,
+    },
+}
+DETECTOR_NAME = os.environ.get("PROCTORING_DETECTOR", "yolov3")
+DETECTOR_INPUT_SIZE = int(os.environ.get("PROCTORING_DETECTOR_SIZE", "0")) or None
 
 # Load class names
 try:
@@ -22,66 +59,255 @@ except FileNotFoundError:
     print(f"Error: {COCO_NAMES_PATH} not found. Make sure the model files are in the 'src/models/' directory.")
     CLASSES = []
 
-# Load YOLO model
-try:
-    net = cv2.dnn.readNet(YOLO_WEIGHTS_PATH, YOLO_CFG_PATH)
-    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-    LAYER_NAMES = net.getLayerNames()
-    OUTPUT_LAYERS = [LAYER_NAMES[i - 1] for i in net.getUnconnectedOutLayers()]
-except cv2.error:
-    print(f"Error: YOLO model files not found. Make sure '{os.path.basename(YOLO_WEIGHTS_PATH)}' and '{os.path.basename(YOLO_CFG_PATH)}' are in the 'src/models/' directory.")
-    net = None
+# Class ids of PROHIBITED_OBJECTS. Post-processing only looks at these score
+# columns, so the detector effectively has a head restricted to them.
+PROHIBITED_CLASS_IDS = np.array([i for i, name in enumerate(CLASSES) if name in PROHIBITED_OBJECTS], dtype=np.int64)
+
+
+class Detector:
+    """A loaded object-detection network plus what is needed to run it."""
+    def __init__(self, name, input_size=None):
+        if name not in DETECTOR_BACKENDS:
+            raise KeyError(f"Unknown detector backend '{name}'. Available: {', '.join(DETECTOR_BACKENDS)}")
+        self.name = name
+        self.spec = DETECTOR_BACKENDS[name]
+        self.input_size = input_size or self.spec["input_size"]
+        self.layout = self.spec["layout"]
+
+        model_path = os.path.join(MODELS_DIR, self.spec["model"])
+        config_path = os.path.join(MODELS_DIR, self.spec["config"]) if self.spec["config"] else None
+        for path in (model_path, config_path):
+            if path and not os.path.isfile(path):
+                raise FileNotFoundError(path)
+
+        if self.spec["format"] == "onnx":
+            self.net = cv2.dnn.readNetFromONNX(model_path)
+        else:
+            self.net = cv2.dnn.readNet(model_path, config_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(self.spec["target"])
+        layer_names = self.net.getLayerNames()
+        self.output_layers = [layer_names[i - 1] for i in np.asarray(self.net.getUnconnectedOutLayers()).flatten()]
+
+    def forward(self, image, rgb=False):
+        """Runs the network on one frame and returns its raw layer outputs."""
+        blob = cv2.dnn.blobFromImage(image, 1/255.0, (self.input_size, self.input_size), swapRB=not rgb, crop=False)
+        self.net.setInput(blob)
+        return self.net.forward(self.output_layers)
+
+    def forward_batch(self, images, rgb=False):
+        """
+        Runs the network once on several frames (of any sizes) and returns
+        each frame's raw layer outputs, as forward() would for that frame.
+        """
+        size = (self.input_size, self.input_size)
+        blob = cv2.dnn.blobFromImages(images, 1/255.0, size, swapRB=not rgb, crop=False)
+        self.net.setInput(blob)
+        outputs = self.net.forward(self.output_layers)
+        # Batched outputs have a leading frame axis; a batch of one may come back without it
+        if len(images) == 1:
+            return [[out[0] if out.ndim == 3 else out for out in outputs]]
+        return [[out[k] for out in outputs] for k in range(len(images))]
+
+    def decode(self, layer_outputs):
+        """Converts raw outputs to "yolo" layout rows for postprocess_outputs."""
+        if self.layout == "yolo":
+            return layer_outputs
+        outputs = np.concatenate([out.reshape(-1, out.shape[-1]) for out in layer_outputs])
+        outputs[:, :4] /= self.input_size
+        outputs[:, 5:] *= outputs[:, 4:5]
+        return [outputs]
+
+    def find_objects(self, image, rgb=False):
+        height, width, _ = image.shape
+        return postprocess_outputs(self.decode(self.forward(image, rgb)), width, height)
+
+    def find_objects_batch(self, images, rgb=False):
+        """find_objects for every frame, with one forward pass."""
+        return [postprocess_outputs(self.decode(outputs), image.shape[1], image.shape[0])
+                for image, outputs in zip(images, self.forward_batch(images, rgb))]
+
+
+def load_detector(name=DETECTOR_NAME, input_size=DETECTOR_INPUT_SIZE):
+    """Loads a detector backend, returning None (with a message) if it is unavailable."""
+    try:
+        return Detector(name, input_size)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+    except (FileNotFoundError, cv2.error) as e:
+        spec = DETECTOR_BACKENDS[name]
+        files = [f"'{f}'" for f in (spec["model"], spec["config"]) if f]
+        verb = "is" if len(files) == 1 else "are"
+        print(f"Error: {name} model files not found. Make sure {' and '.join(files)} {verb} in the 'src/models/' directory.")
+    return None
+
+# The configured detector. It is loaded on first use, or ahead of time on a
+# background thread with detector_model.start(), never at import: reading the
+# YOLOv3 weights takes seconds and would hold up application start-up.
+detector_model = model_loader.LazyModel("object detector", load_detector)
+
+def find_objects(image, rgb=False):
+    """
+    Runs YOLO on the frame and returns the prohibited objects found as a list
+    of (class_name, confidence, (x, y, w, h)) tuples. Only the first
+    prohibited object is reported, matching the on-screen alert.
+    """
+    detector = detector_model.get()
+    if detector is None or not CLASSES:
+        return []
+    return detector.find_objects(image, rgb)
+
+def find_objects_batch(images, rgb=False, max_batch=None):
+    """
+    find_objects for many frames, e.g. one from each of several sessions:
+    the frames go through the network max_batch at a time (all at once by
+    default), one forward pass per batch, and the list of detections of
+    each frame comes back in the order the frames were given.
+    """
+    detector = detector_model.get()
+    if detector is None or not CLASSES:
+        return [[] for _ in images]
+    max_batch = max_batch or max(1, len(images))
+    detections = []
+    for start in range(0, len(images), max_batch):
+        detections.extend(detector.find_objects_batch(images[start:start + max_batch], rgb))
+    return detections
+
+def postprocess_outputs(layer_outputs, width, height, class_ids=None):
+    """
+    Turns YOLO layer outputs (rows of cx, cy, w, h, objectness, class
+    scores...) into the prohibited detections for a width x height frame.
+    Fully vectorised: rows are filtered by objectness and by their best score
+    among `class_ids` (PROHIBITED_CLASS_IDS by default) before NMS, and boxes
+    are scaled in one operation.
+    """
+    class_ids = PROHIBITED_CLASS_IDS if class_ids is None else class_ids
+    if len(class_ids) == 0:
+        return []
+    outputs = layer_outputs[0] if len(layer_outputs) == 1 else np.concatenate(layer_outputs)
+
+    # Class scores are objectness * class probability, so a row can only pass
+    # CONF_THRESHOLD if its objectness does; this drops most rows cheaply.
+    outputs = outputs[outputs[:, 4] > CONF_THRESHOLD]
+    if len(outputs) == 0:
+        return []
+
+    # Only the score columns of the classes we report are looked at.
+    scores = outputs[:, 5 + class_ids]
+    best = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), best]
+    keep = confidences > CONF_THRESHOLD
+    if not keep.any():
+        return []
+    outputs, best, confidences = outputs[keep], best[keep], confidences[keep]
+
+    # Scale (cx, cy, w, h) to pixels and convert to top-left (x, y, w, h).
+    boxes = (outputs[:, :4] * np.array([width, height, width, height])).astype(np.int32)
+    boxes[:, :2] = (boxes[:, :2] - boxes[:, 2:] / 2).astype(np.int32)
+
+    # Apply Non-Max Suppression
+    indices = cv2.dnn.NMSBoxes(boxes.tolist(), confidences.tolist(), CONF_THRESHOLD, NMS_THRESHOLD)
+    if len(indices) == 0:
+        return []
+
+    # NMS returns indices by descending confidence; report the strongest object.
+    i = int(np.asarray(indices).flatten()[0])
+    x, y, w, h = (int(v) for v in boxes[i])
+    return [(CLASSES[class_ids[best[i]]], float(confidences[i]), (x, y, w, h))]
+
+def draw_detections(image, detections, rgb=False):
+    """Draws a bounding box and label for each detection onto the (BGR or RGB) image."""
+    color = (255, 0, 0) if rgb else (0, 0, 255) # Red for prohibited objects
+    for class_name, confidence, (x, y, w, h) in detections:
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
+        text = f"{class_name}: {confidence:.2f}"
+        cv2.putText(image, text, (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return image
+
+def object_results(detections):
+    """The "object" flag and "object_conf", the strongest detection's confidence (0 if none)."""
+    return {"object": 1 if detections else 0, "object_conf": max((d[1] for d in detections), default=0.0)}
 
 def detect_objects(image, alert_manager=None):
     """
     Detects prohibited objects in the given image frame.
-    Updates the global OBJECT_CHEAT flag.
+    Draws them onto the image and returns it with the "object" flag.
     """
-    object_cheat = 0
+    detections = find_objects(image)
+    draw_detections(image, detections)
+    return image, object_results(detections)
 
-    if net is None or not CLASSES:
-        # Return the original image if the model isn't loaded
-        return image, {"object": object_cheat}
 
+class ObjectDetectionWorker:
+    """
+    Runs find_objects on a background thread at its own cadence, always on the
+    newest submitted frame, so the per-frame loop never waits for YOLO.
+    Results carry the capture time of the frame they were computed on.
+    """
+    def __init__(self, interval=DETECTION_INTERVAL, max_age=MAX_RESULT_AGE):
+        self.interval = interval    # Minimum seconds between two YOLO passes
+        self.max_age = max_age      # Results older than this no longer raise the flag
+        self.slot = capture.LatestFrameSlot()
+        self.detections = []
+        self.result_time = None     # Capture time of the frame behind self.detections
+        self.runs = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wants_frame = threading.Event()  # Set while the worker waits for its next frame
+        self._thread = threading.Thread(target=self._run, name="object-detection", daemon=True)
 
-    height, width, _ = image.shape
-    blob = cv2.dnn.blobFromImage(image, 1/255.0, (320, 320), swapRB=True, crop=False)
-    net.setInput(blob)
-    layer_outputs = net.forward(OUTPUT_LAYERS)
+    def start(self):
+        detector_model.start()
+        self._thread.start()
+        return self
 
-    boxes, confidences, class_ids = [], [], []
+    def submit(self, image, timestamp=None, rgb=False):
+        """
+        Offers a frame to the worker. It is only taken (and copied) when the
+        worker is ready for its next pass, so this is cheap to call every
+        frame and the caller may reuse or draw on its buffer straight away.
+        Returns True if the frame was taken.
+        """
+        if not self._wants_frame.is_set():
+            return False
+        self._wants_frame.clear()
+        self.slot.put((image.copy(), rgb), timestamp)
+        return True
 
-    for output in layer_outputs:
-        for detection in output:
-            scores = detection[5:]
-            class_id = np.argmax(scores)
-            confidence = scores[class_id]
-            if confidence > CONF_THRESHOLD:
-                center_x, center_y, w, h = (detection[0:4] * np.array([width, height, width, height])).astype('int')
-                x, y = int(center_x - w / 2), int(center_y - h / 2)
-                boxes.append([x, y, int(w), int(h)])
-                confidences.append(float(confidence))
-                class_ids.append(class_id)
+    def _run(self):
+        while not self._stop.is_set():
+            self._wants_frame.set()
+            item = self.slot.get(timeout=0.5)
+            if item is None:
+                continue
+            (image, rgb), timestamp, _ = item
+            started = time.monotonic()
+            with instrument.span("yolo"):
+                detections = find_objects(image, rgb)
+            with self._lock:
+                self.detections = detections
+                self.result_time = timestamp
+                self.runs += 1
+            # Keep the cadence independent of how fast frames arrive.
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
 
-    # Apply Non-Max Suppression
-    indices = cv2.dnn.NMSBoxes(boxes, confidences, CONF_THRESHOLD, NMS_THRESHOLD)
-
-    if len(indices) > 0:
-        for i in indices.flatten():
-            box = boxes[i]
-            x, y, w, h = box[0], box[1], box[2], box[3]
-            class_name = CLASSES[class_ids[i]]
-
-            if class_name in PROHIBITED_OBJECTS:
-                # A prohibited object is detected
-                object_cheat = 1
-                
-                # Draw bounding box and label
-                color = (0, 0, 255) # Red for prohibited objects
-                cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
-                text = f"{class_name}: {confidences[i]:.2f}"
-                cv2.putText(image, text, (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                break # Stop after finding one prohibited object
-
-    return image, {"object": object_cheat}
\ No newline at end of file
+    def results(self, now=None):
+        """
+        Returns (detections, results) for the latest finished pass. `results`
+        holds object_results() and "object_age", the age in seconds of the
+        frame it was computed on (None before the first pass).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            detections, result_time = self.detections, self.result_time
+        if result_time is None:
+            return [], dict(object_results([]), object_age=None)
+        age = now - result_time
+        if age > self.max_age:
+            detections = []
+        return detections, dict(object_results(detections), object_age=age)
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
@@ -0,0 +1,125 @@
+import functools
+
+import cv2
+import numpy as np
+
+# --- Overlay Layout ---
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+ALERT_SCALE = 0.7
+ALERT_THICKNESS = 2
+ALERT_ALPHA = 0.6        # Opacity of the black box behind each alert
+ALERT_TOP = 30           # Baseline of the first alert
+ALERT_SPACING = 30       # Distance between alert baselines
+BAR_WIDTH_FRACTION = 0.8 # Suspicion bar width relative to the frame
+STATUS_SCALE = 0.5
+STATS_SCALE = 0.4        # Timing overlay (instrument.summary_lines), top right
+STATS_SPACING = 15
+
+# Colours are RGB: the overlays are drawn on the display buffer (see pipeline.FramePipeline)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+YELLOW = (255, 255, 0)
+
+
+@functools.lru_cache(maxsize=256)
+def text_sprite(text, scale, thickness):
+    """
+    Renders `text` once and caches it: returns (mask, (width, height)) where
+    `mask` marks the pixels putText would set, with the baseline origin at
+    (thickness, thickness + height), and (width, height) is cv2.getTextSize.
+    Alerts repeat the same handful of strings, so each is rasterised once.
+    """
+    (width, height), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+    pad = thickness
+    canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+    cv2.putText(canvas, text, (pad, pad + height), FONT, scale, 255, thickness)
+    return canvas.astype(bool), (width, height)
+
+
+def draw_text(image, text, origin, color, scale, thickness):
+    """
+    Same pixels as cv2.putText(image, text, origin, FONT, ...), copied from
+    the cached sprite (up to how strokes are clipped at the frame edge).
+    """
+    mask, (_, height) = text_sprite(text, scale, thickness)
+    x0, y0 = origin[0] - thickness, origin[1] - height - thickness
+    roi, mask = _roi(image, x0, y0, mask)
+    roi[mask] = color
+
+
+def _roi(image, x0, y0, mask):
+    """The part of `image` under `mask` placed at (x0, y0), and the matching part of the mask."""
+    img_h, img_w = image.shape[:2]
+    mask_h, mask_w = mask.shape
+    left, top = max(0, -x0), max(0, -y0)
+    right, bottom = min(mask_w, img_w - x0), min(mask_h, img_h - y0)
+    if right <= left or bottom <= top:
+        return image[0:0, 0:0], mask[0:0, 0:0]
+    return image[y0 + top:y0 + bottom, x0 + left:x0 + right], mask[top:bottom, left:right]
+
+
+def darken(image, x0, y0, x1, y1, alpha=ALERT_ALPHA):
+    """Blends a black box over the inclusive rectangle (x0, y0)-(x1, y1), touching only that ROI."""
+    img_h, img_w = image.shape[:2]
+    x0, y0 = max(0, x0), max(0, y0)
+    x1, y1 = min(img_w, x1 + 1), min(img_h, y1 + 1)
+    if x1 > x0 and y1 > y0:
+        roi = image[y0:y1, x0:x1]
+        cv2.convertScaleAbs(roi, dst=roi, alpha=1 - alpha)
+
+
+def draw_alerts(image, alerts):
+    """
+    Draws each alert as red text on a translucent black box, stacked from the
+    top-left. Only the pixels inside the boxes are blended, once each,
+    instead of blending a full-frame copy per alert.
+    """
+    y_pos = ALERT_TOP
+    for alert_text in alerts:
+        _, (text_width, text_height) = text_sprite(alert_text, ALERT_SCALE, ALERT_THICKNESS)
+        darken(image, 10, y_pos - text_height - 5, 20 + text_width, y_pos + 5)
+        draw_text(image, alert_text, (20, y_pos), RED, ALERT_SCALE, ALERT_THICKNESS)
+        y_pos += ALERT_SPACING
+
+
+def draw_suspicion_bar(image, cheat_percent):
+    """Draws the suspicion bar and its label along the bottom of the frame."""
+    img_h, img_w = image.shape[:2]
+    bar_width = int(img_w * BAR_WIDTH_FRACTION)
+    bar_start_x = int((img_w - bar_width) / 2)
+    cheat_percent = max(0, min(1, cheat_percent))
+    fill_width = int(bar_width * cheat_percent)
+    cv2.rectangle(image, (bar_start_x, img_h - 40), (bar_start_x + bar_width, img_h - 20), WHITE, -1)
+    cv2.rectangle(image, (bar_start_x, img_h - 40), (bar_start_x + fill_width, img_h - 20), RED, -1)
+    draw_text(image, f"Suspicion Level: {cheat_percent:.0%}", (bar_start_x, img_h - 50), WHITE, 0.6, 2)
+
+
+def draw_status(image, lines):
+    """Draws status lines (e.g. models still loading) upwards from above the suspicion bar."""
+    y_pos = image.shape[0] - 70
+    for line in lines:
+        draw_text(image, line, (10, y_pos), YELLOW, STATUS_SCALE, 1)
+        y_pos -= 20
+
+
+def draw_stats(image, lines):
+    """Draws timing lines right-aligned in the top-right corner, on a translucent box."""
+    if not lines:
+        return
+    sizes = [text_sprite(line, STATS_SCALE, 1)[1] for line in lines]
+    width = max(w for w, _ in sizes)
+    x = image.shape[1] - width - 10
+    darken(image, x - 5, 5, x + width + 5, 10 + STATS_SPACING * len(lines))
+    y_pos = 5 + STATS_SPACING
+    for line in lines:
+        draw_text(image, line, (x, y_pos), WHITE, STATS_SCALE, 1)
+        y_pos += STATS_SPACING
+
+
+def draw(image, alerts, cheat_percent, status_lines=(), stats_lines=()):
+    """Draws every on-screen overlay onto the frame in one pass, in place."""
+    draw_suspicion_bar(image, cheat_percent)
+    draw_alerts(image, alerts)
+    draw_status(image, status_lines)
+    draw_stats(image, stats_lines)
+    return image
@@ -0,0 +1,243 @@
+"""
+Parallel offline analysis of long recordings: splits a video into time
+chunks and analyses them in a pool of worker processes, each with its own
+FaceMesh and YOLO, then merges the chunks' signal recordings in order into
+one recording equal to what replay.py --record produces frame by frame.
+
+State that runs across frames is continued from chunk to chunk:
+  - each chunk starts WARMUP_SECONDS early, so face tracking and head pose
+    smoothing are primed by the frames before it (not recorded);
+  - the blink and open-mouth counters are replayed over all face frames
+    (eye_gaze.long_blink_flags, head_pose.mouth_flags);
+  - frames without a face keep the last face frame's values, as in the
+    pipeline, even when that frame is in an earlier chunk;
+  - the suspicion score's EMA continues from the previous chunk's last
+    score (scoring.score_batch).
+
+Times in the recording are seconds into the video.
+
+Usage (from src/):
+    python parallel_replay.py exam.mp4 --workers 16 --record results/exam.npy
+    python parallel_replay.py frames_dir/ --workers 4 --no-objects
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import eye_gaze
+import frame_source
+import head_pose
+import recording
+import scoring
+
+CHUNK_SECONDS = 60.0   # Longest chunk; videos shorter than workers * this are split evenly
+WARMUP_SECONDS = 1.0   # Frames analysed before each chunk to prime tracking and smoothing
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Columns and flags that frames without a face take from the last face frame
+FACE_COLUMNS = ("pitch", "yaw", "roll", "gaze_h", "gaze_v", "ear", "mar")
+FACE_FLAGS = ("head_x", "head_y", "mouth", "multiple_faces", "eye_gaze", "long_blink")
+_FACE_BITS = sum(1 << recording.FLAGS.index(name) for name in FACE_FLAGS)
+_MOUTH_BIT = 1 << recording.FLAGS.index("mouth")
+_BLINK_BIT = 1 << recording.FLAGS.index("long_blink")
+_CHEATING_BIT = 1 << recording.FLAGS.index("cheating")
+
+
+def plan_chunks(frame_count, workers, chunk_frames):
+    """(start, stop) frame ranges covering the video; the last one runs to the end of the file."""
+    size = max(1, min(chunk_frames, -(-frame_count // max(1, workers))))
+    starts = list(range(0, max(frame_count, 1), size))
+    return [(start, stop) for start, stop in zip(starts, starts[1:] + [None])]
+
+
+def _init_worker():
+    import cv2
+
+    # One thread per process: the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def analyse_chunk(spec, start, stop, warmup, detect_objects, path, count=None):
+    """
+    Worker: analyses frames [start, stop) of `spec` into a signal recording
+    at `path`, after running the pipeline on `warmup` frames before `start`.
+    Returns the frame count, elapsed seconds and, per recorded frame, whether
+    the eyes were closed and the mouth open (from the unrounded values, for
+    the counters; meaningful on frames with a face).
+    """
+    import pipeline
+
+    begin = time.perf_counter()
+    source = frame_source.open_source(spec, count)
+    fps = source.fps or frame_source.DEFAULT_SYNTHETIC_FPS
+    first = max(0, start - warmup)
+    frame_pipeline = pipeline.FramePipeline(detect_objects=detect_objects)
+    closed, mouth_open = [], []
+    index = first
+    try:
+        source.seek(first)
+        with recording.SignalRecorder(path) as recorder:
+            for frame in source:
+                if stop is not None and index >= stop:
+                    break
+                if index < start:
+                    # Warm-up frames need no objects
+                    frame_pipeline.process(frame, detections=[] if detect_objects else None)
+                else:
+                    _, results = frame_pipeline.process(frame)
+                    recorder.record(results, timestamp=index / fps)
+                    face = results.get("faces", 0) > 0
+                    closed.append(face and results["ear"] < eye_gaze.EAR_THRESHOLD)
+                    mouth_open.append(face and results["mar"] > head_pose.MOUTH_AR_THRESH)
+                index += 1
+    finally:
+        frame_pipeline.close()
+        source.release()
+    return {
+        "start": start,
+        "frames": len(closed),
+        "seconds": time.perf_counter() - begin,
+        "closed": np.array(closed, dtype=bool),
+        "mouth_open": np.array(mouth_open, dtype=bool),
+    }
+
+
+class ChunkMerger:
+    """Continues the cross-frame state from each chunk into the next and appends the fixed rows to `recorder`."""
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.blink_counter = 0
+        self.mouth_counter = 0
+        self.score = 0.0
+        # The last face frame seen; before any, frames have no face values
+        self.last_face = np.zeros(1, dtype=recording.SCHEMA)
+        for name in FACE_COLUMNS:
+            self.last_face[name] = np.nan
+
+    def add(self, records, closed, mouth_open):
+        rows = np.array(records)  # A writable copy
+        face = rows["faces"] > 0
+
+        # Counters, over the face frames only as in the pipeline
+        blink, self.blink_counter = eye_gaze.long_blink_flags(closed[face], self.blink_counter)
+        mouth, self.mouth_counter = head_pose.mouth_flags(mouth_open[face], self.mouth_counter)
+        flags = rows["flags"][face] & ~np.uint16(_BLINK_BIT | _MOUTH_BIT)
+        rows["flags"][face] = flags | np.where(blink, _BLINK_BIT, 0) | np.where(mouth, _MOUTH_BIT, 0)
+
+        # Frames without a face repeat the last face frame
+        extended = np.concatenate([self.last_face, rows])
+        source = np.maximum.accumulate(np.where(np.concatenate([[True], face]), np.arange(len(extended)), 0))[1:]
+        missing = ~face
+        for name in FACE_COLUMNS:
+            rows[name][missing] = extended[name][source[missing]]
+        carried = extended["flags"][source[missing]] & np.uint16(_FACE_BITS)
+        rows["flags"][missing] = (rows["flags"][missing] & ~np.uint16(_FACE_BITS)) | carried
+        if face.any():
+            self.last_face = rows[np.flatnonzero(face)[-1:]].copy()
+
+        # Scores, continuing the EMA
+        scored = scoring.score_batch(recording.signals(rows), initial=self.score)
+        rows["raw"] = scored["raw"]
+        rows["score"] = scored["score"]
+        rows["flags"] = np.where(scored["cheating"], rows["flags"] | _CHEATING_BIT, rows["flags"] & ~np.uint16(_CHEATING_BIT))
+        if len(rows):
+            self.score = float(scored["score"][-1])
+        self.recorder.extend(rows)
+
+
+def analyse(spec, record_path, workers=DEFAULT_WORKERS, detect_objects=True, chunk_seconds=CHUNK_SECONDS,
+            warmup_seconds=WARMUP_SECONDS, max_frames=None, quiet=False):
+    """
+    Analyses `spec` in parallel chunks into the recording at `record_path`.
+    Returns a summary dict with the frame count, elapsed seconds, frames/second
+    and the summed seconds the workers spent on their chunks.
+    """
+    with frame_source.open_source(spec, max_frames) as source:
+        fps = source.fps or frame_source.DEFAULT_SYNTHETIC_FPS
+        frame_count = source.frame_count
+    if frame_count is None:
+        raise ValueError(f"{spec} has no known length and cannot be split")
+    if max_frames is not None:
+        frame_count = min(frame_count, max_frames)
+    chunks = plan_chunks(frame_count, workers, round(chunk_seconds * fps))
+    if max_frames is not None:
+        chunks[-1] = (chunks[-1][0], frame_count)
+    warmup = round(warmup_seconds * fps)
+
+    start = time.perf_counter()
+    frames = 0
+    busy = 0.0
+    with tempfile.TemporaryDirectory(prefix="parallel_replay_") as tmp, \
+            recording.SignalRecorder(record_path) as recorder, \
+            concurrent.futures.ProcessPoolExecutor(min(workers, len(chunks)), multiprocessing.get_context("spawn"),
+                                                   initializer=_init_worker) as pool:
+        paths = [os.path.join(tmp, f"chunk_{k:05d}.npy") for k in range(len(chunks))]
+        futures = [pool.submit(analyse_chunk, spec, first, stop, warmup, detect_objects, path, max_frames)
+                   for (first, stop), path in zip(chunks, paths)]
+        merger = ChunkMerger(recorder)
+        # Chunks are merged in order as they finish
+        for k, (future, path) in enumerate(zip(futures, paths)):
+            chunk = future.result()
+            merger.add(recording.load(path), chunk["closed"], chunk["mouth_open"])
+            os.remove(path)
+            frames += chunk["frames"]
+            busy += chunk["seconds"]
+            if not quiet:
+                elapsed = time.perf_counter() - start
+                print(f"chunk {k + 1}/{len(chunks)}: {frames} frames | {frames / elapsed:.1f} FPS")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "chunks": len(chunks),
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "worker_seconds": busy,
+    }
+
+
+def _clock(seconds):
+    return f"{int(seconds // 60):02d}:{seconds % 60:04.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a long recording in parallel time chunks.")
+    parser.add_argument("source", help="video file, image directory or 'synthetic[:WxH]'")
+    parser.add_argument("--record", help="signal recording to write (.npy, see recording.py); "
+                                         "default logs/signals_<source name>.npy")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS, help="longest chunk, in video seconds")
+    parser.add_argument("--warmup-seconds", type=float, default=WARMUP_SECONDS,
+                        help="video seconds analysed before each chunk to prime tracking")
+    parser.add_argument("--max-frames", type=int, help="stop after this many frames")
+    parser.add_argument("--no-objects", action="store_true", help="skip YOLO object detection")
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+    args = parser.parse_args(argv)
+
+    record_path = args.record or recording.default_path(os.path.splitext(os.path.basename(args.source.rstrip("/\\")))[0])
+    try:
+        stats = analyse(args.source, record_path, args.workers, not args.no_objects, args.chunk_seconds,
+                        args.warmup_seconds, args.max_frames, args.quiet)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    records = recording.load(record_path)
+    up, down = scoring.crossings(records["score"])
+    for k, first in enumerate(up):
+        end = f"{_clock(records['time'][down[k]])}" if k < len(down) else "end"
+        print(f"  cheating from {_clock(records['time'][first])} to {end}")
+    print(f"✅ Processed {stats['frames']} frames in {stats['chunks']} chunks in {stats['seconds']:.2f}s "
+          f"({stats['fps']:.1f} FPS, {stats['worker_seconds'] / max(stats['seconds'], 1e-9):.1f} workers busy) "
+          f"-> {record_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
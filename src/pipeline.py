@@ -0,0 +1,157 @@
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import head_pose
+import eye_gaze
+import instrument
+import landmarks
+import model_loader
+import object_detection
+
+
+def mirror_to_rgb(frame, out=None):
+    """
+    Mirrors a BGR frame and converts it to RGB into `out`, reallocating it
+    only if the frame size changed. Converting into the buffer and flipping
+    in place avoids the two full-frame allocations of flip() + cvtColor().
+    """
+    if out is None or out.shape != frame.shape:
+        out = np.empty_like(frame)
+    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+    cv2.flip(out, 1, dst=out)
+    return out
+
+
+class FramePipeline:
+    """
+    Runs every per-frame detection stage (FaceMesh, head pose, eye gaze and
+    object detection) on a single BGR frame, independent of any GUI.
+    Used by both the Tk app and the headless replay runner.
+    """
+    def __init__(self, alert_manager=None, detect_objects=True, async_objects=False, rgb_output=False,
+                 object_interval=0.0):
+        self.alert_manager = alert_manager
+        self.detect_objects = detect_objects
+        # Without async_objects, YOLO runs on the frame loop: on every frame, or
+        # at most once per object_interval seconds (frame timestamps), keeping
+        # the previous detections in between.
+        self.object_interval = object_interval
+        self._object_time = None
+        self._detections = []
+        # With rgb_output the annotated frame is returned in RGB, ready for
+        # display, and is the pipeline's own reused buffer (see process()).
+        self.rgb_output = rgb_output
+        self._frame_buffer = None
+        # With async_objects YOLO runs on its own worker at DETECTION_INTERVAL
+        # instead of on every frame; its latest result is merged in each frame.
+        # The YOLO weights load in the background (async) or on the first frame
+        # (sync); see model_status() for the readiness of each model.
+        self.object_worker = None
+        if detect_objects and async_objects:
+            self.object_worker = object_detection.ObjectDetectionWorker().start()
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            max_num_faces=2,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        # Head pose keeps the previous frame's angles to smooth from
+        self.head_pose_estimator = head_pose.HeadPoseEstimator()
+        # Blink and open-mouth frame counters of this pipeline's face
+        self.counters = {}
+
+        # Results from the last frame in which each stage ran. Head pose and
+        # gaze keep their previous values when no face is found, as before.
+        self.head_pose_results = {}
+        self.eye_gaze_results = {}
+        self.object_detection_results = {}
+
+    def objects_due(self, timestamp=None):
+        """Whether a frame at `timestamp` gets a synchronous YOLO pass (see object_interval)."""
+        if not self.detect_objects or self.object_worker:
+            return False
+        now = time.monotonic() if timestamp is None else timestamp
+        return self._object_time is None or now - self._object_time >= self.object_interval
+
+    def process(self, frame, timestamp=None, detections=None, rgb_frame=None):
+        """
+        Mirrors the frame and runs all detections on it. `timestamp` is the
+        frame's capture time (time.monotonic()), used to age async results.
+        `detections` are this frame's objects if they were found elsewhere
+        (find_objects_batch on the mirrored RGB frame, batched with other
+        sessions' frames); the pipeline's own YOLO pass is then skipped.
+        `rgb_frame` is mirror_to_rgb(frame) if the caller already made it;
+        the pipeline then works on that array instead of converting again.
+        Returns the annotated image and the merged detection results. The
+        image is BGR, or with rgb_output the pipeline's RGB buffer, which is
+        overwritten by the next call: display or copy it before then.
+        """
+        # One conversion into a reused buffer; detection runs on it and, with
+        # rgb_output, the overlays are drawn straight onto it as well.
+        with instrument.span("mirror_rgb"):
+            if rgb_frame is None:
+                rgb_frame = mirror_to_rgb(frame, self._frame_buffer)
+            rgb_image = self._frame_buffer = rgb_frame
+        with instrument.span("objects"):
+            if self.object_worker:
+                # The worker copies the frame only when it is ready for a new one.
+                self.object_worker.submit(rgb_image, timestamp, rgb=True)
+                detections, self.object_detection_results = self.object_worker.results()
+            elif detections is not None or self.objects_due(timestamp):
+                if detections is None:
+                    # Before anything is drawn on the frame
+                    detections = object_detection.find_objects(rgb_image, rgb=True)
+                self._detections = detections
+                self.object_detection_results = object_detection.object_results(detections)
+                self._object_time = time.monotonic() if timestamp is None else timestamp
+            elif self.detect_objects:
+                detections = self._detections
+            else:
+                detections = []
+
+        with instrument.span("face_mesh"):
+            rgb_image.flags.writeable = False
+            results = self.face_mesh.process(rgb_image)
+            rgb_image.flags.writeable = True
+        image = rgb_image if self.rgb_output else cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
+
+        # Eye gaze and blink detection
+        if results.multi_face_landmarks:
+            # Extract the primary face's landmarks into an array once per frame.
+            points = landmarks.to_array(results.multi_face_landmarks[0])
+            with instrument.span("head_pose"):
+                image, self.head_pose_results = head_pose.pose(
+                    image, results, self.alert_manager, points, self.head_pose_estimator, self.counters)
+            with instrument.span("eye_gaze"):
+                self.eye_gaze_results = eye_gaze.process_face_landmarks(image, points, self.counters)
+        else:
+            # Face lost: the next pose is solved from scratch
+            self.head_pose_estimator.reset()
+            self.head_pose_results = dict(self.head_pose_results, faces=0)
+
+        with instrument.span("draw_detections"):
+            object_detection.draw_detections(image, detections, rgb=self.rgb_output)
+        return image, self.results()
+
+    def model_status(self):
+        """Readiness of each model the pipeline uses (see model_loader), by display name."""
+        status = {"Face mesh": model_loader.READY}
+        if self.detect_objects:
+            status["Object detector"] = object_detection.detector_model.state
+        return status
+
+    def results(self):
+        """Merges the latest results of every stage into one dict."""
+        detection_results = {}
+        detection_results.update(self.head_pose_results)
+        detection_results.update(self.eye_gaze_results)
+        detection_results.update(self.object_detection_results)
+        return detection_results
+
+    def close(self):
+        if self.object_worker:
+            self.object_worker.stop()
+        self.face_mesh.close()
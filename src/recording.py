@@ -0,0 +1,233 @@
+"""
+Per-frame signal recording: the continuous values behind every scoring
+decision (head angles, gaze ratios, EAR, MAR, face count, object
+confidence, audio level, speech probability, score) in a fixed-schema
+structured array, one row per frame, one file per session.
+
+Files are standard .npy files. The writer grows them a chunk at a time
+and writes rows straight into a memory map, so recording a frame is one
+row assignment. Readers map them without copying, so multi-hour sessions
+can be replayed, rescored or plotted without loading them:
+
+    records = recording.load("logs/signals_<session>.npy")
+    records["yaw"], records["time"]                     # zero-copy columns
+    scoring.score_batch(recording.signals(records))
+
+Usage (from src/):
+    python recording.py logs/signals_<session>.npy
+    python recording.py logs/signals_*.npy --thresh 0.5 0.6
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+
+import numpy as np
+
+import event_log
+
+CHUNK_RECORDS = 4096   # The file grows by this many rows at a time
+HEADER_BYTES = 4096    # .npy header, padded so the rows start page-aligned
+
+SCHEMA = np.dtype([
+    ("time", "<f8"),          # Epoch seconds
+    ("score", "<f4"),         # Smoothed suspicion score
+    ("raw", "<f4"),           # Unsmoothed score of this frame
+    ("pitch", "<f4"),         # Head angles in degrees
+    ("yaw", "<f4"),
+    ("roll", "<f4"),
+    ("gaze_h", "<f4"),        # Average gaze ratios of both eyes
+    ("gaze_v", "<f4"),
+    ("ear", "<f4"),           # Eye aspect ratio
+    ("mar", "<f4"),           # Mouth aspect ratio
+    ("object_conf", "<f4"),   # Confidence of the strongest prohibited object (0: none)
+    ("audio_level", "<f4"),   # Loudness (audio.LoudnessMonitor.level)
+    ("speech", "<f4"),        # Speech probability (vad.SpeechDetector)
+    ("faces", "u1"),          # Faces in the frame
+    ("flags", "<u2"),         # FLAGS bits
+])
+
+# Bit of each on/off detection signal in the "flags" column
+FLAGS = ("head_x", "head_y", "mouth", "multiple_faces", "eye_gaze", "long_blink", "object", "audio", "cheating")
+_FLAG_BITS = tuple((name, 1 << i) for i, name in enumerate(FLAGS))
+# Float columns taken from the detection results as they are; missing values are stored as NaN
+_VALUE_COLUMNS = ("pitch", "yaw", "roll", "gaze_h", "gaze_v", "ear", "mar", "object_conf", "audio_level", "speech")
+
+
+def default_path(session_id):
+    return os.path.join(event_log.LOG_DIR, f"signals_{session_id}.npy")
+
+
+def _header(count):
+    """A .npy (version 1.0) header for `count` SCHEMA rows, padded to HEADER_BYTES."""
+    header = repr({"descr": np.lib.format.dtype_to_descr(SCHEMA), "fortran_order": False, "shape": (count,)})
+    preamble = b"\x93NUMPY\x01\x00" + (HEADER_BYTES - 10).to_bytes(2, "little")
+    return preamble + header.encode("latin1").ljust(HEADER_BYTES - 11) + b"\n"
+
+
+class SignalRecorder:
+    """
+    Appends one SCHEMA row per frame to a session file. The file is grown
+    CHUNK_RECORDS rows at a time and the current chunk is memory-mapped, so
+    record() only assigns a row; the OS writes the pages back. The header's
+    row count is updated on flush() and close(); load() also copes with
+    files whose writer never closed them.
+    """
+    def __init__(self, path, chunk_records=CHUNK_RECORDS):
+        self.path = path
+        self.chunk_records = chunk_records
+        self.count = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "w+b")
+        self._file.write(_header(0))
+        self._chunk = None
+        self._chunk_start = 0
+        self._nan = float("nan")
+
+    def record(self, detection_results, scorer=None, timestamp=None):
+        """Stores one frame's detection results (and the scorer's score and flag)."""
+        index = self.count - self._chunk_start
+        if self._chunk is None or index == self.chunk_records:
+            self._next_chunk()
+            index = 0
+        get = detection_results.get
+        nan = self._nan
+        flags = 0
+        for name, bit in _FLAG_BITS[:-1]:
+            if get(name):
+                flags |= bit
+        if scorer is not None and scorer.cheating:
+            flags |= _FLAG_BITS[-1][1]
+        values = [get(name) for name in _VALUE_COLUMNS]
+        values = [nan if value is None else value for value in values]
+        self._chunk[index] = (
+            time.time() if timestamp is None else timestamp,
+            nan if scorer is None else scorer.score,
+            nan if scorer is None else scorer.raw,
+            *values,
+            get("faces", 0),
+            flags,
+        )
+        self.count += 1
+
+    def extend(self, records):
+        """Appends rows that are already SCHEMA records (e.g. read from other recordings)."""
+        done = 0
+        while done < len(records):
+            index = self.count - self._chunk_start
+            if self._chunk is None or index == self.chunk_records:
+                self._next_chunk()
+                index = 0
+            take = min(len(records) - done, self.chunk_records - index)
+            self._chunk[index:index + take] = records[done:done + take]
+            self.count += take
+            done += take
+
+    def _next_chunk(self):
+        """Grows the file by a chunk and maps it."""
+        if self._chunk is not None:
+            self._chunk.flush()
+        self._chunk_start = self.count
+        self._file.truncate(HEADER_BYTES + (self.count + self.chunk_records) * SCHEMA.itemsize)
+        self._chunk = np.memmap(self._file, dtype=SCHEMA, mode="r+", shape=(self.chunk_records,),
+                                offset=HEADER_BYTES + self.count * SCHEMA.itemsize)
+
+    def flush(self):
+        """Writes mapped rows back and updates the row count in the header."""
+        if self._chunk is not None:
+            self._chunk.flush()
+        self._file.seek(0)
+        self._file.write(_header(self.count))
+        self._file.flush()
+
+    def close(self):
+        """Trims the unused part of the last chunk and finalises the header."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._chunk = None
+        self._file.truncate(HEADER_BYTES + self.count * SCHEMA.itemsize)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Reading ---
+
+def load(path):
+    """
+    The rows of a recording as a read-only memory map (no copy). Rows past
+    the header's count, left by a writer that did not close the file, are
+    included up to the last one with a timestamp.
+    """
+    with open(path, "rb") as f:
+        if f.read(6) != b"\x93NUMPY":
+            raise ValueError(f"{path} is not a signal recording")
+        f.seek(8)
+        header_len = int.from_bytes(f.read(2), "little")
+        header = ast.literal_eval(f.read(header_len).decode("latin1"))
+        offset = 10 + header_len
+        if np.dtype(np.lib.format.descr_to_dtype(header["descr"])) != SCHEMA:
+            raise ValueError(f"{path} has an unknown schema")
+        size = os.fstat(f.fileno()).st_size
+    rows = (size - offset) // SCHEMA.itemsize
+    if rows == 0:
+        return np.zeros(0, dtype=SCHEMA)
+    records = np.memmap(path, dtype=SCHEMA, mode="r", offset=offset, shape=(rows,))
+    count = header["shape"][0]
+    if count < rows:
+        # Unfinalised file: the rest of the last chunk is zero-filled
+        written = np.flatnonzero(records["time"][count:] != 0)
+        count += int(written[-1]) + 1 if len(written) else 0
+    return records[:count]
+
+
+def flag(records, name):
+    """One on/off signal as a boolean array."""
+    return (records["flags"] & (1 << FLAGS.index(name))) != 0
+
+
+def signals(records):
+    """Signal arrays for scoring.raw_scores / score_batch."""
+    columns = {name: flag(records, name).astype(np.float64) for name in FLAGS if name != "cheating"}
+    columns["speech"] = records["speech"].astype(np.float64)
+    return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise (and rescore) signal recordings.")
+    parser.add_argument("files", nargs="+", help="signals_<session>.npy files")
+    parser.add_argument("--thresh", type=float, nargs="+", help="rescore with these thresholds")
+    args = parser.parse_args(argv)
+
+    import scoring  # Imported here: scoring reads recordings through this module
+
+    for path in args.files:
+        try:
+            records = load(path)
+        except (OSError, ValueError, SyntaxError) as e:
+            print(f"❌ Error: {path}: {e}")
+            return 1
+        duration = records["time"][-1] - records["time"][0] if len(records) else 0.0
+        print(f"\n{path}: {len(records)} frames, {duration / 60:.1f} min")
+        for name in ("score",) + _VALUE_COLUMNS:
+            column = records[name]
+            known = column[~np.isnan(column)]
+            if len(known):
+                print(f"  {name:<12} mean {known.mean():9.3f}  min {known.min():9.3f}  max {known.max():9.3f}")
+        for name in FLAGS:
+            print(f"  {name:<14} {flag(records, name).mean():6.1%} of frames")
+        if args.thresh:
+            for row in scoring.tune([signals(records)], args.thresh):
+                print(f"  rescored at {row['thresh']:.2f}: {row['episodes']} episodes, "
+                      f"{row['frames_over']:.1%} of frames over")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
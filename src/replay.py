@@ -0,0 +1,130 @@
+"""
+Headless replay: pushes recorded (or synthetic) frames through the full
+detection pipeline as fast as the CPU allows, without Tk or a camera.
+
+Usage (from src/):
+    python replay.py exam.mp4 --output exam_results.jsonl
+    python replay.py frames_dir/ --no-objects
+    python replay.py synthetic:1280x720 --max-frames 500
+"""
+import argparse
+import json
+import sys
+import time
+
+import detection
+import event_log
+import event_store
+import frame_source
+import instrument
+import pipeline
+import recording
+
+REPORT_EVERY = 100  # Print a progress line every *n* frames
+
+
+def reset_scoring():
+    """Resets the suspicion score and log cooldowns so each replay starts clean."""
+    detection.SCORER.reset()
+    detection.last_log_time.clear()
+
+
+def replay(source, output_path=None, detect_objects=True, max_frames=None, quiet=False, record_path=None):
+    """
+    Runs every frame of `source` through the pipeline and detection.process.
+    Writes one JSON line per frame to `output_path` and a signal recording
+    to `record_path` (if given) and returns a summary dict with the frame
+    count, elapsed seconds and frames/second.
+    """
+    reset_scoring()
+    frame_pipeline = pipeline.FramePipeline(detect_objects=detect_objects)
+    out = open(output_path, "w") if output_path else None
+    recorder = recording.SignalRecorder(record_path) if record_path else None
+
+    frames = 0
+    start = time.perf_counter()
+    try:
+        for frame in source:
+            frame_start = time.perf_counter()
+            _, results = frame_pipeline.process(frame)
+            # No microphone during replay
+            results["audio"] = 0
+            with instrument.span("scoring"):
+                detection.process(None, results)
+            if recorder:
+                with instrument.span("record"):
+                    recorder.record(results, detection.SCORER)
+            instrument.add("frame", time.perf_counter() - frame_start)
+
+            if out:
+                record = {
+                    "frame": frames,
+                    "suspicion": detection.SCORER.score,
+                    "cheating": detection.SCORER.cheating,
+                    "results": results,
+                }
+                out.write(json.dumps(record, default=float) + "\n")
+
+            frames += 1
+            if not quiet and frames % REPORT_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{frames} frames | {frames / elapsed:.1f} FPS")
+            if max_frames is not None and frames >= max_frames:
+                break
+    finally:
+        frame_pipeline.close()
+        source.release()
+        if out:
+            out.close()
+        if recorder:
+            recorder.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the proctoring pipeline.")
+    parser.add_argument("source", help="video file, image directory, 'webcam[:N]' or 'synthetic[:WxH]'")
+    parser.add_argument("--output", help="write per-frame results as JSON lines to this file")
+    parser.add_argument("--record", help="write a per-frame signal recording (.npy, see recording.py) to this file")
+    parser.add_argument("--max-frames", type=int, help="stop after this many frames")
+    parser.add_argument("--no-objects", action="store_true", help="skip YOLO object detection")
+    parser.add_argument("--event-log", help="append logged events here (JSON lines, or the event store for a .db file) instead of discarding them")
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+    parser.add_argument("--profile", action="store_true", help="time each pipeline stage and print the table")
+    args = parser.parse_args(argv)
+
+    # Replay reports its own progress; the per-frame score lines would flood it.
+    detection.VERBOSE = False
+
+    try:
+        source = frame_source.open_source(args.source, count=args.max_frames)
+    except FileNotFoundError as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    if args.profile:
+        instrument.enable()
+    if args.event_log:
+        # A .db path goes to the SQLite event store, anything else is JSON lines
+        log_class = event_store.SqliteEventLog if args.event_log.endswith(".db") else event_log.JsonlEventLog
+        detection.EVENT_LOG = log_class(args.event_log, session_id=f"replay:{args.source}")
+    try:
+        stats = replay(source, args.output, not args.no_objects, args.max_frames, args.quiet, args.record)
+    finally:
+        if detection.EVENT_LOG is not None:
+            detection.EVENT_LOG.close()
+            detection.EVENT_LOG = None
+    if args.profile:
+        print(instrument.format_table())
+    print(f"✅ Processed {stats['frames']} frames in {stats['seconds']:.2f}s ({stats['fps']:.1f} FPS)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,15 @@
 import audio
 import detection
 import alerts
+import event_log
+import event_store
 import gui
+import instrument
+import recording
 import tkinter as tk
-import threading as th
 import os
 import sys
+import uuid
 import jwt
 from urllib.parse import urlparse, parse_qs
 
@@ -18,6 +22,10 @@ def validate_token(token):
     try:
         decoded_token = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         # The token is valid (signature and expiration are checked by jwt.decode)
+        if 'scope' in decoded_token:
+            # A scoped token (e.g. the ingest API's session token) cannot launch the app
+            print("❌ Error: Invalid token. Authentication failed.")
+            return None
         print("✅ Token is valid.")
         return decoded_token['user']
     except jwt.ExpiredSignatureError:
@@ -31,6 +39,8 @@ if __name__ == "__main__":
     user_info = None
     # Check for a "debug" flag to run the app without a token
     is_debug_mode = "--debug" in sys.argv
+    # Stage timings on screen and in logs/profile_<session>.jsonl
+    is_profiling = "--profile" in sys.argv or os.environ.get("PROCTORING_PROFILE") == "1"
 
     # --- Token Validation from Command-Line Argument ---
     if len(sys.argv) > 1:
@@ -62,17 +72,36 @@ if __name__ == "__main__":
         
         # --- Create Shared State Objects ---
         alert_manager = alerts.AlertManager()
+        # Structured session log and the reviewers' event store, both written on background threads
+        session_id = uuid.uuid4().hex
+        user_id = user_info.get("id", user_info.get("usn", user_info.get("fullName")))
+        detection.EVENT_LOG = event_log.TeeLog(
+            event_log.JsonlEventLog(session_id=session_id, user_id=user_id),
+            event_store.SqliteEventLog(session_id=session_id, user_id=user_id),
+        )
         # Use a simple dictionary as a mutable object to share state between threads.
         audio_state = {"is_cheating": 0}
+        timing_dumper = None
+        if is_profiling:
+            instrument.enable()
+            timing_dumper = instrument.Dumper(os.path.join(event_log.LOG_DIR, f"profile_{session_id}.jsonl")).start()
 
-        # --- Start Background Threads ---
-        # The audio thread will now update the shared audio_state object.
-        audio_thread = th.Thread(target=audio.sound, args=(alert_manager, audio_state), daemon=True)
-        audio_thread.start()
+        # --- Start Background Audio ---
+        # The audio engine's callback updates the shared audio_state object.
+        audio_engine = audio.start_listening(audio_state)
 
         # --- Create and Run the Main GUI ---
         root = tk.Tk()
+        # Every frame's detection values, for review and rescoring after the exam
+        recorder = recording.SignalRecorder(recording.default_path(session_id))
         # Pass all shared objects (detection module, managers, state) to the GUI.
-        app = gui.ProctoringApp(root, detection, alert_manager, user_info, audio_state) 
+        app = gui.ProctoringApp(root, detection, alert_manager, user_info, audio_state, recorder)
         root.protocol("WM_DELETE_WINDOW", app.on_closing)
         root.mainloop()
+        if audio_engine is not None:
+            audio_engine.stop()
+        # Write out whatever is still buffered
+        detection.EVENT_LOG.close()
+        recorder.close()
+        if timing_dumper is not None:
+            timing_dumper.stop()
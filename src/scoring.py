@@ -0,0 +1,245 @@
+"""
+Suspicion scoring, driven by the RULES table. The same table and smoothing
+run per frame (ScoringEngine, used by detection.process) and over whole
+recorded sessions at once (score_batch), so thresholds and weights can be
+re-tuned against stored sessions:
+
+    python scoring.py logs/signals_*.npy --thresh 0.5 0.6 0.7 --weight object=0.6
+
+Session files are signal recordings (.npy, see recording.py) or replay.py
+--output files (one JSON line per frame).
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import recording
+
+# --- Scoring Parameters ---
+CHEAT_THRESH = 0.6     # Smoothed score above which the candidate counts as cheating
+SPEECH_THRESH = 0.25   # Speech probability (vad.SpeechDetector) that counts as speaking; also vad's threshold
+RISE_ALPHA = 0.1       # EMA factor while the score rises: respond quickly
+FALL_ALPHA = 0.01      # EMA factor while it falls: decay slowly
+
+# Each rule fires when any of its signals is set and then adds the largest
+# weight among the signals that are set. Event types match detection.EVENT_MESSAGES.
+RULES = (
+    # name,        {signal: weight},                 event type,        alert icon
+    ("head",       {"head_x": 0.2, "head_y": 0.3},   "looking_away",    "❗"),
+    ("audio",      {"audio": 0.3},                   "speaking",        "🔇"),
+    ("object",     {"object": 0.5},                  "object_detected", "📱"),
+    ("eye",        {"eye_gaze": 0.4},                "gaze_off_center", "❗"),
+    ("blink",      {"long_blink": 0.2},              "long_blink",      "❗"),
+    ("multi_face", {"multiple_faces": 0.9},          "multiple_faces",  "❗"),
+)
+
+
+def signal_names(rules=RULES):
+    return sorted({signal for _, weights, _, _ in rules for signal in weights})
+
+
+def with_weights(overrides, rules=RULES):
+    """A copy of `rules` with some signal weights replaced, e.g. {"object": 0.6}."""
+    unknown = set(overrides) - set(signal_names(rules))
+    if unknown:
+        raise KeyError(f"unknown signals: {', '.join(sorted(unknown))}")
+    return tuple((name, {signal: overrides.get(signal, weight) for signal, weight in weights.items()}, event, icon)
+                 for name, weights, event, icon in rules)
+
+
+def _audio_signal(results):
+    """Speaking flag: the speech probability when the detector runs, else the loudness flag."""
+    speech = results.get("speech")
+    if speech is not None:
+        return speech >= SPEECH_THRESH
+    return results.get("audio")
+
+
+class ScoringEngine:
+    """Per-frame scoring state for one session: the smoothed score and whether it is over the threshold."""
+    def __init__(self, rules=RULES, thresh=CHEAT_THRESH, rise=RISE_ALPHA, fall=FALL_ALPHA):
+        self.rules = rules
+        self.thresh = thresh
+        self.rise = rise
+        self.fall = fall
+        self.reset()
+
+    def reset(self):
+        self.score = 0.0      # Smoothed suspicion score
+        self.cheating = 0     # 1 while score > thresh
+        self.raw = 0.0        # This frame's unsmoothed score
+
+    def update(self, detection_results):
+        """Scores one frame's detection results. Returns the rules that fired."""
+        fired = []
+        raw = 0.0
+        for rule in self.rules:
+            weights = rule[1]
+            contribution = None
+            for signal, weight in weights.items():
+                value = _audio_signal(detection_results) if signal == "audio" else detection_results.get(signal)
+                if value and (contribution is None or weight > contribution):
+                    contribution = weight
+            if contribution is not None:
+                raw += contribution
+                fired.append(rule)
+        alpha = self.rise if raw > self.score else self.fall
+        self.score = alpha * raw + (1 - alpha) * self.score
+        self.raw = raw
+        self.cheating = 1 if self.score > self.thresh else 0
+        return fired
+
+
+# --- Batch Scoring ---
+
+def raw_scores(signals, rules=RULES):
+    """
+    Unsmoothed score of every frame. `signals` maps signal names to arrays
+    with one value per frame; missing signals count as never set, and a
+    "speech" array (NaN where unknown) takes precedence over "audio".
+    """
+    n = len(next(iter(signals.values())))
+    signals = dict(signals)
+    if "speech" in signals:
+        speech = np.asarray(signals["speech"], dtype=float)
+        audio = np.asarray(signals.get("audio", np.zeros(n)), dtype=float)
+        signals["audio"] = np.where(np.isnan(speech), audio, speech >= SPEECH_THRESH)
+    raw = np.zeros(n)
+    for _, weights, _, _ in rules:
+        contribution = np.zeros(n)
+        for signal, weight in weights.items():
+            if signal in signals:
+                values = np.asarray(signals[signal], dtype=float)
+                np.maximum(contribution, np.where((values != 0) & ~np.isnan(values), weight, 0.0), out=contribution)
+        raw += contribution
+    return raw
+
+
+def asymmetric_ema(raw, initial=0.0, rise=RISE_ALPHA, fall=FALL_ALPHA):
+    """
+    ScoringEngine's smoothing over a whole array. While the input stays
+    constant the score moves monotonically towards it, so the rise/fall
+    choice only changes where the input changes: each run of equal inputs
+    has the closed form x + (s0 - x) * (1 - alpha) ** k, and only the
+    score at each run boundary is computed sequentially.
+    """
+    raw = np.asarray(raw, dtype=float)
+    n = len(raw)
+    if n == 0:
+        return np.zeros(0)
+    run_starts = np.flatnonzero(np.diff(raw, prepend=np.nan) != 0)
+    run_lengths = np.diff(np.append(run_starts, n))
+    start_scores = []
+    keep = []  # 1 - alpha of every run
+    score = float(initial)
+    keep_rising, keep_falling = 1 - rise, 1 - fall
+    for x, length in zip(raw[run_starts].tolist(), run_lengths.tolist()):
+        start_scores.append(score)
+        k = keep_rising if x > score else keep_falling
+        keep.append(k)
+        score = x + (score - x) * k ** length
+    start_scores = np.array(start_scores)
+    keep = np.array(keep)
+    run = np.repeat(np.arange(len(run_starts)), run_lengths)
+    steps = np.arange(1, n + 1) - run_starts[run]
+    return raw + (start_scores[run] - raw) * keep[run] ** steps
+
+
+def crossings(scores, thresh=CHEAT_THRESH):
+    """(frames where the score goes above thresh, frames where it drops back)."""
+    above = np.concatenate([[False], np.asarray(scores) > thresh])
+    change = np.diff(above.astype(np.int8))
+    return np.flatnonzero(change == 1), np.flatnonzero(change == -1)
+
+
+def score_batch(signals, thresh=CHEAT_THRESH, rules=RULES, initial=0.0):
+    """Scores a whole session. Returns raw and smoothed scores, the cheating flags and the crossings."""
+    raw = raw_scores(signals, rules)
+    scores = asymmetric_ema(raw, initial)
+    up, down = crossings(scores, thresh)
+    return {
+        "raw": raw,
+        "score": scores,
+        "cheating": scores > thresh,
+        "crossings_up": up,
+        "crossings_down": down,
+    }
+
+
+def load_session(path, rules=RULES):
+    """Signal arrays of a recording (.npy) or a replay.py --output file (one JSON line per frame)."""
+    if path.endswith(".npy"):
+        return recording.signals(recording.load(path))
+    names = signal_names(rules) + ["speech"]
+    columns = {name: [] for name in names}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            results = json.loads(line)["results"]
+            for name in names:
+                value = results.get(name)
+                columns[name].append(np.nan if value is None else float(value))
+    return {name: np.array(values) for name, values in columns.items()}
+
+
+def tune(sessions, thresholds, rules=RULES):
+    """
+    For each threshold: sessions flagged, cheating episodes and the share
+    of frames over it, across all sessions. Each session is smoothed once;
+    thresholds only change the comparisons.
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    flagged = np.zeros(len(thresholds), dtype=int)
+    episodes = np.zeros(len(thresholds), dtype=int)
+    frames_over = np.zeros(len(thresholds), dtype=int)
+    total_frames = 0
+    for signals in sessions:
+        scores = asymmetric_ema(raw_scores(signals, rules))
+        over = scores[None, :] > thresholds[:, None]
+        flagged += over.any(axis=1)
+        episodes += np.count_nonzero(np.diff(over.astype(np.int8), axis=1, prepend=0) == 1, axis=1)
+        frames_over += over.sum(axis=1)
+        total_frames += len(scores)
+    return [{"thresh": float(t), "sessions_flagged": int(f), "episodes": int(e),
+             "frames_over": float(o) / max(total_frames, 1)}
+            for t, f, e, o in zip(thresholds, flagged, episodes, frames_over)]
+
+
+def _parse_weight(text):
+    signal, _, value = text.partition("=")
+    return signal, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore recorded sessions with other thresholds or weights.")
+    parser.add_argument("files", nargs="+", help="signal recordings (.npy) or replay.py --output files")
+    parser.add_argument("--thresh", type=float, nargs="+", default=[CHEAT_THRESH], help="thresholds to compare")
+    parser.add_argument("--weight", type=_parse_weight, action="append", default=[], metavar="SIGNAL=WEIGHT",
+                        help=f"override a signal weight ({', '.join(signal_names())})")
+    args = parser.parse_args(argv)
+
+    try:
+        rules = with_weights(dict(args.weight))
+    except KeyError as e:
+        print(f"❌ Error: {e.args[0]}")
+        return 1
+    start = time.perf_counter()
+    sessions = [load_session(path, rules) for path in args.files]
+    loaded = time.perf_counter()
+    report = tune(sessions, args.thresh, rules)
+    elapsed = time.perf_counter() - loaded
+
+    print(f"{'thresh':>7} {'flagged':>8} {'episodes':>9} {'frames over':>12}")
+    for row in report:
+        print(f"{row['thresh']:>7.2f} {row['sessions_flagged']:>8} {row['episodes']:>9} {row['frames_over']:>11.1%}")
+    frames = sum(len(next(iter(s.values()))) for s in sessions)
+    print(f"\n✅ {len(sessions)} sessions, {frames} frames (loaded in {loaded - start:.2f}s, scored in {elapsed:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
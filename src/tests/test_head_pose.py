@@ -0,0 +1,37 @@
+"""
+Head pose estimation on synthetic landmarks (FACE_MODEL_3D projected at a
+known pose, see benchmarks.suite.make_landmarks).
+
+Run from src/:
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+import head_pose
+from benchmarks.suite import FRAME_H, FRAME_W, make_landmarks
+
+
+def face(angles, seed=0):
+    return make_landmarks(np.random.default_rng(seed), angles)
+
+
+def test_first_frame_recovers_pose():
+    estimator = head_pose.HeadPoseEstimator()
+    pitch, yaw, roll = estimator.estimate(face((5.0, -12.0, 3.0)), FRAME_W, FRAME_H)
+    assert (pitch, yaw, roll) == pytest.approx((5.0, -12.0, 3.0), abs=0.5)
+
+
+def test_second_frame_is_smoothed():
+    estimator = head_pose.HeadPoseEstimator()
+    estimator.estimate(face((0.0, 0.0, 0.0)), FRAME_W, FRAME_H)
+    _, yaw, _ = estimator.estimate(face((0.0, 30.0, 0.0), seed=1), FRAME_W, FRAME_H)
+    assert yaw == pytest.approx(30.0 * estimator.smoothing, abs=0.5)
+
+
+def test_reset_drops_smoothing():
+    estimator = head_pose.HeadPoseEstimator()
+    estimator.estimate(face((0.0, 0.0, 0.0)), FRAME_W, FRAME_H)
+    estimator.reset()
+    _, yaw, _ = estimator.estimate(face((0.0, 30.0, 0.0), seed=1), FRAME_W, FRAME_H)
+    assert yaw == pytest.approx(30.0, abs=0.5)
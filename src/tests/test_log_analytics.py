@@ -0,0 +1,45 @@
+"""
+Alert type counting in log_analytics: messages are looked up by a hash of
+their length, first MESSAGE_KEY_BYTES bytes and last 8 bytes, but counted by
+their full text.
+
+Run from src/:
+    python -m pytest tests
+"""
+import numpy as np
+
+import log_analytics
+
+
+def analyse_lines(lines, chunk_lines=None):
+    analysis = log_analytics.FileAnalysis("test.txt")
+    chunk_lines = chunk_lines or len(lines)
+    for start in range(0, len(lines), chunk_lines):
+        text = "".join(f"2024-05-01 09:00:{k % 60:02d} - ALERT: {message}\n"
+                       for k, message in enumerate(lines[start:start + chunk_lines], start))
+        analysis.add_chunk(np.frombuffer(text.encode(), dtype=np.uint8))
+    return analysis.result()
+
+
+def counts(result):
+    return result["sessions"][0]["counts"]
+
+
+def test_messages_sharing_hashed_bytes_are_told_apart():
+    head = "x" * log_analytics.MESSAGE_KEY_BYTES
+    first, second = head + "AAAA" + " the end", head + "BBBB" + " the end"
+    assert counts(analyse_lines([first, second, first])) == {first: 2, second: 1}
+    # Also when the second message only appears in a later chunk
+    assert counts(analyse_lines([first, first, second, second], chunk_lines=2)) == {first: 2, second: 2}
+
+
+def test_colliding_keys_are_told_apart(monkeypatch):
+    # Every message gets the same key
+    monkeypatch.setattr(log_analytics, "_KEY_MULTIPLIERS", log_analytics._KEY_MULTIPLIERS * np.uint64(0))
+    result = analyse_lines(["Looking left", "Looking down", "Looking left"], chunk_lines=2)
+    assert counts(result) == {"Looking left": 2, "Looking down": 1}
+
+
+def test_known_messages_use_event_names():
+    message = next(iter(log_analytics.detection.EVENT_MESSAGES.values()))
+    assert counts(analyse_lines([message])) == {log_analytics.EVENT_TYPES[message]: 1}
@@ -0,0 +1,286 @@
+"""
+Spectral voice-activity detection. Unlike the broadband loudness check in
+audio.py, it looks at how the energy is spread over the spectrum: voiced
+speech puts it in the 300-3400 Hz band, in harmonics that stand out from
+their neighbouring bins, and above a slowly tracked noise floor. Fans stay
+at the floor and keyboard clicks have a flat spectrum, so neither counts
+however loud it is.
+
+SpeechDetector runs inside AudioEngine, one FFT per audio block;
+speech_probability() computes the same signal for a whole recording at once.
+
+Usage (from src/):
+    python vad.py exam.wav
+    python vad.py exam.wav --threshold 0.6 --json speech.json
+"""
+import argparse
+import inspect
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+import audio
+import scoring
+
+# --- Detector Parameters ---
+FRAME_SECONDS = 0.032          # FFT length, rounded up to a power of two
+SPEECH_BAND = (300.0, 3400.0)  # Hz
+NOISE_FLOOR_SECONDS = 3.0      # The noise floor is the quietest frame in this window
+SMOOTHING_SECONDS = 0.5        # Probabilities are averaged over this window
+# Smoothed probability that counts as speech (speech is only partly voiced). The
+# scoring rules use the same threshold, so live and rescored sessions agree.
+SPEECH_THRESHOLD = scoring.SPEECH_THRESH
+HARMONIC_SPACING_HZ = 300.0    # Bins are compared with the mean of this many Hz around them
+OFFLINE_CHUNK_FRAMES = 4096    # Frames per vectorised pass in offline mode; bounds memory use
+
+# Each feature maps to a probability through a logistic (centre, slope); a
+# frame is speech only if all three agree, so the probabilities multiply.
+SNR_CENTER_DB, SNR_SLOPE = 6.0, 0.5              # Speech-band energy above the noise floor
+RATIO_CENTER, RATIO_SLOPE = 0.1, 10.0            # Share of the energy in the speech band
+FLATNESS_CENTER, FLATNESS_SLOPE = 0.45, 15.0     # Local spectral flatness in the band (noise ~0.6)
+EPS = 1e-10
+
+_RFFT_OUT = "out" in inspect.signature(np.fft.rfft).parameters  # NumPy >= 2.0
+
+
+def fft_size(samplerate, frame_seconds=FRAME_SECONDS):
+    return 1 << max(4, math.ceil(math.log2(samplerate * frame_seconds)))
+
+
+def frames_per(seconds, samplerate, blocksize):
+    """Number of blocks (one frame each) covering `seconds`."""
+    return max(1, round(seconds * samplerate / blocksize))
+
+
+def _band(samplerate, n_fft):
+    """rfft bin range [lo, hi) of SPEECH_BAND, and the half-width of the neighbourhood each bin is compared with."""
+    half = max(1, round(HARMONIC_SPACING_HZ / 2 * n_fft / samplerate))
+    lo = max(1 + half, math.ceil(SPEECH_BAND[0] * n_fft / samplerate))
+    hi = min(n_fft // 2 + 1 - half, math.floor(SPEECH_BAND[1] * n_fft / samplerate) + 1)
+    return lo, hi, half
+
+
+def _logistic(x, center, slope):
+    return 1 / (1 + np.exp(-np.clip(slope * (x - center), -50, 50)))
+
+
+def _probability(snr_db, ratio, flatness):
+    """Speech probability of frame features; works on floats and arrays alike."""
+    return (_logistic(snr_db, SNR_CENTER_DB, SNR_SLOPE) * _logistic(ratio, RATIO_CENTER, RATIO_SLOPE)
+            * _logistic(-flatness, -FLATNESS_CENTER, FLATNESS_SLOPE))
+
+
+class SpeechDetector:
+    """
+    Streaming speech probability, fed one audio block at a time (the
+    AudioEngine processor interface). Every block costs one FFT of
+    fft_size(samplerate) samples, the newest ones, whatever the block size:
+    small blocks overlap, large ones are only partly analysed. All buffers
+    are allocated in configure(), none per block. If `state` is given, its
+    "speech_probability" and "is_speaking" entries follow the detector.
+    """
+    def __init__(self, samplerate, blocksize=audio.BLOCKSIZE, threshold=SPEECH_THRESHOLD, state=None):
+        self.threshold = threshold
+        self.state = state
+        self.configure(samplerate, blocksize)
+
+    def configure(self, samplerate, blocksize):
+        """Allocates the buffers for a (new) sample rate and block size and clears all history."""
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        n = self.n_fft = fft_size(samplerate)
+        self._lo, self._hi, self._half = _band(samplerate, n)
+        self._window = np.hanning(n).astype(np.float32)
+        self._history = np.zeros(n, dtype=np.float32)  # Ring of the newest samples
+        self._pos = 0
+        self._frame = np.empty(n, dtype=np.float32)
+        self._spectrum = np.empty(n // 2 + 1, dtype=np.complex64)
+        self._power = np.empty(n // 2 + 1, dtype=np.float32)
+        self._scratch = np.empty(n // 2 + 1, dtype=np.float32)
+        self._cumulative = np.zeros(n // 2 + 2)  # Leading 0, then the running sum of power
+        self._local = np.empty(self._hi - self._lo)
+        self._energies = np.full(frames_per(NOISE_FLOOR_SECONDS, samplerate, blocksize), np.inf)
+        self._energy_index = 0
+        self._probabilities = np.zeros(frames_per(SMOOTHING_SECONDS, samplerate, blocksize))
+        self._probability_index = 0
+        self._probability_sum = 0.0
+        self.probability = 0.0
+        self.is_speaking = 0
+        self._publish()
+
+    def add_block(self, indata):
+        """Analyses the newest fft_size samples after appending this block (first channel)."""
+        samples = indata[:, 0] if indata.ndim == 2 else indata
+        n, count = self.n_fft, len(samples)
+        if count == 0:
+            return
+        # Append to the sample ring
+        if count >= n:
+            self._history[:] = samples[-n:]
+            self._pos = 0
+        else:
+            first = min(count, n - self._pos)
+            self._history[self._pos:self._pos + first] = samples[:first]
+            self._history[:count - first] = samples[first:]
+            self._pos = (self._pos + count) % n
+        # Window the ring, oldest sample first
+        tail = n - self._pos
+        np.multiply(self._history[self._pos:], self._window[:tail], out=self._frame[:tail])
+        np.multiply(self._history[:self._pos], self._window[tail:], out=self._frame[tail:])
+        if _RFFT_OUT:
+            np.fft.rfft(self._frame, out=self._spectrum)
+        else:
+            self._spectrum[:] = np.fft.rfft(self._frame)
+        power, scratch = self._power, self._scratch
+        np.multiply(self._spectrum.real, self._spectrum.real, out=power)
+        np.multiply(self._spectrum.imag, self._spectrum.imag, out=scratch)
+        power += scratch
+
+        band = power[self._lo:self._hi]
+        band_energy = float(band.sum(dtype=np.float64))
+        ratio = band_energy / (float(power[1:].sum(dtype=np.float64)) + EPS)
+        # Flatness of each bin against the mean of its neighbourhood: ~0.56 for any noise
+        # spectrum, whatever its slope, and lower where harmonics stand out
+        lo, hi, half, local = self._lo, self._hi, self._half, self._local
+        np.cumsum(power, out=self._cumulative[1:])
+        np.subtract(self._cumulative[lo + half + 1:hi + half + 1], self._cumulative[lo - half:hi - half], out=local)
+        local *= 1 / (2 * half + 1)
+        local += EPS
+        np.log(local, out=local)
+        log_band = scratch[:len(band)]
+        np.add(band, EPS, out=log_band)
+        np.log(log_band, out=log_band)
+        flatness = math.exp(float(log_band.mean(dtype=np.float64)) - float(local.mean()))
+        energy_db = 10 * math.log10(band_energy + EPS)
+
+        self._energies[self._energy_index] = energy_db
+        self._energy_index = (self._energy_index + 1) % len(self._energies)
+        snr_db = energy_db - float(self._energies.min())
+        probability = float(_probability(snr_db, ratio, flatness))
+
+        i = self._probability_index
+        self._probability_sum += probability - self._probabilities[i]
+        self._probabilities[i] = probability
+        i = (i + 1) % len(self._probabilities)
+        if i == 0:
+            # Re-sum once per window so rounding errors in the running sum cannot build up
+            self._probability_sum = float(self._probabilities.sum())
+        self._probability_index = i
+        self.probability = float(self._probability_sum / len(self._probabilities))
+        self.is_speaking = 1 if self.probability >= self.threshold else 0
+        self._publish()
+
+    def _publish(self):
+        if self.state is not None:
+            self.state["speech_probability"] = self.probability
+            self.state["is_speaking"] = self.is_speaking
+
+
+# --- Offline Mode ---
+
+def _moving_min(values, width):
+    """Minimum of each value and the width - 1 before it (fewer at the start)."""
+    padded = np.concatenate([np.full(width - 1, np.inf), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, width).min(axis=1)
+
+
+def _moving_mean(values, width):
+    """Mean of each value and the width - 1 before it, counting missing ones at the start as 0."""
+    sums = np.cumsum(np.concatenate([np.zeros(width), values]))
+    return (sums[width:] - sums[:-width]) / width
+
+
+def speech_probability(samples, samplerate, blocksize=audio.BLOCKSIZE):
+    """
+    SpeechDetector's probability for every block of a whole recording, in
+    vectorised passes. `samples` is (frames,) or (frames, channels); the
+    first channel is used, and a last partial block is zero-padded as
+    audio.WavSource does. Returns (block end times in seconds, probabilities).
+    """
+    samples = np.asarray(samples)
+    if samples.ndim == 2:
+        samples = samples[:, 0]
+    n = fft_size(samplerate)
+    blocks = -(-len(samples) // blocksize)
+    # n zeros before the first sample (the empty ring) and zeros after the last to fill its block
+    padded = np.zeros(n + blocks * blocksize, dtype=np.float32)
+    padded[n:n + len(samples)] = samples
+    windows = np.lib.stride_tricks.sliding_window_view(padded, n)
+    lo, hi, half = _band(samplerate, n)
+    window = np.hanning(n).astype(np.float32)
+
+    energy_db = np.empty(blocks)
+    ratio = np.empty(blocks)
+    flatness = np.empty(blocks)
+    for start in range(0, blocks, OFFLINE_CHUNK_FRAMES):
+        stop = min(blocks, start + OFFLINE_CHUNK_FRAMES)
+        # Frame k holds the n samples up to the end of block k
+        ends = (np.arange(start, stop) + 1) * blocksize
+        spectrum = np.fft.rfft(windows[ends] * window, axis=1)
+        power = spectrum.real * spectrum.real + spectrum.imag * spectrum.imag
+        band = power[:, lo:hi]
+        band_energy = band.sum(axis=1, dtype=np.float64)
+        ratio[start:stop] = band_energy / (power[:, 1:].sum(axis=1, dtype=np.float64) + EPS)
+        cumulative = np.zeros((len(power), power.shape[1] + 1))
+        np.cumsum(power, axis=1, out=cumulative[:, 1:])
+        local = (cumulative[:, lo + half + 1:hi + half + 1] - cumulative[:, lo - half:hi - half]) * (1 / (2 * half + 1))
+        log_local = np.log(local + EPS).mean(axis=1)
+        flatness[start:stop] = np.exp(np.log(band + np.float32(EPS)).mean(axis=1, dtype=np.float64) - log_local)
+        energy_db[start:stop] = 10 * np.log10(band_energy + EPS)
+
+    floor_db = _moving_min(energy_db, frames_per(NOISE_FLOOR_SECONDS, samplerate, blocksize))
+    probabilities = _probability(energy_db - floor_db, ratio, flatness)
+    smoothed = _moving_mean(probabilities, frames_per(SMOOTHING_SECONDS, samplerate, blocksize))
+    times = (np.arange(blocks) + 1) * blocksize / samplerate
+    return times, smoothed
+
+
+def speech_segments(times, probabilities, threshold=SPEECH_THRESHOLD):
+    """(start, end) times of every run of blocks at or above the threshold."""
+    speaking = np.concatenate([[False], probabilities >= threshold, [False]])
+    edges = np.flatnonzero(np.diff(speaking.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    block_seconds = times[0] if len(times) else 0
+    return [(float(times[s] - block_seconds), float(times[e - 1])) for s, e in zip(starts, ends)]
+
+
+def analyse_wav(path, blocksize=audio.BLOCKSIZE, threshold=SPEECH_THRESHOLD):
+    """Speech segments of a WAV file. Returns (segments, total speech seconds, duration)."""
+    samples, samplerate = audio.read_wav(path)
+    times, probabilities = speech_probability(samples, samplerate, blocksize)
+    segments = speech_segments(times, probabilities, threshold)
+    return segments, sum(end - start for start, end in segments), len(samples) / samplerate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find speech in a recorded WAV file.")
+    parser.add_argument("wav", help="PCM WAV file")
+    parser.add_argument("--blocksize", type=int, default=audio.BLOCKSIZE, help="samples per block, as recorded live")
+    parser.add_argument("--threshold", type=float, default=SPEECH_THRESHOLD)
+    parser.add_argument("--json", help="write the segments to this file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        segments, speech_seconds, duration = analyse_wav(args.wav, args.blocksize, args.threshold)
+    except (OSError, EOFError, ValueError) as e:
+        print(f"❌ Error: Could not read {args.wav}: {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+
+    for seg_start, seg_end in segments:
+        print(f"{seg_start:9.2f}s - {seg_end:9.2f}s  speech")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"file": args.wav, "duration": duration, "speech_seconds": speech_seconds,
+                       "segments": segments}, f, indent=1)
+    print(f"\n✅ {len(segments)} speech segments, {speech_seconds:.1f}s of {duration:.1f}s "
+          f"(analysed in {elapsed:.2f}s, {duration / max(elapsed, 1e-9):.0f}x real time)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())